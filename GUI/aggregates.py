@@ -0,0 +1,162 @@
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from violation_store import month_based_weeks
+
+# Above this many changed days a rebuild is cheaper than applying them one by one
+REBUILD_THRESHOLD = 64
+
+
+def week_label(week):
+    """'2025-04-W02' -> '2025-04 Week 2'"""
+    return f"{week[:7]} Week {int(week[9:])}"
+
+
+@lru_cache(maxsize=32)
+def _week_of(day):
+    _, week = month_based_weeks([day])
+    return str(week[0])
+
+
+class AggregateIndex:
+    """Daily, weekly and monthly totals for one violation series
+
+    Built once from a frame, then kept current with update_day() as new
+    counts arrive, so metric cards and charts never regroup the history.
+    Chart frames are materialised lazily and reused until the next update.
+    """
+    def __init__(self, df):
+        frame = df[['date', 'violations_count', 'month', 'week']].sort_values('date')
+        counts = frame['violations_count'].astype('int64')
+        self.daily = dict(zip(frame['date'], counts))
+        months = frame['month'].astype(str)
+        weeks = frame['week'].astype(str)
+        self.periods = dict(zip(frame['date'], zip(months, weeks)))
+        self.month_totals = counts.groupby(months).sum().to_dict()
+        self.week_totals = counts.groupby(weeks).sum().to_dict()
+        # Days recorded per month/week, so a period disappears with its last day
+        self.period_days = Counter(months) + Counter(weeks)
+        self.total = int(counts.sum())
+        self._worst_month = None
+        self._worst_week = None
+        self._frames = {}
+
+    def copy(self):
+        other = AggregateIndex.__new__(AggregateIndex)
+        other.daily = dict(self.daily)
+        other.periods = dict(self.periods)
+        other.month_totals = dict(self.month_totals)
+        other.week_totals = dict(self.week_totals)
+        other.period_days = Counter(self.period_days)
+        other.total = self.total
+        other._worst_month = self._worst_month
+        other._worst_week = self._worst_week
+        other._frames = {}
+        return other
+
+    def update_day(self, date, count):
+        """Set one day's count, adding the day if it is new, and adjust every aggregate"""
+        date = pd.Timestamp(date).normalize()
+        if date not in self.periods:
+            month, week = month_based_weeks([date])
+            self.periods[date] = (str(month[0]), str(week[0]))
+            self.period_days.update(self.periods[date])
+        month, week = self.periods[date]
+        delta = int(count) - self.daily.get(date, 0)
+        self.daily[date] = int(count)
+        self._apply(month, week, delta)
+
+    def remove_day(self, date):
+        """Forget a day whose folder no longer exists"""
+        date = pd.Timestamp(date).normalize()
+        if date not in self.daily:
+            return
+        month, week = self.periods.pop(date)
+        self._apply(month, week, -self.daily.pop(date))
+        self.period_days.subtract((month, week))
+        for period, totals in ((month, self.month_totals), (week, self.week_totals)):
+            if self.period_days[period] <= 0:
+                del self.period_days[period]
+                totals.pop(period, None)
+                self._worst_month = self._worst_week = None
+
+    def _apply(self, month, week, delta):
+        self.total += delta
+        self.month_totals[month] = self.month_totals.get(month, 0) + delta
+        self.week_totals[week] = self.week_totals.get(week, 0) + delta
+        # Maxima only need a rescan when a total goes down
+        if delta >= 0:
+            if self._worst_month is not None:
+                self._worst_month = max(self._worst_month, self.month_totals[month])
+            if self._worst_week is not None:
+                self._worst_week = max(self._worst_week, self.week_totals[week])
+        else:
+            self._worst_month = self._worst_week = None
+        self._frames = {}
+
+    def refresh(self, df):
+        """Bring the index in line with a newer frame of the same series
+
+        Only new, changed and removed days are applied; large differences
+        fall back to a rebuild. Returns the up-to-date index.
+        """
+        new = pd.Series(df['violations_count'].to_numpy(), index=pd.DatetimeIndex(df['date']))
+        old = pd.Series(self.daily, dtype='int64')
+        removed = old.index.difference(new.index)
+        previous = old.reindex(new.index)
+        changed = new[previous.isna() | new.ne(previous)]
+        if len(changed) + len(removed) > REBUILD_THRESHOLD:
+            return AggregateIndex(df)
+        for date in removed:
+            self.remove_day(date)
+        for date, count in changed.items():
+            self.update_day(date, count)
+        return self
+
+    @property
+    def worst_month(self):
+        if self._worst_month is None:
+            self._worst_month = max(self.month_totals.values(), default=0)
+        return self._worst_month
+
+    @property
+    def worst_week(self):
+        if self._worst_week is None:
+            self._worst_week = max(self.week_totals.values(), default=0)
+        return self._worst_week
+
+    def current_week_count(self, now=None):
+        return self.week_totals.get(_week_of((now or datetime.now()).date()), 0)
+
+    def daily_frame(self):
+        """Days in date order with their count and running total"""
+        if 'daily' not in self._frames:
+            frame = pd.DataFrame({
+                'date': list(self.daily.keys()),
+                'violations_count': list(self.daily.values())
+            }).sort_values('date', ignore_index=True)
+            frame['running_total'] = frame['violations_count'].cumsum()
+            self._frames['daily'] = frame
+        return self._frames['daily']
+
+    def monthly_frame(self):
+        if 'monthly' not in self._frames:
+            months = sorted(self.month_totals)
+            self._frames['monthly'] = pd.DataFrame({
+                'month': months,
+                'violations_count': [self.month_totals[m] for m in months]
+            })
+        return self._frames['monthly']
+
+    def weekly_frame(self):
+        if 'weekly' not in self._frames:
+            weeks = sorted(self.week_totals)
+            self._frames['weekly'] = pd.DataFrame({
+                'week': weeks,
+                'violations_count': [self.week_totals[w] for w in weeks],
+                'week_label': [week_label(w) for w in weeks]
+            })
+        return self._frames['weekly']
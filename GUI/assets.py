@@ -0,0 +1,109 @@
+import base64
+import os
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+BG_LOGO_WIDTH = 500  # background-size used by auth.add_bg_logo
+SIDEBAR_LOGO_WIDTH = 672  # sidebar is ~336 css px; twice that stays sharp on HiDPI screens
+PAGE_ICON_SIZE = 64
+
+
+class AssetCache:
+    """Encoded static files kept in memory, keyed by path and builder
+
+    Each lookup costs one stat(); the file is only re-read and re-encoded
+    when its mtime or size changes. Missing files give None.
+    """
+    def __init__(self):
+        self._entries = {}  # (builder, path, args) -> (stamp, value)
+        self._lock = threading.Lock()
+
+    def get(self, path, build, *args):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = (build.__name__, path, args)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        value = build(path, *args)
+        with self._lock:
+            self._entries[key] = (stamp, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _fit(path, width, mode):
+    # Downscale once to the display width; smaller images are left as they are
+    img = Image.open(path)
+    if img.mode != mode:
+        img = img.convert(mode)
+    if img.width > width:
+        img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+    return img
+
+
+def _png_bytes(path, width):
+    buffered = BytesIO()
+    _fit(path, width, 'RGBA').save(buffered, format="PNG", optimize=True)
+    return buffered.getvalue()
+
+
+def _background_css(path, width):
+    img_str = base64.b64encode(_png_bytes(path, width)).decode()
+    return f"""
+    <style>
+        .stApp {{
+            background-image: url("data:image/png;base64,{img_str}");
+            background-size: {width}px;
+            background-repeat: no-repeat;
+            background-position: center;
+            background-attachment: fixed;
+        }}
+    </style>
+    """
+
+
+def _icon(path, size):
+    img = _fit(path, size, 'RGBA')
+    img.load()
+    return img
+
+
+def _file_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+_cache = AssetCache()
+
+
+def background_logo_css(path="logo.png"):
+    """<style> block that sets ``path`` as the page background, or None if it is missing"""
+    return _cache.get(path, _background_css, BG_LOGO_WIDTH)
+
+
+def sidebar_logo(path="logo1.png"):
+    """PNG bytes sized for the sidebar"""
+    return _cache.get(path, _png_bytes, SIDEBAR_LOGO_WIDTH)
+
+
+def page_icon(path="logo1.png"):
+    """Small PIL image for st.set_page_config; falls back to an emoji"""
+    try:
+        return _cache.get(path, _icon, PAGE_ICON_SIZE) or "🦺"
+    except Exception as e:
+        print(f"Error loading page icon: {str(e)}")
+        return "🦺"
+
+
+def alert_sound_bytes(path="alert.wav"):
+    """Raw bytes of the alert sound, for pygame.mixer.Sound(file=BytesIO(...))"""
+    return _cache.get(path, _file_bytes)
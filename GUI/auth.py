@@ -1,240 +1,270 @@
-import time
-import streamlit as st
-import json
-import os
-import random
-import smtplib
-from email.message import EmailMessage
-import hashlib
-from PIL import Image
-import base64
-from io import BytesIO
-
-
-def add_bg_logo():
-    logo_path = "logo.png"
-    if os.path.exists(logo_path):
-        try:
-            with open(logo_path, "rb") as f:
-                img = Image.open(f)
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                
-                buffered = BytesIO()
-                img.save(buffered, format="PNG")
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                
-                st.markdown(
-                    f"""
-                    <style>
-                        .stApp {{
-                            background-image: url("data:image/png;base64,{img_str}");
-                            background-size: 500px;
-                            background-repeat: no-repeat;
-                            background-position: center;
-                            background-attachment: fixed;
-                        }}
-                    </style>
-                    """,
-                    unsafe_allow_html=True
-                )
-        except Exception as e:
-            st.warning(f"Couldn't load background logo: {e}")
-
-users_file = "users.json"
-OTP_CODE = None
-
-def load_users():
-    if os.path.exists(users_file):
-        try:
-            with open(users_file, "r") as f:
-                data = f.read()
-                if not data.strip():  # Handle empty file
-                    return {}
-                users = json.loads(data)
-                # Convert old format (str) to new format (dict)
-                if users and isinstance(next(iter(users.values())), str):
-                    return {email: {'password': pwd} for email, pwd in users.items()}
-                return users
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def save_users(users):
-    with open(users_file, "w") as f:
-        json.dump(users, f)
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def check_password(plain, hashed):
-    return hash_password(plain) == hashed
-
-def send_otp(recipient_email, subject="OTP Verification"):
-    # Get API key from user data
-    users = load_users()
-    
-    # Check if recipient_email exists in users (not session state)
-    if recipient_email not in users:
-        st.error("User not found")
-        return None
-    
-    # Get sender credentials from the recipient's user data
-    user_data = users[recipient_email]
-    sender_email = user_data.get('email', '')
-    sender_pass = user_data.get('api_key', '')
-    
-    if not sender_email or not sender_pass:
-        st.error("Sender credentials not configured")
-        return None
-    
-    otp = str(random.randint(100000, 999999))
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = sender_email
-    msg["To"] = recipient_email
-    msg.set_content(f"Your OTP is: {otp}")
-
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(sender_email, sender_pass)
-            server.send_message(msg)
-        return otp
-    except Exception as e:
-        st.error(f"❌ Failed to send OTP: {e}")
-        return None
-
-def login_ui():
-    add_bg_logo()
-    st.title(" Login")
-
-    users = load_users()
-
-    email = st.text_input(" Email", key="login_email_input")
-    password = st.text_input(" Password", type="password", key="login_password_input")
-
-    global OTP_CODE
-    col1, col2, col3 = st.columns([5, 1, 1])
-    
-    with col1:
-        if st.button("Send OTP to Login "):
-            if email in users:
-                user_data = users[email]
-                stored_password = user_data.get('password', '')
-                
-                if check_password(password, stored_password):
-                    st.session_state.login_email = email
-                    st.session_state.login_pass = password
-                    
-                    OTP_CODE = send_otp(email, "Login OTP")
-                    if OTP_CODE:
-                        st.session_state.login_otp_sent = True
-                        st.success("✅ OTP sent to your email.")
-                else:
-                    st.error("❌ Invalid email or password")
-            else:
-                st.error("❌ Invalid email or password")
-        
-        # Move Debug Login button HERE (inside col1)
-        if st.button("Debug Login"):
-            st.session_state.logged_in = True
-            st.session_state.email = "Debugger@email.com"
-            st.success("✅ Login successful!")
-            st.rerun()
-
-    if st.session_state.get("login_otp_sent"):
-        login_otp_input = st.text_input("🔢 Enter OTP for Login", key="otp_login")
-        if st.button("Login"):
-            if login_otp_input == OTP_CODE:
-                st.session_state.logged_in = True
-                st.session_state.email = st.session_state.login_email
-                st.success("✅ Login successful!")
-                st.rerun()
-            else:
-                st.error("❌ Incorrect OTP")
-
-    with col2:
-        st.markdown("Don't have an account?")
-    with col3:
-        if st.button("Go to Register →"):
-            st.session_state.page = "Register"
-            st.rerun()
-    
-
-    
-def register_ui():
-    add_bg_logo()
-    st.title(" Register")
-
-    users = load_users()
-    reg_email = st.text_input(" New Supervisor Email", key="reg_email")
-    reg_pass = st.text_input(" New Supervisor Password", type="password", key="reg_pass")
-    reg_api_key = st.text_input(" Gmail API Key", type="password", key="reg_api_key")
-    reg_sender_email = st.text_input(" Sender Gmail Address", key="reg_sender_email")
-    
-    col1, col2, col3 = st.columns([4, 1, 1])
-    
-    # First registration (no users exist)
-    if not users:
-        if st.button("Register First Supervisor"):
-            if reg_email and reg_pass and reg_api_key and reg_sender_email:
-                users[reg_email] = {
-                    'password': hash_password(reg_pass),
-                    'api_key': reg_api_key,
-                    'email': reg_sender_email
-                }
-                save_users(users)
-                st.success("✅ First supervisor registered successfully!")
-                st.session_state.logged_in = True
-                st.session_state.email = reg_email
-                st.rerun()
-            else:
-                st.warning("⚠️ Please complete all fields")
-    else:
-        # Subsequent registrations (require OTP)
-        old_email = list(users.keys())[0]
-        with col1:
-            if st.button("Send OTP to Current Supervisor Email"):
-                if old_email in users:
-                    # Handle both old and new user formats
-                    user_data = users[old_email]
-                    api_key = user_data if isinstance(user_data, str) else user_data.get('api_key', '')
-                    sender_email = user_data if isinstance(user_data, str) else user_data.get('email', '')
-                    
-                    if api_key and sender_email:
-                        OTP_CODE = send_otp(old_email, "Supervisor Replacement OTP")
-                        if OTP_CODE:
-                            st.session_state["reg_otp_sent"] = True
-                            st.session_state["reg_otp_code"] = OTP_CODE
-                            st.success(f"✅ OTP sent successfully to current supervisor ({old_email})")
-                    else:
-                        st.warning("⚠️ Current supervisor credentials not configured properly")
-
-        if st.session_state.get("reg_otp_sent"):
-            reg_otp_input = st.text_input("🔢 Enter OTP to Confirm Replacement", key="otp_register")
-            if st.button("Confirm & Register New Supervisor"):
-                if reg_otp_input == st.session_state.get("reg_otp_code"):
-                    if reg_email and reg_pass and reg_api_key and reg_sender_email:
-                        users.clear()
-                        users[reg_email] = {
-                            'password': hash_password(reg_pass),
-                            'api_key': reg_api_key,
-                            'email': reg_sender_email
-                        }
-                        save_users(users)
-                        st.success("✅ New supervisor registered successfully and old supervisor removed.")
-                        st.session_state.reg_otp_sent = False
-                        st.session_state.logged_in = True
-                        st.session_state.email = reg_email
-                        st.rerun()
-                    else:
-                        st.warning(" Please complete all fields before confirming.")
-                else:
-                    st.error(" Incorrect OTP")
-    
-    with col2:
-        st.markdown("Already have an account?")
-    with col3:
-        if st.button("← Back to Login"):
-            st.session_state.page = "Login"
+import time
+import streamlit as st
+import uuid
+from email.message import EmailMessage
+from user_store import get_user_store
+from mailer import get_mailer
+from assets import background_logo_css
+from passwords import hash_password, hash_password_async, verify_password, verify_password_async
+from otp import OTP_EXPIRED, OTP_LOCKED, OTP_MISSING, OTP_OK, get_otp_manager
+
+
+def add_bg_logo():
+    # Encoded once and served from memory until logo.png changes
+    try:
+        css = background_logo_css("logo.png")
+        if css:
+            st.markdown(css, unsafe_allow_html=True)
+    except Exception as e:
+        st.warning(f"Couldn't load background logo: {e}")
+
+LOGIN_CHECK_INTERVAL = 0.25  # seconds between polls while a password is being verified
+
+def load_users():
+    # Served from the store's in-memory index; the file is only re-parsed after it changes
+    return get_user_store().all()
+
+def save_users(users):
+    # Locked, atomic replace of the whole user set
+    get_user_store().replace_all(users)
+
+def check_password(plain, hashed):
+    return verify_password(plain, hashed)[0]
+
+def upgrade_password_hash(email, password, old_hash):
+    """Re-hash a legacy or outdated password in the background after a successful login"""
+    def store(future):
+        try:
+            new_hash = future.result()
+
+            def change(users):
+                # Skip if the password was changed while we were hashing
+                user_data = users.get(email)
+                if user_data is not None and user_data.get('password') == old_hash:
+                    users[email] = {**user_data, 'password': new_hash}
+
+            get_user_store().update(change)
+        except Exception as e:
+            print(f"Error upgrading password hash: {str(e)}")
+
+    hash_password_async(password).add_done_callback(store)
+
+def session_id():
+    """Stable id for this browser session, used to key its OTPs"""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def send_otp(recipient_email, subject="OTP Verification", purpose="login"):
+    # Get API key from user data
+    user_data = get_user_store().get(recipient_email)
+    
+    # Check if recipient_email exists in users (not session state)
+    if user_data is None:
+        st.error("User not found")
+        return None
+    
+    # Get sender credentials from the recipient's user data
+    sender_email = user_data.get('email', '')
+    sender_pass = user_data.get('api_key', '')
+    
+    if not sender_email or not sender_pass:
+        st.error("Sender credentials not configured")
+        return None
+    
+    # Kept per session and email, so concurrent logins never overwrite each other's code
+    otp = get_otp_manager().issue(session_id(), recipient_email, purpose)
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = sender_email
+    msg["To"] = recipient_email
+    msg.set_content(f"Your OTP is: {otp}")
+
+    try:
+        # Delivered by the mailer's background sender over a pooled connection; the page does not wait
+        st.session_state.otp_delivery = get_mailer().send(msg, sender_email, sender_pass)
+        return otp
+    except Exception as e:
+        get_otp_manager().discard(session_id(), recipient_email, purpose)
+        st.error(f"❌ Failed to send OTP: {e}")
+        return None
+
+def check_otp(email, code, purpose):
+    """Verify an entered OTP and show why it was rejected; True when it matched"""
+    manager = get_otp_manager()
+    status = manager.verify(session_id(), email, code, purpose)
+    if status == OTP_OK:
+        return True
+    if status == OTP_EXPIRED:
+        st.error("❌ OTP expired, please request a new one")
+    elif status == OTP_LOCKED:
+        st.error("❌ Too many incorrect attempts, please request a new OTP")
+    elif status == OTP_MISSING:
+        st.error("❌ No active OTP, please request a new one")
+    else:
+        st.error(f"❌ Incorrect OTP ({manager.attempts_left(session_id(), email, purpose)} attempts left)")
+    return False
+
+def show_otp_delivery():
+    """Report an OTP email that failed after send_otp returned"""
+    delivery = st.session_state.get("otp_delivery")
+    if delivery is not None and delivery.failed:
+        st.error(f"❌ Failed to send OTP: {delivery.error}")
+        del st.session_state.otp_delivery
+
+@st.fragment(run_every=LOGIN_CHECK_INTERVAL)
+def wait_for_login_check():
+    # Reruns the page once the password check started by login_ui has finished
+    check = st.session_state.get("login_check")
+    if check is None or check['result'].done():
+        st.rerun()
+
+def finish_login_check():
+    check = st.session_state.login_check
+    if not check['result'].done():
+        st.info("Checking password...")
+        wait_for_login_check()
+        return
+    del st.session_state.login_check
+    matches, needs_upgrade = check['result'].result()
+    if not matches:
+        st.error("❌ Invalid email or password")
+        return
+    if needs_upgrade:
+        upgrade_password_hash(check['email'], check['password'], check['stored'])
+    st.session_state.login_email = check['email']
+    st.session_state.login_pass = check['password']
+
+    if send_otp(check['email'], "Login OTP", "login"):
+        st.session_state.login_otp_sent = True
+        st.success("✅ OTP sent to your email.")
+
+def login_ui():
+    add_bg_logo()
+    st.title(" Login")
+
+    users = load_users()
+
+    email = st.text_input(" Email", key="login_email_input")
+    password = st.text_input(" Password", type="password", key="login_password_input")
+
+    col1, col2, col3 = st.columns([5, 1, 1])
+    
+    with col1:
+        if st.button("Send OTP to Login "):
+            if email in users:
+                user_data = users[email]
+                stored_password = user_data.get('password', '')
+
+                # scrypt runs on the hashing pool; the page polls for the result instead of waiting on it
+                st.session_state.login_check = {
+                    'email': email,
+                    'password': password,
+                    'stored': stored_password,
+                    'result': verify_password_async(password, stored_password)
+                }
+            else:
+                st.error("❌ Invalid email or password")
+        if st.session_state.get("login_check") is not None:
+            finish_login_check()
+        
+        # Move Debug Login button HERE (inside col1)
+        if st.button("Debug Login"):
+            st.session_state.logged_in = True
+            st.session_state.email = "Debugger@email.com"
+            st.success("✅ Login successful!")
+            st.rerun()
+
+    show_otp_delivery()
+    if st.session_state.get("login_otp_sent"):
+        login_otp_input = st.text_input("🔢 Enter OTP for Login", key="otp_login")
+        if st.button("Login"):
+            if check_otp(st.session_state.login_email, login_otp_input, "login"):
+                st.session_state.logged_in = True
+                st.session_state.email = st.session_state.login_email
+                st.success("✅ Login successful!")
+                st.rerun()
+
+    with col2:
+        st.markdown("Don't have an account?")
+    with col3:
+        if st.button("Go to Register →"):
+            st.session_state.page = "Register"
+            st.rerun()
+    
+
+    
+def register_ui():
+    add_bg_logo()
+    st.title(" Register")
+
+    users = load_users()
+    reg_email = st.text_input(" New Supervisor Email", key="reg_email")
+    reg_pass = st.text_input(" New Supervisor Password", type="password", key="reg_pass")
+    reg_api_key = st.text_input(" Gmail API Key", type="password", key="reg_api_key")
+    reg_sender_email = st.text_input(" Sender Gmail Address", key="reg_sender_email")
+    
+    col1, col2, col3 = st.columns([4, 1, 1])
+    
+    # First registration (no users exist)
+    if not users:
+        if st.button("Register First Supervisor"):
+            if reg_email and reg_pass and reg_api_key and reg_sender_email:
+                users[reg_email] = {
+                    'password': hash_password(reg_pass),
+                    'api_key': reg_api_key,
+                    'email': reg_sender_email
+                }
+                save_users(users)
+                st.success("✅ First supervisor registered successfully!")
+                st.session_state.logged_in = True
+                st.session_state.email = reg_email
+                st.rerun()
+            else:
+                st.warning("⚠️ Please complete all fields")
+    else:
+        # Subsequent registrations (require OTP)
+        old_email = list(users.keys())[0]
+        with col1:
+            if st.button("Send OTP to Current Supervisor Email"):
+                if old_email in users:
+                    # Handle both old and new user formats
+                    user_data = users[old_email]
+                    api_key = user_data if isinstance(user_data, str) else user_data.get('api_key', '')
+                    sender_email = user_data if isinstance(user_data, str) else user_data.get('email', '')
+                    
+                    if api_key and sender_email:
+                        if send_otp(old_email, "Supervisor Replacement OTP", "register"):
+                            st.session_state["reg_otp_sent"] = True
+                            st.session_state["reg_otp_email"] = old_email
+                            st.success(f"✅ OTP sent successfully to current supervisor ({old_email})")
+                    else:
+                        st.warning("⚠️ Current supervisor credentials not configured properly")
+
+        show_otp_delivery()
+        if st.session_state.get("reg_otp_sent"):
+            reg_otp_input = st.text_input("🔢 Enter OTP to Confirm Replacement", key="otp_register")
+            if st.button("Confirm & Register New Supervisor"):
+                # Fields are checked first so an incomplete form does not use up the single-use code
+                if not (reg_email and reg_pass and reg_api_key and reg_sender_email):
+                    st.warning(" Please complete all fields before confirming.")
+                elif check_otp(st.session_state.get("reg_otp_email", old_email), reg_otp_input, "register"):
+                    users.clear()
+                    users[reg_email] = {
+                        'password': hash_password(reg_pass),
+                        'api_key': reg_api_key,
+                        'email': reg_sender_email
+                    }
+                    save_users(users)
+                    st.success("✅ New supervisor registered successfully and old supervisor removed.")
+                    st.session_state.reg_otp_sent = False
+                    st.session_state.logged_in = True
+                    st.session_state.email = reg_email
+                    st.rerun()
+    
+    with col2:
+        st.markdown("Already have an account?")
+    with col3:
+        if st.button("← Back to Login"):
+            st.session_state.page = "Login"
             st.rerun()
\ No newline at end of file
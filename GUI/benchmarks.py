@@ -0,0 +1,580 @@
+"""Benchmarks for the dashboard's data paths, run against fake_drive
+
+    python benchmarks.py listing startup snapshot store aggregates charts tables periods users mail passwords otp assets
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import smtplib
+from email.message import EmailMessage
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import pandas as pd
+from PIL import Image
+
+from drive import DriveService
+from fake_drive import FakeDrive, build_fake_system
+from fake_smtp import FakeSMTPServer
+from mailer import Mailer
+from otp import OTP_EXPIRED, OTP_INVALID, OTP_LOCKED, OTP_MISSING, OTP_OK, OTPManager
+from passwords import COST_PRESETS, PasswordHasher, ScryptHasher, Sha256Hasher
+from aggregates import AggregateIndex
+from assets import BG_LOGO_WIDTH, PAGE_ICON_SIZE, SIDEBAR_LOGO_WIDTH, AssetCache, _background_css, _file_bytes, _icon, _png_bytes
+from charts import ChartRenderer, combo_chart, single_chart
+from report import build_report_charts, report_bounds
+from report_periods import ReportSections, period_range, slice_report_data
+from snapshot_cache import SnapshotCache
+from tables import TableWriter, table_frame, write_table
+from user_store import JsonUserStore, SqliteUserStore
+from violation_store import ViolationStore
+
+
+def make_service(days, state_dir, files_per_day=3, latency=0.0, shared=True, drive=None, **kwargs):
+    """Build a DriveService over a freshly populated (or the given) fake Drive"""
+    if drive is None:
+        drive = FakeDrive()
+        build_fake_system(drive, 'Bench_System', 'bench_metadata.json', days, files_per_day,
+                          shared=shared)
+    drive.latency = latency
+    service = DriveService('Bench_System', 'bench_metadata.json', service=drive,
+                           sa_email=drive.service_account_email,
+                           snapshot_cache=SnapshotCache(os.path.join(state_dir, 'snapshots.sqlite3')),
+                           **kwargs)
+    return drive, service
+
+
+def bench_listing(folder_counts=(50, 150, 300), worker_counts=(1, 4, 8, 16), latency=0.02):
+    """Wall-clock time of the per-folder listing by folder count and worker count"""
+    print(f"Date folder listing, {latency * 1000:.0f} ms injected latency per request")
+    print(f"{'folders':>8} {'workers':>8} {'seconds':>9} {'requests':>9}")
+    for folders in folder_counts:
+        for workers in worker_counts:
+            with tempfile.TemporaryDirectory() as state_dir:
+                drive, service = make_service(folders, state_dir, list_workers=workers)
+                drive.latency = latency
+                drive.calls.clear()
+                start = time.perf_counter()
+                records = service._list_date_folders(service.metadata['date_folders'])
+                elapsed = time.perf_counter() - start
+                assert len(records) == folders
+                print(f"{folders:>8} {workers:>8} {elapsed:>9.2f} {drive.total_calls():>9}")
+
+
+def bench_startup(day_counts=(100, 300), batch_sizes=(1, 20, 100), latency=0.02):
+    """DriveService construction time with metadata enrichment and permission repair"""
+    print(f"Cold start with every folder needing a permission fix, {latency * 1000:.0f} ms per request")
+    print(f"{'days':>6} {'batch':>6} {'seconds':>9} {'round trips':>12}")
+    for days in day_counts:
+        for batch_size in batch_sizes:
+            with tempfile.TemporaryDirectory() as state_dir:
+                start = time.perf_counter()
+                drive, service = make_service(days, state_dir, latency=latency, shared=False,
+                                              batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+                assert all(f['accessible'] for f in service.metadata['date_folders'].values())
+                print(f"{days:>6} {batch_size:>6} {elapsed:>9.2f} {drive.total_calls():>12}")
+
+
+def bench_snapshot(day_counts=(365, 1095, 1825), latency=0.05):
+    """Time to first dates on a cold start versus a start from the local snapshot"""
+    print(f"Time until get_available_dates() returns, {latency * 1000:.0f} ms per request")
+    print(f"{'days':>6} {'cold s':>9} {'warm s':>9} {'snapshot KB':>12}")
+    for days in day_counts:
+        with tempfile.TemporaryDirectory() as state_dir:
+            start = time.perf_counter()
+            drive, service = make_service(days, state_dir, latency=latency)
+            service.get_available_dates()
+            cold = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            _, warm_service = make_service(days, state_dir, latency=latency, drive=drive)
+            dates = warm_service.get_available_dates()
+            warm = time.perf_counter() - start
+            assert len(dates) == days
+            warm_service.revalidated.wait()
+            size = os.path.getsize(os.path.join(state_dir, 'snapshots.sqlite3')) / 1024
+            print(f"{days:>6} {cold:>9.2f} {warm:>9.3f} {size:>12.0f}")
+
+
+def _legacy_month_based_week(date_obj):
+    month_start = date_obj.replace(day=1)
+    first_saturday = month_start
+    while first_saturday.weekday() != 5:
+        first_saturday += timedelta(days=1)
+    if date_obj < first_saturday:
+        week_num = 1
+    else:
+        week_num = (date_obj - first_saturday).days // 7 + 1
+    return f"{date_obj.strftime('%Y-%m')}-W{week_num:02d}"
+
+
+def _legacy_worker_frames(dates):
+    """The row-by-row load_violation_data path the store replaced"""
+    mask_data, gloves_data = [], []
+    for d in dates:
+        date_obj = datetime.strptime(d['display_date'], "%m/%d/%Y")
+        for rows, column in ((mask_data, 'mask_count'), (gloves_data, 'gloves_count')):
+            rows.append({
+                'display_date': d['display_date'],
+                'date': date_obj,
+                'violations_count': d.get(column, 0),
+                'month': date_obj.strftime('%Y-%m'),
+                'week': _legacy_month_based_week(date_obj),
+                'folder_id': d['folder_id']
+            })
+    return pd.DataFrame(mask_data), pd.DataFrame(gloves_data)
+
+
+def _store_worker_frames(dates):
+    store = ViolationStore(dates)
+    return store.mask(), store.gloves()
+
+
+def _fake_date_records(days):
+    start = datetime(2000, 1, 1)
+    return [{
+        'display_date': (start + timedelta(days=i)).strftime("%m/%d/%Y"),
+        'folder_id': f"folder{i}",
+        'mask_count': i % 7, 'gloves_count': i % 5,
+        'images_uploaded': i % 11, 'videos_count': i % 2
+    } for i in reversed(range(days))]
+
+
+def bench_store(days=10000, repeat=3):
+    """Worker frame construction: row-by-row dicts versus the columnar store"""
+    dates = _fake_date_records(days)
+    legacy = _legacy_worker_frames(dates)
+    columnar = _store_worker_frames(dates)
+    for old, new in zip(legacy, columnar):
+        assert (old['week'] == new['week'].astype(str)).all()
+        assert (old['violations_count'] == new['violations_count']).all()
+
+    print(f"Building mask and gloves frames for {days} dates")
+    print(f"{'path':>10} {'seconds':>9} {'peak MB':>9} {'frames MB':>10}")
+    for name, build in (('legacy', _legacy_worker_frames), ('columnar', _store_worker_frames)):
+        elapsed = min(_timed(build, dates) for _ in range(repeat))
+        tracemalloc.start()
+        frames = build(dates)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        size = sum(f.memory_usage(deep=True).sum() for f in frames) / 2**20
+        print(f"{name:>10} {elapsed:>9.3f} {peak:>9.1f} {size:>10.1f}")
+
+
+def _groupby_render(df):
+    """What calculate_metrics and render_trend_charts recomputed on every rerun"""
+    monthly = df.groupby('month', observed=True)['violations_count'].sum().reset_index()
+    weekly = df.groupby('week', observed=True)['violations_count'].sum().reset_index()
+    weekly['week_label'] = weekly['week'].astype(str).apply(
+        lambda x: f"{x.split('-')[0]}-{x.split('-')[1]} Week {int(x.split('-W')[1])}")
+    current_week = df[df['week'] == df['week'].iloc[0]]['violations_count'].sum()
+    return df['violations_count'].sum(), monthly['violations_count'].max(), \
+        weekly['violations_count'].max(), current_week, df.sort_values('date')
+
+
+def _index_render(index):
+    return (index.total, index.worst_month, index.worst_week, index.current_week_count(),
+            index.daily_frame(), index.monthly_frame(), index.weekly_frame())
+
+
+def bench_aggregates(day_counts=(365, 1825, 3650), repeat=20):
+    """Metric cards and chart frames: regrouping per rerun versus an AggregateIndex"""
+    print(f"{'days':>6} {'groupby ms':>11} {'index ms':>9} {'build ms':>9} {'refresh ms':>11}")
+    for days in day_counts:
+        df = ViolationStore(_fake_date_records(days)).mask()
+        index = AggregateIndex(df)
+        _index_render(index)
+        # A sync that bumps one day's count
+        updated = df.copy()
+        updated.loc[updated.index[0], 'violations_count'] += 1
+        assert index.copy().refresh(updated).total == updated['violations_count'].sum()
+
+        groupby = min(_timed(_groupby_render, df) for _ in range(repeat))
+        reread = min(_timed(_index_render, index) for _ in range(repeat))
+        build = min(_timed(AggregateIndex, df) for _ in range(repeat))
+        refresh = min(_timed(lambda: index.copy().refresh(updated)) for _ in range(repeat))
+        print(f"{days:>6} {groupby * 1000:>11.2f} {reread * 1000:>9.3f} "
+              f"{build * 1000:>9.2f} {refresh * 1000:>11.2f}")
+
+
+def _report_chart_specs(days):
+    """The report's nine charts (daily/weekly/monthly per section) over fake data"""
+    store = ViolationStore(_fake_date_records(days))
+    series = {'mask': store.mask(), 'gloves': store.gloves(), 'incidents': store.incidents()}
+    specs = {}
+    for freq, name in (('D', 'daily'), ('W', 'weekly'), ('M', 'monthly')):
+        frames = {}
+        for key, df in series.items():
+            grouped = df.groupby(df['date'].dt.to_period(freq))
+            frames[key] = grouped.agg({'violations_count': 'sum', 'date': 'first'})
+        specs[f"worker_{name}"] = combo_chart(frames['mask'], frames['gloves'],
+                                              f"{name} worker", "Mask", "Gloves")
+        specs[f"fallen_{name}"] = single_chart(frames['incidents'], f"{name} fallen", '#ff7f0e')
+        specs[f"empty_{name}"] = single_chart(frames['incidents'], f"{name} empty", '#2ca02c')
+    return specs
+
+
+def bench_charts(days=365, worker_counts=(1, 4)):
+    """Report charts: serial versus process pool, cold versus warm PNG cache"""
+    specs = _report_chart_specs(days)
+    print(f"Rendering {len(specs)} report charts over {days} days")
+    print(f"{'workers':>8} {'cold s':>8} {'warm s':>8} {'slowest chart ms':>17}")
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            renderer = ChartRenderer(cache_dir=cache_dir, workers=workers)
+            if workers > 1:
+                # Start the pool outside the timing, as the dashboard keeps it alive
+                renderer._executor().submit(int).result()
+            cold = _timed(renderer.render, specs)
+            slowest = max(t['seconds'] for t in renderer.last_timings.values())
+            warm = _timed(renderer.render, specs)
+            assert all(t['cached'] for t in renderer.last_timings.values())
+            renderer.close()
+        print(f"{workers:>8} {cold:>8.2f} {warm:>8.3f} {slowest * 1000:>17.0f}")
+
+
+def _legacy_add_custom_table(pdf, df):
+    """add_custom_table as it was: one iterrows() pass with per-row formatting"""
+    df = df.sort_values('date', ascending=False)
+    df['running_total'] = df['violations_count'].cumsum()
+    pdf.set_fill_color(200, 200, 200)
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(60, 10, 'Date', border=1, fill=True)
+    pdf.cell(40, 10, 'Count', border=1, fill=True)
+    pdf.cell(40, 10, 'Running Total', border=1, fill=True, ln=1)
+    pdf.set_font('Arial', '', 9)
+    fill = False
+    for _, row in df.iterrows():
+        pdf.set_fill_color(240, 240, 240) if fill else pdf.set_fill_color(255, 255, 255)
+        pdf.cell(60, 10, row['date'].strftime('%Y-%m-%d'), border=1, fill=fill)
+        pdf.cell(40, 10, str(row['violations_count']), border=1, fill=fill)
+        pdf.cell(40, 10, str(row['running_total']), border=1, fill=fill, ln=1)
+        fill = not fill
+
+
+def bench_tables(row_counts=(5000, 50000)):
+    """Detailed records table: iterrows loop versus the chunked writer and its layouts"""
+    from fpdf import FPDF
+
+    def run(write, df):
+        pdf = FPDF()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.add_page()
+        write(pdf, df)
+        with tempfile.TemporaryDirectory() as out_dir:
+            pdf.output(os.path.join(out_dir, 'table.pdf'))
+        return pdf.page
+
+    writers = {
+        'iterrows': _legacy_add_custom_table,
+        'chunked': lambda pdf, df: TableWriter(pdf).write(table_frame(df)),
+        'compact': lambda pdf, df: TableWriter(pdf, compact=True).write(table_frame(df)),
+    }
+    print(f"{'rows':>6} {'writer':>9} {'seconds':>8} {'peak MB':>8} {'pages':>6}")
+    for rows in row_counts:
+        df = ViolationStore(_fake_date_records(rows)).mask()
+        with tempfile.TemporaryDirectory() as appendix_dir:
+            writers['appendix'] = lambda pdf, df: write_table(pdf, df, os.path.join(appendix_dir, 'mask'))
+            for name, write in writers.items():
+                tracemalloc.start()
+                start = time.perf_counter()
+                pages = run(write, df)
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+                print(f"{rows:>6} {name:>9} {elapsed:>8.2f} {peak:>8.1f} {pages:>6}")
+
+
+def bench_periods(day_counts=(3650, 36500), repeat=5):
+    """Report data preparation (slice, week sections, chart specs) by period length"""
+    print(f"{'days':>6} {'period':>8} {'cold ms':>8} {'warm ms':>8}")
+    for days in day_counts:
+        store = ViolationStore(_fake_date_records(days))
+        data = {'Worker Safety': {'mask': store.mask(), 'gloves': store.gloves()},
+                'Fallen Objects': store.incidents(), 'Empty Bottles': store.incidents()}
+        latest = store.frame['date'].iloc[0]
+        ranges = {period: period_range(period, latest) for period in ('week', 'month', 'quarter')}
+        ranges['all'] = report_bounds(data)
+
+        def prepare(sections, start, end):
+            sliced = slice_report_data(data, start, end)
+            build_report_charts(sliced, sections.build(sliced, start, end))
+
+        for period, (start, end) in ranges.items():
+            if period == 'all' and days > 10000:
+                continue
+            cold = min(_timed(prepare, ReportSections(), start, end) for _ in range(repeat))
+            cache = ReportSections()
+            prepare(cache, start, end)
+            warm = min(_timed(prepare, cache, start, end) for _ in range(repeat))
+            print(f"{days:>6} {period:>8} {cold * 1000:>8.1f} {warm * 1000:>8.1f}")
+
+
+def _legacy_load_users(path):
+    """auth.load_users as it was: read and parse the whole file on every call"""
+    with open(path, "r") as f:
+        data = f.read()
+    return json.loads(data) if data.strip() else {}
+
+
+def _register_users(path, backend, worker, count):
+    store = JsonUserStore(path) if backend == 'json' else SqliteUserStore(path, import_from=None)
+    for i in range(count):
+        store.put(f"user{worker}_{i}@example.com", {'password': 'x' * 64, 'api_key': 'k', 'email': 'e'})
+
+
+def bench_users(user_counts=(10, 10000), reads=200, writers=4, writes_per_writer=50):
+    """Auth page reads (legacy parse versus indexed stores) and concurrent registrations"""
+    print(f"{'users':>6} {'backend':>8} {'read us':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in user_counts:
+            users = {f"user{i}@example.com": {'password': 'x' * 64, 'api_key': 'k', 'email': 'e'}
+                     for i in range(count)}
+            json_path = os.path.join(tmp, f"users_{count}.json")
+            JsonUserStore(json_path).replace_all(users)
+            stores = {
+                'json': JsonUserStore(json_path),
+                'sqlite': SqliteUserStore(os.path.join(tmp, f"users_{count}.sqlite3"), import_from=json_path)
+            }
+            legacy = min(_timed(_legacy_load_users, json_path) for _ in range(reads))
+            print(f"{count:>6} {'legacy':>8} {legacy * 1e6:>9.1f}")
+            for name, store in stores.items():
+                store.get("user0@example.com")
+                read = min(_timed(store.get, "user0@example.com") for _ in range(reads))
+                print(f"{count:>6} {name:>8} {read * 1e6:>9.1f}")
+
+        # Several processes registering at once must not lose or corrupt records
+        print(f"{writers} processes x {writes_per_writer} registrations")
+        for backend in ('json', 'sqlite'):
+            path = os.path.join(tmp, f"concurrent.{backend}")
+            start = time.perf_counter()
+            processes = [multiprocessing.Process(target=_register_users,
+                                                 args=(path, backend, w, writes_per_writer))
+                         for w in range(writers)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+            elapsed = time.perf_counter() - start
+            store = JsonUserStore(path) if backend == 'json' else SqliteUserStore(path, import_from=None)
+            print(f"{backend:>8}: {len(store)}/{writers * writes_per_writer} users after {elapsed:.2f}s")
+
+
+def _otp_message(i):
+    msg = EmailMessage()
+    msg["Subject"] = "Login OTP"
+    msg["From"] = "sender@example.com"
+    msg["To"] = f"user{i}@example.com"
+    msg.set_content(f"Your OTP is: {100000 + i}")
+    return msg
+
+
+def bench_mail(messages=20, connect_latency=0.2, send_latency=0.01, drop_after=5):
+    """OTP delivery: a new connection per message on the request path versus the pooled mailer"""
+    server = FakeSMTPServer(connect_latency=connect_latency, send_latency=send_latency).start()
+    try:
+        start = time.perf_counter()
+        for i in range(messages):
+            with smtplib.SMTP(server.host, server.port) as smtp:
+                smtp.login("sender@example.com", "secret")
+                smtp.send_message(_otp_message(i))
+        legacy = time.perf_counter() - start
+        print(f"per-message connection: {legacy / messages * 1000:.0f} ms blocked per OTP, "
+              f"{messages / legacy:.1f} msg/s, {server.connections} connections")
+
+        connections = server.connections
+        mailer = Mailer(server.host, server.port, use_ssl=False)
+        start = time.perf_counter()
+        handles = [mailer.send(_otp_message(i), "sender@example.com", "secret") for i in range(messages)]
+        blocked = (time.perf_counter() - start) / messages
+        assert all(handle.wait(30) for handle in handles)
+        stats = mailer.stats()
+        print(f"pooled mailer: {blocked * 1e6:.0f} us blocked per OTP, {stats['per_second']:.1f} msg/s, "
+              f"p95 {stats['latency_p95'] * 1000:.0f} ms, {server.connections - connections} connections")
+        mailer.close()
+    finally:
+        server.stop()
+
+    # The server hangs up every few messages; the mailer reconnects and loses nothing
+    server = FakeSMTPServer(drop_after=drop_after).start()
+    try:
+        mailer = Mailer(server.host, server.port, use_ssl=False, threads=1)
+        handles = [mailer.send(_otp_message(i), "sender@example.com", "secret") for i in range(messages)]
+        delivered = sum(handle.wait(30) for handle in handles)
+        stats = mailer.stats()
+        print(f"dropping server: {delivered}/{messages} delivered, {stats['reconnects']} reconnects, "
+              f"{len(server.messages)} received")
+        mailer.close()
+    finally:
+        server.stop()
+
+
+def bench_passwords(costs=tuple(COST_PRESETS), worker_counts=(1, 4), logins=16):
+    """Per-login verify latency and sign-ins per second for legacy SHA-256 and each scrypt cost"""
+    legacy = Sha256Hasher()
+    stored = legacy.hash("correct horse")
+    seconds = _timed(lambda: [legacy.verify("correct horse", stored) for _ in range(10000)]) / 10000
+    print(f"legacy sha256: {seconds * 1e6:.1f} us per login")
+
+    for cost in costs:
+        hasher = PasswordHasher([ScryptHasher(cost), Sha256Hasher()])
+        stored = hasher.hash("correct horse")
+        hasher.verify("correct horse", stored)  # warm up
+        latency = _timed(lambda: [hasher.verify("correct horse", stored) for _ in range(3)]) / 3
+        line = f"scrypt {cost} (n={hasher.hashers[0].n}): {latency * 1000:.0f} ms per login"
+        for workers in worker_counts:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                start = time.perf_counter()
+                results = list(pool.map(lambda _: hasher.verify("correct horse", stored), range(logins)))
+                elapsed = time.perf_counter() - start
+            assert all(ok for ok, _ in results)
+            line += f", {logins / elapsed:.1f} sign-ins/s on {workers} workers"
+        print(line)
+
+    # First login with a legacy hash: verify, then re-hash at the configured cost
+    hasher = PasswordHasher()
+    old_hash = legacy.hash("correct horse")
+    ok, upgrade = hasher.verify("correct horse", old_hash)
+    seconds = _timed(hasher.hash, "correct horse")
+    print(f"legacy upgrade: matched={ok}, needs_upgrade={upgrade}, re-hash {seconds * 1000:.0f} ms off the request path")
+
+
+def bench_otp(sessions=500, threads=32, wrong_guesses=2, entries=100000):
+    """Hundreds of parallel sessions logging in: the old module-global code versus OTPManager"""
+    # Old behaviour: every session writes the same global, so only the last code survives
+    shared = {}
+
+    def legacy_session(i):
+        shared['code'] = f"{i:06d}"
+        time.sleep(0.001)
+        return shared['code'] == f"{i:06d}"
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        logged_in = sum(pool.map(legacy_session, range(sessions)))
+    print(f"module-global code: {logged_in}/{sessions} sessions could log in")
+
+    manager = OTPManager()
+
+    def session(i):
+        session_id, email = f"session-{i}", f"user{i % 50}@example.com"  # emails shared between sessions
+        code = manager.issue(session_id, email)
+        time.sleep(0.001)
+        wrong = f"{(int(code) + 1) % 1000000:06d}"
+        results = [manager.verify(session_id, email, wrong) for _ in range(wrong_guesses)]
+        # Another session's id never sees this code
+        results.append(manager.verify(f"other-{i}", email, code))
+        results.append(manager.verify(session_id, email, code))
+        results.append(manager.verify(session_id, email, code))  # single use
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    expected = [OTP_INVALID] * wrong_guesses + [OTP_MISSING, OTP_OK, OTP_MISSING]
+    correct = sum(r == expected for r in results)
+    print(f"OTPManager: {correct}/{sessions} sessions behaved correctly, {len(manager)} entries left, "
+          f"{sessions * (wrong_guesses + 4) / elapsed:.0f} ops/s on {threads} threads")
+    assert correct == sessions and len(manager) == 0, "OTP sessions interfered with each other"
+
+    # Attempt limit and expiry, on a fake clock
+    now = [0.0]
+    manager = OTPManager(ttl=300, max_attempts=3, clock=lambda: now[0])
+    manager.issue("s", "a@example.com")
+    statuses = [manager.verify("s", "a@example.com", "x") for _ in range(3)]
+    manager.issue("s", "b@example.com")
+    now[0] = 301
+    statuses.append(manager.verify("s", "b@example.com", "000000"))
+    assert statuses == [OTP_INVALID, OTP_INVALID, OTP_LOCKED, OTP_EXPIRED]
+
+    # Abandoned codes: memory per entry, lazy sweep once they expire, and the size cap
+    now[0] = 0.0
+    manager = OTPManager(ttl=300, max_entries=entries, clock=lambda: now[0])
+    tracemalloc.start()
+    for i in range(entries):
+        manager.issue(f"session-{i}", f"user{i}@example.com")
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    now[0] = 301
+    sweep = _timed(manager.issue, "late", "late@example.com")
+    for i in range(entries + 100):
+        manager.issue(f"again-{i}", "x@example.com")
+    print(f"{entries} abandoned codes: {size / entries:.0f} bytes each, swept in {sweep * 1000:.0f} ms "
+          f"on the next issue; size capped at {len(manager)}")
+
+
+def bench_assets(repeat=20):
+    """Per-rerun cost of the logos, page icon and alert sound: re-encoding each time versus AssetCache"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    bg_logo, logo, sound = (os.path.join(here, name) for name in ("logo.png", "logo1.png", "alert.wav"))
+
+    def legacy_rerun():
+        # add_bg_logo: open, convert, re-encode, base64
+        img = Image.open(bg_logo).convert('RGBA')
+        buffered = BytesIO()
+        img.save(buffered, format="PNG")
+        base64.b64encode(buffered.getvalue()).decode()
+        # display_logo / page_icon: Streamlit re-encodes the full-size image it is handed
+        for _ in range(2):
+            buffered = BytesIO()
+            Image.open(logo).save(buffered, format="PNG")
+        with open(sound, "rb") as f:
+            f.read()
+
+    cache = AssetCache()
+
+    def cached_rerun():
+        cache.get(bg_logo, _background_css, BG_LOGO_WIDTH)
+        cache.get(logo, _png_bytes, SIDEBAR_LOGO_WIDTH)
+        cache.get(logo, _icon, PAGE_ICON_SIZE)
+        cache.get(sound, _file_bytes)
+
+    legacy = _timed(lambda: [legacy_rerun() for _ in range(repeat)]) / repeat
+    first = _timed(cached_rerun)
+    cached = _timed(lambda: [cached_rerun() for _ in range(repeat * 50)]) / (repeat * 50)
+    print(f"re-encode every rerun: {legacy * 1000:.1f} ms; asset cache: first {first * 1000:.1f} ms, "
+          f"then {cached * 1e6:.1f} us per rerun ({legacy / cached:.0f}x)")
+    sizes = [len(cache.get(logo, _png_bytes, SIDEBAR_LOGO_WIDTH)), os.path.getsize(logo)]
+    print(f"sidebar logo: {sizes[0] // 1024} KB served instead of {sizes[1] // 1024} KB")
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+BENCHMARKS = {
+    'listing': bench_listing,
+    'startup': bench_startup,
+    'snapshot': bench_snapshot,
+    'store': bench_store,
+    'aggregates': bench_aggregates,
+    'charts': bench_charts,
+    'tables': bench_tables,
+    'periods': bench_periods,
+    'users': bench_users,
+    'mail': bench_mail,
+    'passwords': bench_passwords,
+    'otp': bench_otp,
+    'assets': bench_assets,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+        print()
@@ -0,0 +1,238 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CHART_CACHE_DIR = ".chart_cache"
+MAX_CACHED_CHARTS = 256
+CHART_WORKERS = min(4, os.cpu_count() or 1)
+# Bump when the drawing code changes so old PNGs are not reused
+STYLE_VERSION = 2
+DPI = 120
+
+# Figure reused by every chart drawn on a thread; report threads may draw in process at once
+_local = threading.local()
+
+
+def combo_chart(df1, df2, title, label1, label2):
+    """Dual-bar comparison chart spec; the second series is shifted right"""
+    return {
+        'title': title,
+        'legend': True,
+        'bars': [
+            _bar(df1, label1, '#1f77b4', width=0.4),
+            _bar(df2, label2, '#ff7f0e', width=0.4, offset_days=0.4)
+        ]
+    }
+
+
+def single_chart(df, title, color):
+    """Single bar chart spec"""
+    return {
+        'title': title,
+        'legend': False,
+        'bars': [_bar(df, None, color, width=0.6)]
+    }
+
+
+def _bar(df, label, color, width, offset_days=0.0):
+    return {
+        'dates': df['date'].to_numpy(dtype='datetime64[ns]'),
+        'counts': df['violations_count'].to_numpy(dtype='int64'),
+        'label': label,
+        'color': color,
+        'width': width,
+        'offset_days': offset_days
+    }
+
+
+def chart_key(spec):
+    """Content hash of a chart: its series, title and styling"""
+    digest = hashlib.sha256()
+    style = {k: v for k, v in spec.items() if k != 'bars'}
+    style['bars'] = [{k: v for k, v in bar.items() if k not in ('dates', 'counts')}
+                     for bar in spec['bars']]
+    style['version'] = STYLE_VERSION
+    style['dpi'] = DPI
+    digest.update(json.dumps(style, sort_keys=True).encode('utf-8'))
+    for bar in spec['bars']:
+        digest.update(bar['dates'].view('int64').tobytes())
+        digest.update(bar['counts'].tobytes())
+    return digest.hexdigest()
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _draw(spec, save_path):
+    """Draw one chart onto this thread's reusable figure; returns seconds spent"""
+    # Figure without pyplot: no GUI backend or global figure registry involved
+    from matplotlib.figure import Figure
+    from PIL import Image
+
+    start = time.perf_counter()
+    fig = getattr(_local, 'figure', None)
+    if fig is None:
+        fig = _local.figure = Figure(figsize=(12, 6))
+    fig.clf()
+    ax = fig.add_subplot()
+    for bar in spec['bars']:
+        dates = bar['dates']
+        if bar['offset_days']:
+            dates = dates + np.timedelta64(int(bar['offset_days'] * 86400e9), 'ns')
+        ax.bar(dates, bar['counts'], width=bar['width'], label=bar['label'],
+               alpha=0.7, color=bar['color'])
+    ax.set_title(spec['title'], pad=20)
+    if spec['legend']:
+        ax.legend()
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(axis='y', alpha=0.3)
+    fig.tight_layout()
+
+    # Stored as RGB: FPDF splits an alpha channel out of a PNG byte by byte, which costs seconds per chart
+    buffer = io.BytesIO()
+    fig.savefig(buffer, dpi=DPI, bbox_inches='tight', format='png', facecolor='white')
+    buffer.seek(0)
+    # Write then rename so a concurrent reader never sees a partial PNG
+    tmp_path = f"{save_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    Image.open(buffer).convert('RGB').save(tmp_path, format='PNG')
+    os.replace(tmp_path, save_path)
+    return time.perf_counter() - start
+
+
+class ChartRenderer:
+    """Renders report charts in a process pool, caching PNGs by content hash
+
+    Charts whose series and styling are unchanged since an earlier report
+    are served from the cache directory without being redrawn. Workers use
+    the Agg backend and keep one figure each, clearing it between charts.
+
+    Paths returned by render() are pinned until release() is called with
+    them, so eviction never removes a PNG a report has yet to embed.
+    """
+    def __init__(self, cache_dir=CHART_CACHE_DIR, workers=CHART_WORKERS,
+                 max_cached=MAX_CACHED_CHARTS):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.max_cached = max_cached
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._pinned = Counter()  # path -> renders still using it
+        self._cache_lock = threading.Lock()
+        self.last_timings = {}
+        self.last_seconds = 0.0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _executor(self):
+        # Reports build on several threads; they must share one pool
+        with self._pool_lock:
+            if self._pool is None:
+                # Forking the threaded Streamlit process can deadlock the children; start them clean
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def render(self, specs):
+        """Render ``{name: spec}`` and return ``{name: png_path}``
+
+        The paths stay pinned until passed to release(). Per-chart timings
+        for the call are kept in ``last_timings`` as
+        ``{name: {'seconds', 'cached', 'key'}}``.
+        """
+        start = time.perf_counter()
+        keys = {name: chart_key(spec) for name, spec in specs.items()}
+        paths = {name: os.path.join(self.cache_dir, f"{key}.png") for name, key in keys.items()}
+        # Pinned before the cache is looked at, so a concurrent evict() cannot remove a hit
+        with self._cache_lock:
+            self._pinned.update(paths.values())
+        try:
+            self._render(specs, keys, paths)
+        except Exception:
+            self.release(paths)
+            raise
+        self.last_seconds = time.perf_counter() - start
+        return paths
+
+    def release(self, paths):
+        """Unpin the paths of a finished render() so they may be evicted again"""
+        with self._cache_lock:
+            self._pinned.subtract(paths.values())
+            for path in [p for p, count in self._pinned.items() if count <= 0]:
+                del self._pinned[path]
+
+    def _render(self, specs, keys, paths):
+        timings = {}
+        pending = {}
+        for name, key in keys.items():
+            path = paths[name]
+            if os.path.exists(path):
+                os.utime(path)
+                timings[name] = {'seconds': 0.0, 'cached': True, 'key': key}
+            elif path in pending.values():
+                # Same content under another name: drawn once
+                timings[name] = {'seconds': 0.0, 'cached': True, 'key': key}
+            else:
+                pending[name] = path
+                timings[name] = {'seconds': None, 'cached': False, 'key': key}
+
+        if pending:
+            if self.workers and self.workers > 1 and len(pending) > 1:
+                try:
+                    pool = self._executor()
+                    futures = {name: pool.submit(_draw, specs[name], path)
+                               for name, path in pending.items()}
+                    for name, future in futures.items():
+                        timings[name]['seconds'] = future.result()
+                except Exception as e:
+                    print(f"Chart pool failed, drawing in process: {str(e)}")
+                    self.close()
+                    self._draw_inline(specs, pending, timings)
+            else:
+                self._draw_inline(specs, pending, timings)
+            self.evict()
+
+        self.last_timings = timings
+
+    @staticmethod
+    def _draw_inline(specs, pending, timings):
+        for name, path in pending.items():
+            if timings[name]['seconds'] is None:
+                timings[name]['seconds'] = _draw(specs[name], path)
+
+    def report_timings(self):
+        """Print the last render's per-chart timings"""
+        for name, timing in self.last_timings.items():
+            status = "cached" if timing['cached'] else f"{timing['seconds'] * 1000:.0f} ms"
+            print(f"Chart {name}: {status}")
+        drawn = sum(1 for t in self.last_timings.values() if not t['cached'])
+        print(f"Rendered {drawn}/{len(self.last_timings)} charts in {self.last_seconds:.2f}s")
+
+    def evict(self):
+        """Keep only the most recently used ``max_cached`` PNGs, never removing pinned ones"""
+        try:
+            entries = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)
+                       if f.endswith('.png')]
+            if len(entries) <= self.max_cached:
+                return
+            entries.sort(key=os.path.getmtime, reverse=True)
+            with self._cache_lock:
+                for path in entries[self.max_cached:]:
+                    if not self._pinned[path]:
+                        os.remove(path)
+        except Exception as e:
+            print(f"Chart cache eviction failed: {str(e)}")
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pandas as pd
+
+from aggregates import AggregateIndex
+
+
+def copy_on_write():
+    """Whether pandas copies shared data before writing to it: always from 3.0, opt-in before"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.get_option('mode.copy_on_write') is True
+
+
+class ViolationDataCache:
+    """Frames per violation type, rebuilt only when the service's data changes
+
+    Entries are keyed by violation type and tagged with the DriveService
+    ``data_version`` they were built from, so a sync that brings new data
+    invalidates them on the next read and reruns in between cost nothing.
+
+    Frames are shared by every session, so callers get copies they may
+    modify freely. Under copy-on-write (always on from pandas 3) these are
+    shallow and cost nothing; otherwise they are deep copies.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._aggregates = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, violation_type, service, build):
+        """Return ``build(dates)`` for the service's current data, building at most once per version"""
+        version = service.data_version
+        with self._lock:
+            entry = self._entries.get(violation_type)
+            if entry is not None and entry['version'] == version:
+                self.hits += 1
+                return self._copies(entry['value'])
+            self.misses += 1
+            if entry is not None:
+                self.invalidations += 1
+
+        value = build(service.get_available_dates())
+        with self._lock:
+            self._entries[violation_type] = {
+                'version': version,
+                'value': value,
+                'built_at': time.time(),
+                'synced_at': service.synced_at
+            }
+        return self._copies(value)
+
+    def get_aggregates(self, violation_type, service, frames):
+        """AggregateIndex per series for the service's current data
+
+        ``frames`` returns ``{series: DataFrame}`` and is only called when the
+        data version moved; existing indexes are then updated with just the
+        changed days instead of being regrouped.
+        """
+        version = service.data_version
+        with self._lock:
+            entry = self._aggregates.get(violation_type)
+            if entry is not None and entry['version'] == version:
+                self.hits += 1
+                return entry['value']
+            self.misses += 1
+
+        previous = entry['value'] if entry is not None else {}
+        indexes = {}
+        for series, df in frames().items():
+            if df is None:
+                continue
+            if series in previous:
+                # Refresh a copy: other sessions may be reading the current one
+                indexes[series] = previous[series].copy().refresh(df)
+            else:
+                indexes[series] = AggregateIndex(df)
+        with self._lock:
+            self._aggregates[violation_type] = {'version': version, 'value': indexes}
+        return indexes
+
+    @staticmethod
+    def _copies(value):
+        # A shallow copy only protects the cached frame when writes copy first
+        deep = not copy_on_write()
+        if isinstance(value, tuple):
+            return tuple(v.copy(deep=deep) if isinstance(v, pd.DataFrame) else v for v in value)
+        return value.copy(deep=deep) if isinstance(value, pd.DataFrame) else value
+
+    def stats(self):
+        """Hit/miss counters and how old each cached entry's data is"""
+        now = time.time()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': {
+                    violation_type: {
+                        'version': entry['version'],
+                        'built_seconds_ago': now - entry['built_at'],
+                        'data_age_seconds': now - entry['synced_at'] if entry['synced_at'] else None
+                    }
+                    for violation_type, entry in self._entries.items()
+                }
+            }
@@ -1,202 +1,751 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from datetime import datetime, timezone
-import json
-import os
-import time
-
-class DriveService:
-    def __init__(self, root_folder_name, metadata_file):
-        """Initialize Google Drive API service with proper credentials"""
-        self.root_folder_name = root_folder_name
-        self.metadata_file = metadata_file
-        
-        # Configuration - Update path to your service account JSON
-        SERVICE_ACCOUNT_FILE = "wide-planet-449115-b2-c6af973cadb6.json"
-        SCOPES = ['https://www.googleapis.com/auth/drive']
-        
-        if not os.path.exists(SERVICE_ACCOUNT_FILE):
-            raise FileNotFoundError(f"Service account file not found at: {SERVICE_ACCOUNT_FILE}")
-        
-        try:
-            self.credentials = service_account.Credentials.from_service_account_file(
-                SERVICE_ACCOUNT_FILE,
-                scopes=SCOPES
-            )
-            
-            self.service = build('drive', 'v3', 
-                              credentials=self.credentials,
-                              static_discovery=False)
-            
-            self.sa_email = self.credentials.service_account_email
-            
-            self.root_folder = self._get_root_folder()
-            self.metadata = self._load_metadata()
-            self._verify_permissions()
-            
-        except Exception as e:
-            raise Exception(f"Drive API initialization failed: {str(e)}")
-
-    def _get_root_folder(self):
-        """Get or create the root folder"""
-        query = f"name='{self.root_folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-        results = self.service.files().list(
-            q=query, 
-            fields="files(id,name)",
-            supportsAllDrives=True
-        ).execute()
-        
-        if results.get('files'):
-            return results['files'][0]
-        
-        folder_metadata = {
-            'name': self.root_folder_name,
-            'mimeType': 'application/vnd.google-apps.folder'
-        }
-        return self.service.files().create(
-            body=folder_metadata, 
-            fields='id,name'
-        ).execute()
-
-    def _load_metadata(self):
-        """Load the metadata file from Drive"""
-        try:
-            query = f"name='{self.metadata_file}' and mimeType='application/json' and '{self.root_folder['id']}' in parents and trashed=false"
-            results = self.service.files().list(
-                q=query, 
-                fields="files(id)",
-                supportsAllDrives=True
-            ).execute()
-            
-            if not results.get('files'):
-                raise FileNotFoundError("No metadata file found in Drive")
-            
-            file_id = results['files'][0]['id']
-            request = self.service.files().get_media(fileId=file_id)
-            metadata = json.loads(request.execute().decode('utf-8'))
-            
-            for date_str, folder_data in metadata['date_folders'].items():
-                try:
-                    folder = self.service.files().get(
-                        fileId=folder_data['folder_id'],
-                        fields='webViewLink,permissions',
-                        supportsAllDrives=True
-                    ).execute()
-                    folder_data.update({
-                        'folder_link': folder.get('webViewLink'),
-                        'accessible': any(
-                            perm.get('emailAddress') == self.sa_email
-                            for perm in folder.get('permissions', [])
-                        )
-                    })
-                except Exception as e:
-                    print(f"Error processing folder {date_str}: {str(e)}")
-                    folder_data['accessible'] = False
-            
-            return metadata
-            
-        except FileNotFoundError:
-            return {
-                'root_folder_id': self.root_folder['id'],
-                'date_folders': {},
-                'created_at': datetime.now(timezone.utc).isoformat()
-            }
-        except Exception as e:
-            raise Exception(f"Metadata loading failed: {str(e)}")
-
-    def _verify_permissions(self):
-        """Ensure service account has access to all folders"""
-        try:
-            for date_str, folder_data in self.metadata['date_folders'].items():
-                if not folder_data.get('accessible', False):
-                    self.service.permissions().create(
-                        fileId=folder_data['folder_id'],
-                        body={
-                            'type': 'user',
-                            'role': 'writer',
-                            'emailAddress': self.sa_email
-                        },
-                        fields='id',
-                        supportsAllDrives=True
-                    ).execute()
-                    time.sleep(0.5)
-                    folder_data['accessible'] = True
-                    
-        except Exception as e:
-            print(f"Permission verification warning: {str(e)}")
-
-    def get_available_dates(self, force_refresh=False, current_date_only=False):
-        """Get dates, optionally filtered to current date only"""
-        if force_refresh or not hasattr(self, '_cached_dates'):
-            self._cached_dates = self._load_fresh_dates()
-        
-        if current_date_only:
-            today = datetime.now().strftime("%m/%d/%Y")
-            return [d for d in self._cached_dates if d['display_date'] == today]
-        
-        return self._cached_dates
-
-    def _load_fresh_dates(self):
-        """Force a fresh load of dates from Drive"""
-        dates = []
-        self.metadata = self._load_metadata()
-        
-        for date_str, folder_data in self.metadata['date_folders'].items():
-            try:
-                query = f"'{folder_data['folder_id']}' in parents and trashed=false"
-                results = self.service.files().list(
-                    q=query,
-                    fields="files(id,mimeType,name)",
-                    supportsAllDrives=True
-                ).execute()
-                
-                items = results.get('files', [])
-                image_count = sum(1 for f in items if 'image' in f.get('mimeType', '').lower())
-                video_count = sum(1 for f in items if 'video' in f.get('mimeType', '').lower())
-                
-                # Count mask and gloves violations
-                mask_count = sum(1 for f in items if 'no-mask' in f.get('name', '').lower())
-                gloves_count = sum(1 for f in items if 'no-gloves' in f.get('name', '').lower())
-                
-                dates.append({
-                    'display_date': folder_data['display_date'],
-                    'folder_link': folder_data.get('folder_link', ''),
-                    'folder_id': folder_data['folder_id'],
-                    'violations_count': image_count,
-                    'images_uploaded': image_count,
-                    'videos_count': video_count,
-                    'mask_count': mask_count,
-                    'gloves_count': gloves_count,
-                    'accessible': True,
-                    'actual_files_count': len(items)
-                })
-                
-            except Exception as e:
-                print(f"Error processing folder {date_str}: {str(e)}")
-                continue
-        
-        return sorted(
-            dates,
-            key=lambda x: datetime.strptime(x['display_date'], "%m/%d/%Y"),
-            reverse=True
-        )
-
-    def share_folder(self, email):
-        """Share the root folder with specified email"""
-        try:
-            permission = {
-                'type': 'user',
-                'role': 'writer',
-                'emailAddress': email
-            }
-            self.service.permissions().create(
-                fileId=self.root_folder['id'],
-                body=permission,
-                fields='id',
-                supportsAllDrives=True,
-                sendNotificationEmail=True
-            ).execute()
-            return True
-        except Exception as e:
-            print(f"Error sharing folder: {str(e)}")
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from snapshot_cache import SnapshotCache
+import google_auth_httplib2
+import httplib2
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+# Bit flags describing what a file contributes to its date folder's counts
+IMAGE_FLAG = 1
+VIDEO_FLAG = 2
+MASK_FLAG = 4
+GLOVES_FLAG = 8
+
+# Keys _load_metadata adds to each date folder entry of the metadata file
+ENRICHED_FIELDS = ('folder_link', 'accessible')
+
+CHANGE_FIELDS = "nextPageToken,newStartPageToken,changes(fileId,removed,file(id,name,mimeType,parents,trashed))"
+
+# Largest page Drive serves for files().list
+LIST_PAGE_SIZE = 1000
+
+# Drive accepts at most 100 calls in one batch request
+BATCH_SIZE = 100
+
+# Date folders listed in parallel during a full load
+LIST_WORKERS = 8
+MAX_RETRIES = 4
+RETRY_BACKOFF = 0.5  # seconds, doubled on every attempt
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+# Drive root folder and metadata file of each violation system
+DRIVE_SYSTEMS = {
+    'worker': ('Safety_Violation_System1', 'violation_metadata.json'),
+    'fallen': ('Fallen_Objects_System', 'fallen_metadata.json'),
+    'empty': ('Empty_Bottles_System', 'empty_bottles_metadata.json')
+}
+
+# Process-wide so versions from a rebuilt service never collide with older ones
+_data_versions = itertools.count(1)
+
+class DriveService:
+    def __init__(self, root_folder_name, metadata_file, service=None, sa_email=None,
+                 snapshot_cache=None, list_workers=LIST_WORKERS,
+                 max_retries=MAX_RETRIES, retry_backoff=RETRY_BACKOFF,
+                 batch_size=BATCH_SIZE):
+        """Initialize Google Drive API service with proper credentials
+
+        A pre-built ``service`` (e.g. ``fake_drive.FakeDrive``) skips the
+        service account setup, which is how the sync code is exercised locally.
+        When a local snapshot exists the service is ready immediately and
+        revalidates against Drive on a background thread.
+        """
+        self.root_folder_name = root_folder_name
+        self.metadata_file = metadata_file
+        self.snapshot_cache = snapshot_cache or SnapshotCache()
+        self.synced_at = None
+        self.data_version = 0  # moves whenever the cached dates change
+        self.revalidated = threading.Event()
+        self.metadata_file_id = None
+        self.list_workers = list_workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.batch_size = batch_size
+        self.credentials = None
+        self._local = threading.local()
+        self._sync_lock = threading.RLock()
+        self._sync_state = None
+        self._folder_files = {}  # folder_id -> ids of its files in the sync file index
+        self._today = {}
+        
+        try:
+            if service is None:
+                # Configuration - Update path to your service account JSON
+                SERVICE_ACCOUNT_FILE = "wide-planet-449115-b2-c6af973cadb6.json"
+                SCOPES = ['https://www.googleapis.com/auth/drive']
+                
+                if not os.path.exists(SERVICE_ACCOUNT_FILE):
+                    raise FileNotFoundError(f"Service account file not found at: {SERVICE_ACCOUNT_FILE}")
+                
+                self.credentials = service_account.Credentials.from_service_account_file(
+                    SERVICE_ACCOUNT_FILE,
+                    scopes=SCOPES
+                )
+                
+                service = build('drive', 'v3', 
+                                credentials=self.credentials,
+                                static_discovery=False)
+                sa_email = self.credentials.service_account_email
+            
+            self.service = service
+            self.sa_email = sa_email
+            
+            if self._restore_snapshot():
+                # Serve the snapshot now and catch up with Drive off the UI thread
+                threading.Thread(target=self._revalidate, daemon=True).start()
+            else:
+                self.root_folder = self._get_root_folder()
+                self.metadata = self._load_metadata()
+                self._verify_permissions()
+                self.revalidated.set()
+            
+        except Exception as e:
+            raise Exception(f"Drive API initialization failed: {str(e)}")
+
+    def _get_root_folder(self):
+        """Get or create the root folder"""
+        query = f"name='{self.root_folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        results = self._execute(self.service.files().list(
+            q=query, 
+            fields="files(id,name)",
+            supportsAllDrives=True
+        ))
+        
+        if results.get('files'):
+            return results['files'][0]
+        
+        folder_metadata = {
+            'name': self.root_folder_name,
+            'mimeType': 'application/vnd.google-apps.folder'
+        }
+        return self.service.files().create(
+            body=folder_metadata, 
+            fields='id,name'
+        ).execute()
+
+    def _load_metadata(self, previous=None):
+        """Load the metadata file from Drive
+
+        Each date folder's link and access are looked up with one batched
+        files().get. Given ``previous`` (metadata loaded earlier), entries
+        it already holds unchanged keep their link and access, so only new
+        or changed folders are looked up.
+        """
+        try:
+            query = f"name='{self.metadata_file}' and mimeType='application/json' and '{self.root_folder['id']}' in parents and trashed=false"
+            results = self._execute(self.service.files().list(
+                q=query, 
+                fields="files(id)",
+                supportsAllDrives=True
+            ))
+            
+            if not results.get('files'):
+                raise FileNotFoundError("No metadata file found in Drive")
+            
+            file_id = results['files'][0]['id']
+            self.metadata_file_id = file_id
+            request = self.service.files().get_media(fileId=file_id)
+            metadata = json.loads(self._execute(request).decode('utf-8'))
+            
+            known = previous['date_folders'] if previous else {}
+            lookup = {}
+            for date_str, folder_data in metadata['date_folders'].items():
+                if self._same_folder_entry(known.get(date_str), folder_data):
+                    folder_data.update({k: known[date_str][k] for k in ENRICHED_FIELDS if k in known[date_str]})
+                else:
+                    lookup[date_str] = folder_data
+            
+            folders, errors = self._execute_batched({
+                date_str: self.service.files().get(
+                    fileId=folder_data['folder_id'],
+                    fields='webViewLink,permissions',
+                    supportsAllDrives=True
+                )
+                for date_str, folder_data in lookup.items()
+            })
+            
+            for date_str, folder_data in lookup.items():
+                if date_str in errors:
+                    print(f"Error processing folder {date_str}: {str(errors[date_str])}")
+                    folder_data['accessible'] = False
+                    continue
+                folder = folders[date_str]
+                folder_data.update({
+                    'folder_link': folder.get('webViewLink'),
+                    'accessible': any(
+                        perm.get('emailAddress') == self.sa_email
+                        for perm in folder.get('permissions', [])
+                    )
+                })
+            
+            return metadata
+            
+        except FileNotFoundError:
+            return {
+                'root_folder_id': self.root_folder['id'],
+                'date_folders': {},
+                'created_at': datetime.now(timezone.utc).isoformat()
+            }
+        except Exception as e:
+            raise Exception(f"Metadata loading failed: {str(e)}")
+
+    @staticmethod
+    def _same_folder_entry(known, folder_data):
+        """Whether an earlier loaded entry matches a freshly read one, ignoring the enriched keys"""
+        return known is not None and all(
+            known.get(key) == value for key, value in folder_data.items() if key not in ENRICHED_FIELDS
+        )
+
+    def _verify_permissions(self):
+        """Ensure service account has access to all folders"""
+        try:
+            date_folders = self.metadata['date_folders']
+            _, errors = self._execute_batched({
+                date_str: self.service.permissions().create(
+                    fileId=folder_data['folder_id'],
+                    body={
+                        'type': 'user',
+                        'role': 'writer',
+                        'emailAddress': self.sa_email
+                    },
+                    fields='id',
+                    supportsAllDrives=True
+                )
+                for date_str, folder_data in date_folders.items()
+                if not folder_data.get('accessible', False)
+            })
+            
+            for date_str, folder_data in date_folders.items():
+                if date_str in errors:
+                    print(f"Permission verification warning for {date_str}: {str(errors[date_str])}")
+                else:
+                    folder_data['accessible'] = True
+                    
+        except Exception as e:
+            print(f"Permission verification warning: {str(e)}")
+
+    def _execute_batched(self, requests):
+        """Execute ``{request_id: request}`` as batch requests of up to batch_size
+
+        Returns ``(responses, errors)`` keyed by request id. Sub-requests that
+        fail with a retryable error (usually a rate limit) are resent in a
+        later round; pacing between batches backs off while Drive is rate
+        limiting and relaxes again after clean batches.
+        """
+        responses, errors = {}, {}
+        pending = dict(requests)
+        pace = 0.0
+        
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            retry = {}
+            request_ids = list(pending)
+            for start in range(0, len(request_ids), self.batch_size):
+                chunk = request_ids[start:start + self.batch_size]
+                outcomes = {}
+                
+                def callback(request_id, response, exception):
+                    outcomes[request_id] = (response, exception)
+                
+                if pace:
+                    time.sleep(pace)
+                batch = self.service.new_batch_http_request(callback=callback)
+                for request_id in chunk:
+                    batch.add(pending[request_id], request_id=request_id)
+                
+                try:
+                    self._execute(batch)
+                except Exception as e:
+                    outcomes = {request_id: (None, e) for request_id in chunk}
+                
+                limited = False
+                for request_id in chunk:
+                    if request_id not in outcomes:
+                        # The batch never reported on this call; resend it rather than assume success
+                        outcomes[request_id] = (None, ConnectionError(f"No response for batched request {request_id}"))
+                    response, exception = outcomes[request_id]
+                    if exception is None:
+                        responses[request_id] = response
+                    elif self._is_retryable(exception) and attempt < self.max_retries:
+                        retry[request_id] = pending[request_id]
+                        limited = True
+                    else:
+                        errors[request_id] = exception
+                
+                if limited:
+                    pace = max(self.retry_backoff, pace * 2)
+                else:
+                    pace = pace / 2 if pace > self.retry_backoff / 8 else 0.0
+            pending = retry
+        
+        return responses, errors
+
+    def get_available_dates(self, force_refresh=False, current_date_only=False):
+        """Get dates, optionally limited to the current date
+
+        ``current_date_only`` is served by poll_today(), so it never loads
+        the rest of the history.
+        """
+        if current_date_only:
+            today_key = datetime.now().strftime("%m_%d_%Y")
+            if force_refresh or self._today.get('date_key') != today_key:
+                self.poll_today()
+            record = self._today.get('record')
+            return [record] if record else []
+        
+        if force_refresh or not hasattr(self, '_cached_dates'):
+            with self._sync_lock:
+                self._cached_dates = self._load_fresh_dates()
+        
+        return self._cached_dates
+
+    def poll_today(self):
+        """Re-list only today's date folder and return its record
+
+        Cost is proportional to today's files, not to the history. A folder
+        created since the metadata was read is found with one targeted
+        query, and the tracked folder is dropped when the date rolls over.
+        When the history already tracks today's folder, the fresh record is
+        merged into the cached dates too. Returns None while today has no
+        folder.
+        """
+        now = datetime.now()
+        date_key = now.strftime("%m_%d_%Y")
+        today = self._today if self._today.get('date_key') == date_key else {'date_key': date_key}
+        
+        folder_data = today.get('folder') or self._find_date_folder(now)
+        if folder_data is None:
+            self._today = today
+            return None
+        
+        with self._sync_lock:
+            tracked = self._sync_state is not None and any(
+                d['folder_id'] == folder_data['folder_id'] for d in getattr(self, '_cached_dates', [])
+            )
+            # A tracked folder is listed with file ids so the change feed stays consistent with it
+            record, folder_files = self._load_folder_record(folder_data, count_only=not tracked)
+            if tracked:
+                self._merge_folder_record(record, folder_files)
+        self._today = {'date_key': date_key, 'folder': folder_data, 'record': record}
+        return record
+
+    def _merge_folder_record(self, record, folder_files):
+        """Replace one folder's cached record and file index entries with a fresh listing"""
+        folder_id = record['folder_id']
+        # Only this folder's files are compared, not the whole index
+        for file_id in self._folder_files.get(folder_id, set()) - folder_files.keys():
+            self._unindex_file(file_id)
+        self._index_files(folder_files)
+        
+        if any(d['folder_id'] == folder_id and d == record for d in self._cached_dates):
+            return
+        self._cached_dates = [record if d['folder_id'] == folder_id else d for d in self._cached_dates]
+        self.data_version = next(_data_versions)
+
+    def _find_date_folder(self, date):
+        """Locate the folder for one date, from metadata or by name on Drive"""
+        date_key = date.strftime("%m_%d_%Y")
+        if date_key in self.metadata['date_folders']:
+            return self.metadata['date_folders'][date_key]
+        
+        # The uploader names folders violations_<MM_DD_YYYY>_<suffix>
+        query = (f"'{self.root_folder['id']}' in parents and "
+                 f"mimeType='application/vnd.google-apps.folder' and "
+                 f"name contains 'violations_{date_key}_' and trashed=false")
+        results = self._execute(self.service.files().list(
+            q=query,
+            pageSize=1,
+            fields="files(id,name,webViewLink)",
+            supportsAllDrives=True
+        ))
+        if not results.get('files'):
+            return None
+        
+        folder = results['files'][0]
+        return {
+            'folder_id': folder['id'],
+            'folder_name': folder['name'],
+            'folder_link': folder.get('webViewLink', ''),
+            'display_date': date.strftime("%m/%d/%Y")
+        }
+
+    def _load_fresh_dates(self):
+        """Force a fresh load of dates from Drive"""
+        file_index = {}
+        # Take the change token first so nothing added during the scan is missed
+        page_token = self._get_start_page_token()
+        self.metadata = self._load_metadata()
+        
+        dates = []
+        for record, folder_files in self._list_date_folders(self.metadata['date_folders']):
+            dates.append(record)
+            file_index.update(folder_files)
+        
+        self._sync_state = {
+            'page_token': page_token,
+            'metadata_file_id': self.metadata_file_id,
+            'files': file_index
+        }
+        self._build_folder_index()
+        dates = self._sort_dates(dates)
+        self.data_version = next(_data_versions)
+        self._save_snapshot(dates)
+        return dates
+
+    def _list_date_folders(self, date_folders):
+        """List date folders concurrently, skipping any that keep failing"""
+        def load(item):
+            date_str, folder_data = item
+            try:
+                return self._load_folder_record(folder_data)
+            except Exception as e:
+                print(f"Error processing folder {date_str}: {str(e)}")
+                return None
+        
+        workers = max(1, min(self.list_workers, len(date_folders)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [r for r in pool.map(load, date_folders.items()) if r is not None]
+
+    def _load_folder_record(self, folder_data, page_size=LIST_PAGE_SIZE, count_only=False):
+        """List one date folder and build its dashboard record and file index
+
+        Pages are folded into the counts as they arrive. With ``count_only``
+        file ids are neither requested nor indexed, so memory stays constant
+        however many files the folder holds; the index is only needed to
+        apply incremental changes.
+        """
+        record = {
+            'display_date': folder_data['display_date'],
+            'folder_link': folder_data.get('folder_link', ''),
+            'folder_id': folder_data['folder_id'],
+            'violations_count': 0,
+            'images_uploaded': 0,
+            'videos_count': 0,
+            'mask_count': 0,
+            'gloves_count': 0,
+            'accessible': True,
+            'actual_files_count': 0
+        }
+        folder_files = {}
+        fields = "mimeType,name" if count_only else "id,mimeType,name"
+        for page in self.iter_folder_pages(folder_data['folder_id'], page_size, fields):
+            for f in page:
+                flags = self._classify_file(f)
+                self._apply_file_counts(record, flags, 1)
+                if not count_only:
+                    folder_files[f['id']] = [folder_data['folder_id'], flags]
+        return record, folder_files
+
+    def iter_folder_pages(self, folder_id, page_size=LIST_PAGE_SIZE, fields="id,mimeType,name"):
+        """Yield pages of a folder's files, following nextPageToken to the end"""
+        query = f"'{folder_id}' in parents and trashed=false"
+        page_token = None
+        while True:
+            response = self._execute(self.service.files().list(
+                q=query,
+                pageSize=page_size,
+                pageToken=page_token,
+                fields=f"nextPageToken,files({fields})",
+                supportsAllDrives=True
+            ))
+            yield response.get('files', [])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    def _execute(self, request):
+        """Execute a request with retry and exponential backoff
+
+        Each worker thread gets its own authorized HTTP connection because
+        httplib2 connections must not be shared between threads.
+        """
+        http = self._thread_http()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return request.execute(http=http) if http else request.execute()
+            except Exception as e:
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+
+    def _thread_http(self):
+        if self.credentials is None:
+            return None
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    @staticmethod
+    def _is_retryable(error):
+        """Transient server errors, rate limits and dropped connections"""
+        status = getattr(getattr(error, 'resp', None), 'status', None)
+        if status is None:
+            return isinstance(error, (ConnectionError, TimeoutError))
+        if int(status) in RETRYABLE_STATUSES:
+            return True
+        return int(status) == 403 and any(
+            reason in str(getattr(error, 'content', b'')) for reason in RATE_LIMIT_REASONS
+        )
+
+    @staticmethod
+    def _classify_file(f):
+        """Reduce a Drive file to the count flags it contributes"""
+        mime_type = f.get('mimeType', '').lower()
+        name = f.get('name', '').lower()
+        flags = 0
+        if 'image' in mime_type:
+            flags |= IMAGE_FLAG
+        if 'video' in mime_type:
+            flags |= VIDEO_FLAG
+        # Count mask and gloves violations
+        if 'no-mask' in name:
+            flags |= MASK_FLAG
+        if 'no-gloves' in name:
+            flags |= GLOVES_FLAG
+        return flags
+
+    @staticmethod
+    def _apply_file_counts(record, flags, sign):
+        """Add (sign=1) or remove (sign=-1) one file from a folder record"""
+        record['actual_files_count'] += sign
+        if flags & IMAGE_FLAG:
+            record['images_uploaded'] += sign
+            record['violations_count'] += sign
+        if flags & VIDEO_FLAG:
+            record['videos_count'] += sign
+        if flags & MASK_FLAG:
+            record['mask_count'] += sign
+        if flags & GLOVES_FLAG:
+            record['gloves_count'] += sign
+
+    @staticmethod
+    def _sort_dates(dates):
+        return sorted(
+            dates,
+            key=lambda x: datetime.strptime(x['display_date'], "%m/%d/%Y"),
+            reverse=True
+        )
+
+    def sync_changes(self):
+        """Incrementally update cached dates from the Drive changes feed
+
+        Only files added, removed or moved since the stored change token are
+        fetched, so the cost of a poll tracks recent activity rather than the
+        number of date folders. Falls back to a full load when there is no
+        usable token.
+        """
+        with self._sync_lock:
+            return self._sync_changes()
+
+    def _sync_changes(self):
+        if self._sync_state is None or not hasattr(self, '_cached_dates'):
+            self._cached_dates = self._load_fresh_dates()
+            return self._cached_dates
+        
+        try:
+            # Work on copies so readers never see a half-applied sync
+            records = {d['folder_id']: dict(d) for d in self._cached_dates}
+            page_token = self._sync_state['page_token']
+            changed = False
+            metadata_changed = False
+            
+            while page_token:
+                response = self._execute(self.service.changes().list(
+                    pageToken=page_token,
+                    spaces='drive',
+                    pageSize=1000,
+                    fields=CHANGE_FIELDS,
+                    includeItemsFromAllDrives=True,
+                    supportsAllDrives=True
+                ))
+                
+                for change in response.get('changes', []):
+                    # The feed covers the whole account; only tracked files count as a change
+                    touched, metadata = self._apply_change(change, records)
+                    changed = changed or touched or metadata
+                    metadata_changed = metadata_changed or metadata
+                
+                if 'newStartPageToken' in response:
+                    self._sync_state['page_token'] = response['newStartPageToken']
+                    break
+                page_token = response.get('nextPageToken')
+            
+            if not changed:
+                self.synced_at = time.time()
+                return self._cached_dates
+            
+            if metadata_changed:
+                self._sync_date_folders(records)
+            
+            self._cached_dates = self._sort_dates(records.values())
+            self.data_version = next(_data_versions)
+            self._save_snapshot(self._cached_dates)
+            
+        except Exception as e:
+            print(f"Incremental sync failed, reloading all dates: {str(e)}")
+            self._cached_dates = self._load_fresh_dates()
+        
+        return self._cached_dates
+
+    def _apply_change(self, change, records):
+        """Fold one change into the folder records
+
+        Returns ``(touched, metadata_changed)``: whether a tracked record or
+        the file index was updated, and whether the metadata file changed.
+        Changes to files outside the date folders return ``(False, False)``.
+        """
+        file_id = change['fileId']
+        file = change.get('file') or {}
+        
+        if file_id == self._sync_state.get('metadata_file_id'):
+            return False, True
+        
+        # Drop the file's previous contribution (removal, trash, rename or move)
+        entry = self._unindex_file(file_id)
+        touched = entry is not None
+        if touched:
+            folder_id, flags = entry
+            if folder_id in records:
+                self._apply_file_counts(records[folder_id], flags, -1)
+        
+        if change.get('removed') or file.get('trashed'):
+            return touched, False
+        
+        for parent in file.get('parents', []):
+            if parent in records:
+                flags = self._classify_file(file)
+                self._apply_file_counts(records[parent], flags, 1)
+                self._index_files({file_id: [parent, flags]})
+                return True, False
+            if parent == self.root_folder['id'] and file.get('name') == self.metadata_file:
+                # A metadata file created after the last full load
+                self._sync_state['metadata_file_id'] = file_id
+                return touched, True
+        return touched, False
+
+    def _sync_date_folders(self, records):
+        """Pick up date folders added to or dropped from the metadata file"""
+        # Only entries new since the last read are looked up again
+        self.metadata = self._load_metadata(previous=self.metadata)
+        self._sync_state['metadata_file_id'] = self.metadata_file_id
+        known = {folder_data['folder_id'] for folder_data in self.metadata['date_folders'].values()}
+        
+        for folder_id in [f for f in records if f not in known]:
+            del records[folder_id]
+        for folder_id in [f for f in self._folder_files if f not in known]:
+            self._unindex_folder(folder_id)
+        
+        new_folders = {
+            date_str: folder_data
+            for date_str, folder_data in self.metadata['date_folders'].items()
+            if folder_data['folder_id'] not in records
+        }
+        for record, folder_files in self._list_date_folders(new_folders):
+            records[record['folder_id']] = record
+            self._index_files(folder_files)
+
+    def _build_folder_index(self):
+        """Rebuild the per-folder sets from the sync file index"""
+        self._folder_files = {}
+        for file_id, (folder_id, _) in self._sync_state['files'].items():
+            self._folder_files.setdefault(folder_id, set()).add(file_id)
+
+    def _index_files(self, folder_files):
+        """Add ``{file_id: [folder_id, flags]}`` entries to the file index and the per-folder sets"""
+        file_index = self._sync_state['files']
+        for file_id, entry in folder_files.items():
+            previous = file_index.get(file_id)
+            if previous is not None and previous[0] != entry[0]:
+                self._folder_files.get(previous[0], set()).discard(file_id)
+            file_index[file_id] = entry
+            self._folder_files.setdefault(entry[0], set()).add(file_id)
+
+    def _unindex_file(self, file_id):
+        """Drop one file from the index; returns its [folder_id, flags], or None when untracked"""
+        entry = self._sync_state['files'].pop(file_id, None)
+        if entry is not None:
+            self._folder_files.get(entry[0], set()).discard(file_id)
+        return entry
+
+    def _unindex_folder(self, folder_id):
+        file_index = self._sync_state['files']
+        for file_id in self._folder_files.pop(folder_id, ()):
+            file_index.pop(file_id, None)
+
+    def _get_start_page_token(self):
+        return self._execute(self.service.changes().getStartPageToken(
+            supportsAllDrives=True
+        ))['startPageToken']
+
+    def _restore_snapshot(self):
+        """Adopt the local snapshot of a previous run, if there is a usable one"""
+        try:
+            snapshot = self.snapshot_cache.load(self.root_folder_name)
+            if not snapshot:
+                return False
+            self.root_folder = snapshot['root_folder']
+            self.metadata = snapshot['metadata']
+            self.metadata_file_id = snapshot['sync'].get('metadata_file_id')
+            self._sync_state = snapshot['sync']
+            self._build_folder_index()
+            self._cached_dates = snapshot['dates']
+            self.synced_at = snapshot['synced_at']
+            self.data_version = next(_data_versions)
+            return True
+        except Exception as e:
+            print(f"Ignoring snapshot for {self.root_folder_name}: {str(e)}")
+            return False
+
+    def _revalidate(self):
+        """Bring a snapshot-loaded service up to date with Drive"""
+        try:
+            self.sync_changes()
+        except Exception as e:
+            print(f"Background revalidation failed for {self.root_folder_name}: {str(e)}")
+        finally:
+            self.revalidated.set()
+
+    def _save_snapshot(self, dates):
+        """Persist records, metadata and the change token for instant restarts"""
+        self.synced_at = time.time()
+        try:
+            self.snapshot_cache.save(self.root_folder_name, {
+                'root_folder': self.root_folder,
+                'metadata': self.metadata,
+                'sync': self._sync_state,
+                'dates': list(dates)
+            }, synced_at=self.synced_at)
+        except Exception as e:
+            print(f"Could not save snapshot: {str(e)}")
+
+    def share_folder(self, email):
+        """Share the root folder with specified email"""
+        try:
+            permission = {
+                'type': 'user',
+                'role': 'writer',
+                'emailAddress': email
+            }
+            self.service.permissions().create(
+                fileId=self.root_folder['id'],
+                body=permission,
+                fields='id',
+                supportsAllDrives=True,
+                sendNotificationEmail=True
+            ).execute()
+            return True
+        except Exception as e:
+            print(f"Error sharing folder: {str(e)}")
             return False
\ No newline at end of file
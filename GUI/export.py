@@ -0,0 +1,183 @@
+"""Bulk export of the violation time series, without Streamlit
+
+    python export.py violations.parquet
+    python export.py violations.arrow --types mask gloves --start 2025-01-01
+    python export.py violations.csv.gz --chunk-rows 50000
+"""
+import argparse
+import gzip
+import os
+import time
+
+import pandas as pd
+
+from drive import DRIVE_SYSTEMS, DriveService
+from report_periods import date_slice
+from violation_store import ViolationStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Export name -> (Drive system, count column); matches build_violation_data in gui.py
+EXPORT_SERIES = {
+    'mask': ('worker', 'mask_count'),
+    'gloves': ('worker', 'gloves_count'),
+    'fallen_objects': ('fallen', 'images_uploaded'),
+    'empty_bottles': ('empty', 'images_uploaded')
+}
+EXPORT_COLUMNS = ['violation_type', 'date', 'violations_count', 'folder_id', 'month', 'week']
+FORMATS = ('parquet', 'arrow', 'csv')
+CHUNK_ROWS = 100000
+COMPRESSION = 'zstd'
+REVALIDATE_TIMEOUT = 300  # seconds to wait for a snapshot-backed service to catch up
+
+
+def _require_pyarrow(fmt):
+    if pa is None:
+        raise ImportError(f"{fmt} export needs pyarrow (pip install pyarrow); CSV export works without it")
+
+
+def format_for_path(path):
+    """Export format implied by a file name"""
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for fmt, extensions in (('parquet', ('.parquet', '.pq')),
+                            ('arrow', ('.arrow', '.feather', '.ipc')),
+                            ('csv', ('.csv',))):
+        if name.endswith(extensions):
+            return fmt
+    raise ValueError(f"Cannot tell the export format from {path}; pass --format")
+
+
+def iter_export_chunks(stores, types=None, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """Long-format frames of at most ``chunk_rows`` rows, one violation type after another
+
+    ``stores`` maps Drive system names to ViolationStore objects. Rows keep
+    the stores' newest-first order; ``start``/``end`` restrict the days.
+    """
+    for name in types or EXPORT_SERIES:
+        system, count_column = EXPORT_SERIES[name]
+        frame = stores[system].frame
+        if len(frame) and (start is not None or end is not None):
+            frame = date_slice(frame,
+                               start if start is not None else frame['date'].iloc[-1],
+                               end if end is not None else frame['date'].iloc[0])
+        for offset in range(0, len(frame), chunk_rows):
+            chunk = frame.iloc[offset:offset + chunk_rows]
+            yield pd.DataFrame({
+                'violation_type': name,
+                'date': chunk['date'].to_numpy(),
+                'violations_count': chunk[count_column].to_numpy(),
+                'folder_id': chunk['folder_id'].to_numpy(),
+                'month': chunk['month'].to_numpy(),
+                'week': chunk['week'].to_numpy()
+            })
+
+
+def _arrow_schema():
+    return pa.schema([
+        ('violation_type', pa.dictionary(pa.int8(), pa.string())),
+        ('date', pa.timestamp('ns')),
+        ('violations_count', pa.int32()),
+        ('folder_id', pa.string()),
+        ('month', pa.string()),
+        ('week', pa.string())
+    ])
+
+
+def _record_batch(chunk, schema):
+    # One fixed dictionary for every batch: IPC files cannot replace dictionaries mid-stream
+    types = pd.Categorical(chunk['violation_type'], categories=list(EXPORT_SERIES))
+    return pa.RecordBatch.from_arrays([
+        pa.DictionaryArray.from_arrays(pa.array(types.codes, type=pa.int8()), pa.array(list(EXPORT_SERIES))),
+        pa.array(chunk['date'].to_numpy(dtype='datetime64[ns]')),
+        pa.array(chunk['violations_count'].to_numpy(), type=pa.int32()),
+        pa.array(chunk['folder_id'].to_numpy(), type=pa.string()),
+        pa.array(chunk['month'].astype(str).to_numpy(), type=pa.string()),
+        pa.array(chunk['week'].astype(str).to_numpy(), type=pa.string())
+    ], schema=schema)
+
+
+def write_export(chunks, path, fmt=None, compression=COMPRESSION):
+    """Stream chunks from iter_export_chunks() to ``path``; returns the number of rows written
+
+    Parquet and Arrow IPC files are compressed (zstd by default); CSV is
+    gzipped when the path ends in .gz. Only one chunk is held in memory.
+    """
+    fmt = fmt or format_for_path(path)
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    try:
+        if fmt == 'csv':
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(tmp_path, 'wt', newline='') as f:
+                for i, chunk in enumerate(chunks):
+                    chunk.to_csv(f, header=(i == 0), index=False, date_format='%Y-%m-%d')
+                    rows += len(chunk)
+                if rows == 0:
+                    f.write(','.join(EXPORT_COLUMNS) + '\n')
+        elif fmt == 'parquet':
+            _require_pyarrow(fmt)
+            schema = _arrow_schema()
+            with pq.ParquetWriter(tmp_path, schema, compression=compression) as writer:
+                for chunk in chunks:
+                    writer.write_table(pa.Table.from_batches([_record_batch(chunk, schema)]))
+                    rows += len(chunk)
+        elif fmt == 'arrow':
+            _require_pyarrow(fmt)
+            schema = _arrow_schema()
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+                for chunk in chunks:
+                    writer.write_batch(_record_batch(chunk, schema))
+                    rows += len(chunk)
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+
+def load_stores(systems, wait=True, timeout=REVALIDATE_TIMEOUT):
+    """ViolationStore per Drive system, read the same way the dashboard reads them"""
+    stores = {}
+    for system in systems:
+        root_folder, metadata_file = DRIVE_SYSTEMS[system]
+        service = DriveService(root_folder, metadata_file)
+        if wait and not service.revalidated.wait(timeout):
+            print(f"{root_folder}: still revalidating after {timeout}s, exporting the local snapshot")
+        stores[system] = ViolationStore(service.get_available_dates())
+    return stores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', help="file to write; the extension picks the format")
+    parser.add_argument('--format', choices=FORMATS)
+    parser.add_argument('--types', nargs='+', choices=list(EXPORT_SERIES), help="default: all")
+    parser.add_argument('--start', type=pd.Timestamp, help="first day, YYYY-MM-DD")
+    parser.add_argument('--end', type=pd.Timestamp, help="last day, YYYY-MM-DD")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--compression', default=COMPRESSION, help="Parquet/Arrow codec")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="export local snapshots without waiting for Drive revalidation")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    types = args.types or list(EXPORT_SERIES)
+    stores = load_stores({EXPORT_SERIES[name][0] for name in types}, wait=not args.no_wait)
+    rows = write_export(
+        iter_export_chunks(stores, types, args.start, args.end, args.chunk_rows),
+        args.output, args.format, args.compression
+    )
+    print(f"Exported {rows} rows to {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+
+class FakeRequest:
+    """Deferred call that mimics googleapiclient's HttpRequest"""
+    def __init__(self, drive, method, func):
+        self.drive = drive
+        self.method = method
+        self.func = func
+
+    def execute(self, http=None, num_retries=0):
+        self.drive._round_trip(self.method)
+        return self.func()
+
+
+class FakeBatch:
+    """Mimics BatchHttpRequest: one round trip, per-item callbacks"""
+    def __init__(self, drive, callback=None):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        if len(self.requests) >= 100:
+            raise ValueError("Drive batches are limited to 100 calls")
+        self.requests.append((request_id or str(len(self.requests)), request, callback))
+
+    def execute(self, http=None):
+        self.drive._round_trip('batch')
+        for request_id, request, callback in self.requests:
+            response, exception = None, None
+            try:
+                self.drive._count_batched(request.method)
+                if self.drive.item_error_rate and random.random() < self.drive.item_error_rate:
+                    raise FakeHttpError(429)
+                response = request.func()
+            except Exception as e:
+                exception = e
+            (callback or self.callback)(request_id, response, exception)
+
+
+class FakeHttpError(Exception):
+    """Mimics googleapiclient.errors.HttpError closely enough for retry logic"""
+    def __init__(self, status, content=b''):
+        super().__init__(f"HTTP {status}")
+        self.resp = type('FakeResponse', (), {'status': status})()
+        self.content = content
+
+
+class FakeDrive:
+    """In-memory stand-in for the Drive v3 service used by DriveService
+
+    Supports the subset of files(), permissions() and changes() calls the
+    dashboard makes, with an optional per-request latency so sync and
+    listing strategies can be compared without touching the network.
+    """
+    def __init__(self, latency=0.0, error_rate=0.0, item_error_rate=0.0,
+                 service_account_email='sa@fake.iam'):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.item_error_rate = item_error_rate
+        self.service_account_email = service_account_email
+        self.files_by_id = {}
+        self.contents = {}
+        self.change_log = []
+        self.calls = {}
+        self.batched_calls = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # ---- test setup helpers ----
+
+    def add_folder(self, name, parent=None):
+        return self._add(name, FOLDER_MIME, parent)
+
+    def add_file(self, name, mime_type, parent, content=None):
+        file_id = self._add(name, mime_type, parent)
+        if content is not None:
+            self.contents[file_id] = content
+        return file_id
+
+    def set_content(self, file_id, content):
+        with self._lock:
+            self.contents[file_id] = content
+            self.change_log.append(file_id)
+
+    def rename(self, file_id, name):
+        with self._lock:
+            self.files_by_id[file_id]['name'] = name
+            self.change_log.append(file_id)
+
+    def move(self, file_id, parent):
+        with self._lock:
+            self.files_by_id[file_id]['parents'] = [parent]
+            self.change_log.append(file_id)
+
+    def trash(self, file_id):
+        with self._lock:
+            self.files_by_id[file_id]['trashed'] = True
+            self.change_log.append(file_id)
+
+    def delete(self, file_id):
+        with self._lock:
+            self.files_by_id.pop(file_id, None)
+            self.contents.pop(file_id, None)
+            self.change_log.append(file_id)
+
+    def _add(self, name, mime_type, parent):
+        with self._lock:
+            file_id = f"fake{next(self._ids)}"
+            self.files_by_id[file_id] = {
+                'id': file_id,
+                'name': name,
+                'mimeType': mime_type,
+                'parents': [parent] if parent else [],
+                'trashed': False,
+                'permissions': [],
+                'webViewLink': f"https://drive.fake/{file_id}"
+            }
+            self.change_log.append(file_id)
+            return file_id
+
+    def _round_trip(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeHttpError(503)
+
+    def _count_batched(self, method):
+        with self._lock:
+            self.batched_calls[method] = self.batched_calls.get(method, 0) + 1
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    # ---- googleapiclient surface ----
+
+    def files(self):
+        return _FakeFiles(self)
+
+    def permissions(self):
+        return _FakePermissions(self)
+
+    def changes(self):
+        return _FakeChanges(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q='', fields=None, pageSize=100, pageToken=None, **kwargs):
+        def run():
+            matches = [f for f in self.drive.files_by_id.values() if _matches(f, q)]
+            start = int(pageToken or 0)
+            end = start + min(pageSize or 100, 1000)
+            response = {'files': [_project(f, fields) for f in matches[start:end]]}
+            if end < len(matches):
+                response['nextPageToken'] = str(end)
+            return response
+        return FakeRequest(self.drive, 'files.list', run)
+
+    def get(self, fileId, fields=None, **kwargs):
+        def run():
+            if fileId not in self.drive.files_by_id:
+                raise FileNotFoundError(f"File not found: {fileId}")
+            return dict(self.drive.files_by_id[fileId])
+        return FakeRequest(self.drive, 'files.get', run)
+
+    def get_media(self, fileId, **kwargs):
+        def run():
+            content = self.drive.contents[fileId]
+            if isinstance(content, (dict, list)):
+                content = json.dumps(content)
+            return content.encode('utf-8') if isinstance(content, str) else content
+        return FakeRequest(self.drive, 'files.get_media', run)
+
+    def create(self, body=None, fields=None, **kwargs):
+        def run():
+            parents = (body or {}).get('parents') or [None]
+            file_id = self.drive._add(body['name'], body.get('mimeType', ''), parents[0])
+            return dict(self.drive.files_by_id[file_id])
+        return FakeRequest(self.drive, 'files.create', run)
+
+
+class _FakePermissions:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, fileId, body=None, fields=None, **kwargs):
+        def run():
+            perm = {'id': f"perm{len(self.drive.files_by_id[fileId]['permissions']) + 1}"}
+            perm.update(body or {})
+            self.drive.files_by_id[fileId]['permissions'].append(perm)
+            return {'id': perm['id']}
+        return FakeRequest(self.drive, 'permissions.create', run)
+
+
+class _FakeChanges:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(self.drive, 'changes.getStartPageToken',
+                           lambda: {'startPageToken': str(len(self.drive.change_log))})
+
+    def list(self, pageToken, pageSize=100, fields=None, **kwargs):
+        def run():
+            start = int(pageToken)
+            end = min(start + pageSize, len(self.drive.change_log))
+            changes = []
+            for file_id in self.drive.change_log[start:end]:
+                file = self.drive.files_by_id.get(file_id)
+                change = {'fileId': file_id, 'removed': file is None}
+                if file is not None:
+                    change['file'] = dict(file)
+                changes.append(change)
+            response = {'changes': changes}
+            if end < len(self.drive.change_log):
+                response['nextPageToken'] = str(end)
+            else:
+                response['newStartPageToken'] = str(end)
+            return response
+        return FakeRequest(self.drive, 'changes.list', run)
+
+
+def build_fake_system(drive, root_folder_name, metadata_file, days, files_per_day=3,
+                      start=datetime(2025, 1, 1), shared=True):
+    """Populate a root folder, its date folders and metadata file like the uploader does
+
+    With ``shared=False`` the service account is missing from every date
+    folder, so DriveService has to repair permissions on startup.
+    """
+    root_id = drive.add_folder(root_folder_name)
+    metadata = {
+        'root_folder_id': root_id,
+        'date_folders': {},
+        'created_at': start.isoformat()
+    }
+    for day in range(days):
+        date = start + timedelta(days=day)
+        date_str = date.strftime("%m_%d_%Y")
+        folder_id = drive.add_folder(f"violations_{date_str}_{day:08x}", root_id)
+        if shared:
+            drive.files_by_id[folder_id]['permissions'].append({
+                'id': 'perm0', 'type': 'user', 'role': 'writer',
+                'emailAddress': drive.service_account_email
+            })
+        metadata['date_folders'][date_str] = {
+            'folder_id': folder_id,
+            'folder_name': f"violations_{date_str}_{day:08x}",
+            'display_date': date.strftime("%m/%d/%Y"),
+            'created_at': date.isoformat()
+        }
+        for i in range(files_per_day):
+            label = ('no-mask', 'no-gloves')[i % 2]
+            drive.add_file(f"violation_worker{i}_{label}_frame{i}.jpg", 'image/jpeg', folder_id)
+    drive.add_file(metadata_file, 'application/json', root_id, content=metadata)
+    return root_id, metadata
+
+
+def _project(file, fields):
+    """Keep only the keys named in a ``files(a,b)`` partial response spec"""
+    m = re.search(r"files\(([^)]*)\)", fields or '')
+    if not m:
+        return dict(file)
+    keys = [k.strip() for k in m.group(1).split(',')]
+    return {k: file[k] for k in keys if k in file}
+
+
+_CLAUSE = re.compile(
+    r"^(?:(?P<field>name|mimeType)\s*(?P<op>=|contains)\s*'(?P<value>[^']*)'"
+    r"|'(?P<parent>[^']*)'\s+in\s+parents"
+    r"|trashed\s*=\s*(?P<trashed>true|false))$"
+)
+
+
+def _matches(file, q):
+    """Evaluate the small subset of Drive query syntax the app uses"""
+    for clause in filter(None, (c.strip() for c in q.split(' and '))):
+        m = _CLAUSE.match(clause)
+        if not m:
+            raise ValueError(f"Unsupported query clause: {clause}")
+        if m.group('field'):
+            actual = file.get(m.group('field'), '')
+            if m.group('op') == '=' and actual != m.group('value'):
+                return False
+            if m.group('op') == 'contains' and m.group('value') not in actual:
+                return False
+        elif m.group('parent') is not None:
+            if m.group('parent') not in file['parents']:
+                return False
+        elif (m.group('trashed') == 'true') != file['trashed']:
+            return False
+    return True
@@ -0,0 +1,110 @@
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        server = self.server.fake
+        with server.lock:
+            server.connections += 1
+        # Stands in for the TCP + TLS handshake with a remote server
+        time.sleep(server.connect_latency)
+        self.reply("220 fake-smtp ready")
+        in_session = 0
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.wfile.write(b"250-fake-smtp\r\n250 AUTH PLAIN LOGIN\r\n" if server.auth else b"250 fake-smtp\r\n")
+            elif verb == 'AUTH':
+                with server.lock:
+                    server.logins += 1
+                self.reply("235 Authentication successful")
+            elif verb == 'MAIL':
+                sender, recipients = _address(command), []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(_address(command))
+                self.reply("250 OK")
+            elif verb in ('RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data)
+                time.sleep(server.send_latency)
+                with server.lock:
+                    server.messages.append(b"".join(lines))
+                    server.envelopes.append((sender, recipients, b"".join(lines)))
+                    accepted = len(server.messages)
+                if accepted in server.hang_up_before_reply:
+                    # Message stored, but the client never hears back
+                    return
+                self.reply("250 OK queued")
+                in_session += 1
+                if server.drop_after and in_session >= server.drop_after:
+                    # Simulate the remote end closing an idle or long-lived connection
+                    return
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def _address(command):
+    """The address in ``MAIL FROM:<a>`` or ``RCPT TO:<a>``"""
+    return command.split(':', 1)[1].strip().split(' ', 1)[0].strip('<>')
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeSMTPServer:
+    """Plain-text SMTP server on localhost that accepts any login and keeps messages in memory
+
+    ``connect_latency`` and ``send_latency`` simulate a slow remote server;
+    ``drop_after`` closes each connection after that many messages so
+    reconnect handling can be observed. Messages numbered (from 1) in
+    ``hang_up_before_reply`` are stored but the connection closes before
+    the 250 reply. ``envelopes`` keeps (sender, recipients, body) per
+    message.
+    """
+    def __init__(self, host="127.0.0.1", port=0, connect_latency=0.0, send_latency=0.0,
+                 drop_after=0, auth=True, hang_up_before_reply=()):
+        self.connect_latency = connect_latency
+        self.send_latency = send_latency
+        self.drop_after = drop_after
+        self.auth = auth
+        self.hang_up_before_reply = set(hang_up_before_reply)
+        self.messages = []
+        self.envelopes = []
+        self.connections = 0
+        self.logins = 0
+        self.lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), _SMTPHandler)
+        self._server.fake = self
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
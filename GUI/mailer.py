@@ -0,0 +1,242 @@
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import deque
+
+# Point these at a local debug server (e.g. SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SSL=0 SMTP_AUTH=0) to test without Gmail
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 465))
+SMTP_SSL = os.environ.get("SMTP_SSL", "1") != "0"
+# Only turn off for debug servers that do not offer AUTH; otherwise a server without it is an error
+SMTP_AUTH = os.environ.get("SMTP_AUTH", "1") != "0"
+SMTP_TIMEOUT = 20
+SENDER_THREADS = 2
+MAX_IDLE = 60  # seconds before an unused connection is closed
+SEND_ATTEMPTS = 2  # a dropped pooled connection gets one reconnect
+METRICS_WINDOW = 500  # recent sends kept for latency percentiles
+
+
+class MailHandle:
+    """Returned by Mailer.send() straight away; tracks one message through the queue"""
+    def __init__(self, msg):
+        self.msg = msg
+        self.error = None
+        self.queued_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until sent or failed; returns True if it was sent"""
+        self._done.wait(timeout)
+        return self.ok
+
+    @property
+    def ok(self):
+        return self.done() and self.error is None
+
+    @property
+    def failed(self):
+        return self.done() and self.error is not None
+
+    def _finish(self, error=None):
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+
+class _DataTracking:
+    """Remembers whether DATA was issued, after which the server may already hold the message"""
+    data_started = False
+
+    def data(self, msg):
+        self.data_started = True
+        return super().data(msg)
+
+
+class _SMTP(_DataTracking, smtplib.SMTP):
+    pass
+
+
+class _SMTP_SSL(_DataTracking, smtplib.SMTP_SSL):
+    pass
+
+
+class _Connection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.time()
+
+
+class Mailer:
+    """Background SMTP sender with reused connections
+
+    send() queues a message and returns a MailHandle. Sender threads keep
+    one logged-in connection per sender account and reuse it until it has
+    been idle for ``max_idle`` seconds. A connection that dropped before
+    the message went out is reopened and the message retried once; a drop
+    after DATA fails the message instead, since resending could deliver it
+    twice. With ``require_auth`` a server that does not offer AUTH is
+    refused rather than sent to unauthenticated.
+    """
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, use_ssl=SMTP_SSL, threads=SENDER_THREADS,
+                 timeout=SMTP_TIMEOUT, max_idle=MAX_IDLE, require_auth=SMTP_AUTH):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.require_auth = require_auth
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=METRICS_WINDOW)  # (finished_at, queue seconds, total seconds)
+        self.sent = 0
+        self.failed = 0
+        self.connects = 0
+        self.reconnects = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"mail-sender-{i}", daemon=True)
+            for i in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def send(self, msg, username, password):
+        """Queue ``msg`` for delivery from the ``username`` account; never blocks on the network"""
+        handle = MailHandle(msg)
+        self._queue.put((handle, username, password))
+        return handle
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _run(self):
+        connections = {}  # this thread's pool: (username, password) -> _Connection
+        while True:
+            try:
+                item = self._queue.get(timeout=self.max_idle)
+            except queue.Empty:
+                self._close_idle(connections)
+                continue
+            if item is None:
+                self._close_idle(connections, everything=True)
+                return
+            handle, username, password = item
+            started = time.time()
+            error = None
+            for attempt in range(SEND_ATTEMPTS):
+                conn = None
+                try:
+                    conn = self._connection(connections, username, password, reconnect=attempt > 0)
+                    conn.smtp.data_started = False
+                    conn.smtp.send_message(handle.msg)
+                    conn.last_used = time.time()
+                    error = None
+                    break
+                except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+                    # Stale pooled connection: drop it and try a fresh one, unless the message may be delivered
+                    error = e
+                    self._drop(connections, username, password)
+                    if conn is not None and conn.smtp.data_started:
+                        break
+                except Exception as e:
+                    error = e
+                    self._drop(connections, username, password)
+                    break
+            if error is not None:
+                print(f"Failed to send mail to {handle.msg['To']}: {str(error)}")
+            handle._finish(error)
+            self._record(handle, started, error)
+            self._close_idle(connections)
+
+    def _connection(self, connections, username, password, reconnect=False):
+        key = (username, password)
+        conn = connections.get(key)
+        if conn is not None and not reconnect:
+            return conn
+        if conn is not None:
+            self._drop(connections, username, password)
+        smtp_class = _SMTP_SSL if self.use_ssl else _SMTP
+        smtp = smtp_class(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.require_auth:
+            if not smtp.has_extn('auth'):
+                smtp.close()
+                raise smtplib.SMTPNotSupportedError(f"{self.host} does not offer AUTH; not sending unauthenticated")
+            smtp.login(username, password)
+        conn = _Connection(smtp)
+        connections[key] = conn
+        with self._lock:
+            self.connects += 1
+            if reconnect:
+                self.reconnects += 1
+        return conn
+
+    @staticmethod
+    def _drop(connections, username, password):
+        conn = connections.pop((username, password), None)
+        if conn is not None:
+            try:
+                conn.smtp.close()
+            except Exception:
+                pass
+
+    def _close_idle(self, connections, everything=False):
+        now = time.time()
+        for key, conn in list(connections.items()):
+            if everything or now - conn.last_used > self.max_idle:
+                try:
+                    conn.smtp.quit()
+                except Exception:
+                    pass
+                del connections[key]
+
+    def _record(self, handle, started, error):
+        with self._lock:
+            if error is None:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self._latencies.append((handle.finished_at, started - handle.queued_at, handle.finished_at - handle.queued_at))
+
+    def stats(self):
+        """Counters, queue depth, latency percentiles and recent throughput"""
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = {
+                'sent': self.sent,
+                'failed': self.failed,
+                'queued': self._queue.qsize(),
+                'connects': self.connects,
+                'reconnects': self.reconnects
+            }
+        totals = sorted(total for _, _, total in latencies)
+        waits = sorted(wait for _, wait, _ in latencies)
+
+        def percentile(values, p):
+            return values[min(len(values) - 1, int(p * len(values)))] if values else None
+
+        stats['latency_p50'] = percentile(totals, 0.5)
+        stats['latency_p95'] = percentile(totals, 0.95)
+        stats['queue_wait_p95'] = percentile(waits, 0.95)
+        span = latencies[-1][0] - latencies[0][0] if len(latencies) > 1 else 0
+        stats['per_second'] = (len(latencies) - 1) / span if span > 0 else None
+        return stats
+
+
+_mailer = None
+_mailer_lock = threading.Lock()
+
+
+def get_mailer():
+    """Process-wide mailer, configured from SMTP_HOST / SMTP_PORT / SMTP_SSL"""
+    global _mailer
+    with _mailer_lock:
+        if _mailer is None:
+            _mailer = Mailer()
+        return _mailer
@@ -0,0 +1,115 @@
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+OTP_TTL = 300  # seconds a code stays valid
+OTP_MAX_ATTEMPTS = 5  # wrong guesses before the code is thrown away
+OTP_MAX_ENTRIES = 10000  # oldest codes are dropped past this many
+OTP_DIGITS = 6
+
+# verify() results
+OTP_OK = "ok"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+OTP_LOCKED = "locked"
+OTP_MISSING = "missing"
+
+
+class _Entry:
+    __slots__ = ('code', 'expires', 'attempts')
+
+    def __init__(self, code, expires):
+        self.code = code
+        self.expires = expires
+        self.attempts = 0
+
+
+class OTPManager:
+    """One-time codes keyed by (session, purpose, email), with expiry and attempt limits
+
+    Entries live in an OrderedDict kept in expiry order (the TTL is fixed
+    and re-issuing moves a key to the end), so expired codes are swept from
+    the front in O(expired) on every issue and looked at again on access;
+    there is no background thread. Codes are single use.
+    """
+    def __init__(self, ttl=OTP_TTL, max_attempts=OTP_MAX_ATTEMPTS, max_entries=OTP_MAX_ENTRIES,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.evicted = 0
+
+    def issue(self, session_id, email, purpose="login"):
+        """New code for this session and email, replacing any earlier one"""
+        code = "".join(secrets.choice("0123456789") for _ in range(OTP_DIGITS))
+        key = (session_id, purpose, email)
+        with self._lock:
+            now = self.clock()
+            self._sweep(now)
+            self._entries.pop(key, None)
+            self._entries[key] = _Entry(code, now + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            self.issued += 1
+        return code
+
+    def verify(self, session_id, email, code, purpose="login"):
+        """Check ``code``; returns OTP_OK, OTP_INVALID, OTP_EXPIRED, OTP_LOCKED or OTP_MISSING"""
+        key = (session_id, purpose, email)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return OTP_MISSING
+            if entry.expires <= self.clock():
+                del self._entries[key]
+                self.evicted += 1
+                return OTP_EXPIRED
+            # Compared as bytes: compare_digest rejects str with non-ASCII characters (e.g. full-width digits)
+            if hmac.compare_digest(entry.code.encode(), str(code or "").strip().encode()):
+                del self._entries[key]
+                return OTP_OK
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                del self._entries[key]
+                return OTP_LOCKED
+            return OTP_INVALID
+
+    def attempts_left(self, session_id, email, purpose="login"):
+        with self._lock:
+            entry = self._entries.get((session_id, purpose, email))
+            return 0 if entry is None else self.max_attempts - entry.attempts
+
+    def discard(self, session_id, email, purpose="login"):
+        with self._lock:
+            self._entries.pop((session_id, purpose, email), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _sweep(self, now):
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.expires > now:
+                return
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_otp_manager():
+    """Process-wide OTP manager shared by every Streamlit session"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = OTPManager()
+        return _manager
@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt (n, r, p) presets; each hash needs about 128 * n * r bytes of memory
+COST_PRESETS = {
+    'low': (2 ** 14, 8, 1),      # ~16 MB
+    'default': (2 ** 15, 8, 1),  # ~32 MB
+    'high': (2 ** 17, 8, 1)      # ~128 MB
+}
+# A preset name or explicit "n,r,p"
+PASSWORD_HASH_COST = os.environ.get("PASSWORD_HASH_COST", "default")
+SALT_BYTES = 16
+KEY_BYTES = 32
+# Bounds how many hashes run at once, and so the CPU and scrypt memory used by a burst of sign-ins
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def parse_cost(cost):
+    """Preset name, "n,r,p" string or (n, r, p) tuple -> (n, r, p)"""
+    if isinstance(cost, tuple):
+        return cost
+    if cost in COST_PRESETS:
+        return COST_PRESETS[cost]
+    n, r, p = (int(part) for part in cost.split(","))
+    return n, r, p
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii')
+
+
+class ScryptHasher:
+    """Salted scrypt, stored as 'scrypt$n$r$p$salt$key' so the cost travels with the hash"""
+    prefix = "scrypt$"
+
+    def __init__(self, cost=PASSWORD_HASH_COST):
+        self.n, self.r, self.p = parse_cost(cost)
+
+    def identify(self, stored):
+        return stored.startswith(self.prefix)
+
+    def hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f"scrypt${self.n}${self.r}${self.p}${_b64(salt)}${_b64(key)}"
+
+    def verify(self, password, stored):
+        _, n, r, p, salt, key = stored.split("$")
+        derived = self._derive(password, base64.b64decode(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(derived, base64.b64decode(key))
+
+    def needs_upgrade(self, stored):
+        _, n, r, p, _, _ = stored.split("$")
+        return (int(n), int(r), int(p)) != (self.n, self.r, self.p)
+
+    @staticmethod
+    def _derive(password, salt, n, r, p):
+        # hashlib.scrypt releases the GIL, so pool threads hash in parallel
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r * p + 2 ** 20, dklen=KEY_BYTES)
+
+
+class Sha256Hasher:
+    """Unsalted SHA-256 hex digests from before scrypt; verify only, always upgraded"""
+    def identify(self, stored):
+        return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+    def hash(self, password):
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def verify(self, password, stored):
+        return hmac.compare_digest(self.hash(password), stored)
+
+    def needs_upgrade(self, stored):
+        return True
+
+
+class PasswordHasher:
+    """Hashes with the first hasher and verifies with whichever one recognises the stored hash"""
+    def __init__(self, hashers=None):
+        self.hashers = hashers or [ScryptHasher(), Sha256Hasher()]
+
+    def _find(self, stored):
+        for hasher in self.hashers:
+            if stored and hasher.identify(stored):
+                return hasher
+        return None
+
+    def hash(self, password):
+        return self.hashers[0].hash(password)
+
+    def verify(self, password, stored):
+        """(matches, needs_upgrade) for ``password`` against a stored hash"""
+        hasher = self._find(stored)
+        if hasher is None:
+            return False, False
+        try:
+            if not hasher.verify(password, stored):
+                return False, False
+            return True, hasher is not self.hashers[0] or hasher.needs_upgrade(stored)
+        except Exception as e:
+            print(f"Error verifying password hash: {str(e)}")
+            return False, False
+
+
+_hasher = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_hasher():
+    """Process-wide PasswordHasher, with the cost taken from PASSWORD_HASH_COST"""
+    global _hasher
+    with _lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
+
+
+def _executor():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+        return _pool
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(password, stored):
+    return get_hasher().verify(password, stored)
+
+
+def hash_password_async(password):
+    """hash_password on the hashing pool; returns a Future"""
+    return _executor().submit(hash_password, password)
+
+
+def verify_password_async(password, stored):
+    """verify_password on the hashing pool; returns a Future of (matches, needs_upgrade)"""
+    return _executor().submit(verify_password, password, stored)
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+# Seconds between Drive polls, shared by every dashboard session
+POLL_INTERVAL = float(os.environ.get("VIOLATION_POLL_INTERVAL", 30))
+# Full history is brought up to date on every Nth poll; other polls only read today
+HISTORY_SYNC_EVERY = int(os.environ.get("VIOLATION_HISTORY_SYNC_EVERY", 10))
+# Seconds before the Drive services are rebuilt (fresh credentials and connections)
+SERVICES_REFRESH = float(os.environ.get("DRIVE_SERVICES_REFRESH", 3600))
+
+
+class Subscription:
+    """A session's view of the poller: a small queue of per-type count deltas"""
+    def __init__(self, maxlen=100):
+        self._deltas = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def _push(self, delta):
+        with self._lock:
+            self._deltas.append(delta)
+
+    def drain(self):
+        """Return and clear the deltas received since the last call; never blocks on I/O"""
+        with self._lock:
+            deltas = list(self._deltas)
+            self._deltas.clear()
+        return deltas
+
+
+class ViolationPoller:
+    """Single background thread that owns Drive polling for the whole process
+
+    Each poll reads today's count per violation type and publishes the
+    increase to every live subscription, so API usage does not grow with
+    the number of open sessions. The poller also owns the Drive services:
+    sessions read them through services(), so they always see the objects
+    that are being synced. Stale services are rebuilt on the poll thread
+    and swapped in once ready.
+    """
+    def __init__(self, services_factory, interval=POLL_INTERVAL,
+                 history_sync_every=HISTORY_SYNC_EVERY, services_refresh=SERVICES_REFRESH):
+        self.services_factory = services_factory
+        self.interval = interval
+        self.history_sync_every = history_sync_every
+        self.services_refresh = services_refresh
+        self.polls = 0
+        self.current_date = datetime.now().strftime("%m/%d/%Y")
+        self.counts = {}  # today's count per violation type
+        self.last_poll = None
+        self._subscribers = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._services = None
+        self._services_built = None
+        self._services_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="violation-poller", daemon=True)
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def services(self):
+        """The Drive services this poller keeps in sync; only the first call waits for them to be built"""
+        services = self._services
+        if services is None:
+            with self._services_lock:
+                if self._services is None:
+                    self._services = self.services_factory()
+                    self._services_built = time.monotonic()
+                services = self._services
+        return services
+
+    def _refresh_services(self):
+        # Built off the lock, so sessions keep reading the old services until the swap
+        if (self._services is None or not self.services_refresh
+                or time.monotonic() - self._services_built < self.services_refresh):
+            return
+        try:
+            services = self.services_factory()
+        except Exception as e:
+            print(f"Rebuilding Drive services failed, keeping the current ones: {str(e)}")
+            return
+        with self._services_lock:
+            self._services = services
+            self._services_built = time.monotonic()
+
+    def subscribe(self):
+        """Register a session; it first receives today's counts so far"""
+        subscription = Subscription()
+        with self._lock:
+            for v_type, count in self.counts.items():
+                if count > 0:
+                    subscription._push({'type': v_type, 'new': count, 'total': count, 'initial': True})
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Violation poll failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def poll_once(self):
+        """Read today's counts from Drive and publish any increases"""
+        current_date = datetime.now().strftime("%m/%d/%Y")
+        if current_date != self.current_date:
+            print(f"Date changed from {self.current_date} to {current_date} - resetting counts")
+            with self._lock:
+                self.current_date = current_date
+                self.counts = {}
+
+        self._refresh_services()
+        services = self.services()
+        for v_type, service in services.items():
+            today_data = service.poll_today()
+            today_count = today_data['images_uploaded'] if today_data else 0
+            self._publish(v_type, today_count)
+
+        self.polls += 1
+        if self.history_sync_every and self.polls % self.history_sync_every == 0:
+            for service in services.values():
+                service.sync_changes()
+
+        self.last_poll = datetime.now()
+
+    def _publish(self, v_type, today_count):
+        with self._lock:
+            previous = self.counts.get(v_type)
+            self.counts[v_type] = today_count
+            if today_count <= (previous or 0):
+                return
+            delta = {
+                'type': v_type,
+                'new': today_count - (previous or 0),
+                'total': today_count,
+                'initial': previous is None
+            }
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._push(delta)
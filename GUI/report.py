@@ -0,0 +1,227 @@
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+from fpdf import FPDF
+
+from charts import ChartRenderer, combo_chart, single_chart
+from report_periods import ReportSections, section_series, slice_report_data
+from tables import write_table
+
+
+def generate_report(data, renderer=None, progress=None, output_path=None, appendix_prefix=None,
+                    start=None, end=None, section_cache=None):
+    """Generate a comprehensive PDF report with all violation data and visualizations
+
+    ``data`` holds the frames per category (see collect_report_data in gui.py).
+    ``progress(section, fraction)`` is called as each section starts. Returns
+    the path of the written PDF. Tables too long for the PDF are written
+    to ``{appendix_prefix}_<section>.csv`` when a prefix is given.
+
+    With ``start`` and ``end`` the report covers only those days: frames are
+    sliced first. Charts are always assembled from per-week sections, reused
+    from ``section_cache`` when an earlier report already built them.
+    """
+    def report_progress(section, fraction):
+        if progress is not None:
+            progress(section, fraction)
+    
+    # Initialize PDF with professional layout
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_draw_color(100, 100, 100)  # Gray border color
+    
+    # 1. Cover Page
+    report_progress("Cover page", 0.0)
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 24)
+    pdf.cell(0, 20, 'SAFETY VIOLATION COMPREHENSIVE REPORT', 0, 1, 'C')
+    pdf.ln(10)
+    pdf.set_font('Arial', '', 14)
+    pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 1, 'C')
+    
+    ranged = start is not None or end is not None
+    start, end = report_bounds(data, start, end)
+    if ranged:
+        pdf.cell(0, 10, f"Period: {start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}", 0, 1, 'C')
+        # Everything below only touches the selected days
+        data = slice_report_data(data, start, end)
+    # All-time reports too, so every weekly chart uses the dashboard's month-based weeks
+    sections = (section_cache or ReportSections()).build(data, start, end)
+    
+    try:
+        logo_path = "logo1.png"
+        if os.path.exists(logo_path):
+            pdf.image(logo_path, x=75, w=60)
+    except:
+        pass
+    
+    # 2. Convert dates to datetime objects
+    for category in data:
+        if category == 'Worker Safety':
+            for subtype in data[category]:
+                data[category][subtype]['date'] = pd.to_datetime(data[category][subtype]['date'])
+        else:
+            data[category]['date'] = pd.to_datetime(data[category]['date'])
+
+    # 3. Executive Summary
+    report_progress("Executive summary", 0.05)
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, 'EXECUTIVE SUMMARY', 0, 1)
+    pdf.ln(5)
+    
+    # Calculate totals
+    mask_total = data['Worker Safety']['mask']['violations_count'].sum()
+    gloves_total = data['Worker Safety']['gloves']['violations_count'].sum()
+    fallen_total = data['Fallen Objects']['violations_count'].sum()
+    empty_total = data['Empty Bottles']['violations_count'].sum()
+    
+    # Custom table implementation for summary
+    col_widths = [120, 70]
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(col_widths[0], 10, 'Violation Type', border=1)
+    pdf.cell(col_widths[1], 10, 'Total Count', border=1, ln=1)
+    
+    pdf.set_font('Arial', '', 12)
+    for label, value in [('Mask Violations', mask_total),
+                        ('Gloves Violations', gloves_total),
+                        ('Fallen Objects', fallen_total),
+                        ('Empty Bottles', empty_total)]:
+        pdf.cell(col_widths[0], 10, label, border=1)
+        pdf.cell(col_widths[1], 10, str(value), border=1, ln=1)
+    
+    pdf.ln(15)
+    
+    # 4. Generate All Visualizations
+    report_progress("Charts", 0.1)
+    try:
+        # All charts are drawn up front in the renderer's process pool; unchanged ones come from its cache
+        renderer = renderer or ChartRenderer()
+        charts = renderer.render(build_report_charts(data, sections))
+        renderer.report_timings()
+    except Exception as e:
+        print(f"Visualization error: {str(e)}")
+        charts = None
+
+    if charts is None:
+        pdf.add_page()
+        pdf.set_font("Arial", size=10)
+        pdf.cell(0, 10, "[Some visualizations skipped due to generation error]", 0, 1)
+    else:
+        try:
+            # ========================
+            # Worker Safety Section
+            # ========================
+            report_progress("Worker Safety Violations", 0.5)
+            pdf.add_page()
+            pdf.set_font('Arial', 'B', 16)
+            pdf.cell(0, 10, 'WORKER SAFETY VIOLATIONS', 0, 1)
+            pdf.ln(5)
+        
+            for timeframe in ['daily', 'weekly']:
+                pdf.image(charts[f"worker_{timeframe}"], x=10, w=190)
+                pdf.ln(5)
+            pdf.image(charts["worker_monthly"], x=10, w=190)
+        
+            # ========================
+            # Fallen Objects / Empty Bottles Sections
+            # ========================
+            for prefix, heading, fraction in [('fallen', 'FALLEN OBJECTS VIOLATIONS', 0.55),
+                                              ('empty', 'EMPTY BOTTLES VIOLATIONS', 0.6)]:
+                report_progress(heading.title(), fraction)
+                pdf.add_page()
+                pdf.set_font('Arial', 'B', 16)
+                pdf.cell(0, 10, heading, 0, 1)
+                pdf.ln(5)
+            
+                for timeframe in ['d', 'w', 'm']:
+                    pdf.image(charts[f"{prefix}_{timeframe}"], x=10, w=190)
+                    pdf.ln(5)
+        finally:
+            # Embedded now; the PNGs may be evicted again
+            renderer.release(charts)
+
+    # 5. Detailed Data Section
+    report_progress("Detailed records", 0.65)
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, 'DETAILED VIOLATION RECORDS', 0, 1)
+    pdf.ln(8)
+    
+    for i, category in enumerate(data):
+        report_progress(f"Detailed records: {category}", 0.65 + 0.1 * i)
+        pdf.set_font('Arial', 'B', 14)
+        pdf.cell(0, 10, category.upper(), 0, 1)
+        pdf.ln(5)
+        
+        if category == 'Worker Safety':
+            for subtype in ['mask', 'gloves']:
+                pdf.set_font('Arial', 'B', 12)
+                pdf.cell(0, 8, f"{subtype.capitalize()} Violations:", 0, 1)
+                _ = add_custom_table(pdf, data[category][subtype],
+                                     appendix_file(appendix_prefix, category, subtype))
+                pdf.ln(3)
+        else:
+            _ = add_custom_table(pdf, data[category], appendix_file(appendix_prefix, category))
+            pdf.ln(5)
+
+    # Finalize PDF
+    report_progress("Saving", 0.95)
+    pdf_path = output_path or os.path.join(tempfile.gettempdir(), 
+                            f"Safety_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+    pdf.output(pdf_path)
+    report_progress("Done", 1.0)
+    return pdf_path
+
+def add_custom_table(pdf, df, appendix_prefix=None):
+    """Detailed records table; long histories use a compact layout or an appendix file"""
+    return write_table(pdf, df, appendix_prefix)
+
+# Helper Functions
+def appendix_file(appendix_prefix, *section):
+    if not appendix_prefix:
+        return None
+    return f"{appendix_prefix}_{'_'.join(section).lower().replace(' ', '_')}"
+
+def report_bounds(data, start=None, end=None):
+    """Fill an open end of a date range from the data's first or last day"""
+    dates = [df['date'] for category in data.values()
+             for df in (category.values() if isinstance(category, dict) else [category]) if len(df)]
+    if start is None:
+        start = min(d.iloc[-1] for d in dates) if dates else pd.Timestamp.now()
+    if end is None:
+        end = max(d.iloc[0] for d in dates) if dates else pd.Timestamp.now()
+    return pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+
+def build_report_charts(data, sections=None):
+    """Chart specs for every report section, keyed by the name generate_report places them under
+
+    Daily, weekly and monthly series are summed from month-based week
+    sections (built over all of ``data`` when not given), so week totals and
+    labels match the week sections and the dashboard.
+    """
+    if sections is None:
+        sections = ReportSections().build(data, *report_bounds(data))
+    
+    specs = {}
+    mask, gloves = data['Worker Safety']['mask'], data['Worker Safety']['gloves']
+    specs["worker_daily"] = combo_chart(mask, gloves, "Daily Worker Safety Violations", "Mask", "Gloves")
+    specs["worker_weekly"] = combo_chart(
+        section_series(sections, 'mask', 'W'), section_series(sections, 'gloves', 'W'),
+        "Weekly Worker Safety Violations", "Mask", "Gloves"
+    )
+    specs["worker_monthly"] = combo_chart(
+        section_series(sections, 'mask', 'M'), section_series(sections, 'gloves', 'M'),
+        "Monthly Worker Safety Violations", "Mask", "Gloves"
+    )
+    
+    for category, prefix, color in [('Fallen Objects', 'fallen', '#ff7f0e'),
+                                    ('Empty Bottles', 'empty', '#2ca02c')]:
+        for timeframe, title_suffix in [('D', 'Daily'), ('W', 'Weekly'), ('M', 'Monthly')]:
+            timeframe_data = section_series(sections, prefix, timeframe)
+            specs[f"{prefix}_{timeframe.lower()}"] = single_chart(
+                timeframe_data, f"{title_suffix} {category} Violations", color
+            )
+    return specs
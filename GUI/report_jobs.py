@@ -0,0 +1,163 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from report import generate_report, report_bounds
+from report_periods import ReportSections, slice_report_data
+
+REPORT_CACHE_DIR = ".report_cache"
+MAX_CACHED_REPORTS = 20
+REPORT_WORKERS = 2
+
+
+def data_fingerprint(data):
+    """Content hash of the report's frames; stable across restarts, unlike data_version"""
+    digest = hashlib.sha256()
+    for category in sorted(data):
+        frames = data[category] if isinstance(data[category], dict) else {'': data[category]}
+        for subtype in sorted(frames):
+            df = frames[subtype]
+            digest.update(f"{category}/{subtype}".encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(
+                df[['date', 'violations_count']], index=False
+            ).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def report_key(data, start=None, end=None):
+    """Cache key for a report: what data it was built from and the date range it covers"""
+    return json.dumps({
+        'data': data_fingerprint(data),
+        'start': str(start) if start else None,
+        'end': str(end) if end else None
+    }, sort_keys=True)
+
+
+class ReportJob:
+    """State of one report build, read by the UI on every rerun"""
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'queued'  # queued, running, done or failed
+        self.section = "Waiting to start"
+        self.progress = 0.0
+        self.path = None
+        self.appendices = []  # full tables too long for the PDF
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def _update(self, section, fraction):
+        self.section = section
+        self.progress = fraction
+
+
+class ReportJobs:
+    """Builds PDF reports on background threads and keeps the finished ones on disk
+
+    submit() returns a job id straight away; the UI polls get() for progress.
+    Requests for a report that is already building share that job, and a
+    report already in the cache is returned as a finished job. The cache
+    keeps the most recently used ``max_reports`` PDFs.
+    """
+    def __init__(self, cache_dir=REPORT_CACHE_DIR, max_reports=MAX_CACHED_REPORTS,
+                 workers=REPORT_WORKERS, renderer=None):
+        self.cache_dir = cache_dir
+        self.max_reports = max_reports
+        self.renderer = renderer
+        self.sections = ReportSections()
+        self._jobs = {}
+        self._active = {}  # report key -> job id still building
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.pdf")
+
+    def submit(self, data, start=None, end=None):
+        """Queue a report over ``data``, optionally limited to [start, end], and return its job id"""
+        if start is not None or end is not None:
+            start, end = report_bounds(data, start, end)
+            # Only the selected days decide whether an existing report can be reused
+            data = slice_report_data(data, start, end)
+        key = report_key(data, start, end)
+        with self._lock:
+            if key in self._active:
+                return self._active[key]
+
+            job = ReportJob(key)
+            self._jobs[job.id] = job
+            path = self._cache_path(key)
+            if os.path.exists(path):
+                os.utime(path)
+                job.path = path
+                job.appendices = self._appendices(path)
+                job.status = 'done'
+                job._update("Loaded from cache", 1.0)
+                job.finished_at = time.time()
+                return job.id
+
+            self._active[key] = job.id
+        self._executor.submit(self._build, job, data, path, start, end)
+        return job.id
+
+    @staticmethod
+    def _appendices(path):
+        return sorted(glob.glob(f"{os.path.splitext(path)[0]}_*"))
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _build(self, job, data, path, start=None, end=None):
+        job.status = 'running'
+        tmp_path = f"{path}.{job.id}.tmp"
+        try:
+            generate_report(data, renderer=self.renderer, progress=job._update, output_path=tmp_path,
+                            appendix_prefix=os.path.splitext(path)[0],
+                            start=start, end=end, section_cache=self.sections)
+            os.replace(tmp_path, path)
+            job.path = path
+            job.appendices = self._appendices(path)
+            job.status = 'done'
+        except Exception as e:
+            print(f"Report generation failed: {str(e)}")
+            job.error = str(e)
+            job.status = 'failed'
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active.pop(job.key, None)
+            self.evict()
+
+    def evict(self):
+        """Keep only the most recently used ``max_reports`` PDFs and forget old finished jobs"""
+        try:
+            entries = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)
+                       if f.endswith('.pdf')]
+            if len(entries) > self.max_reports:
+                entries.sort(key=os.path.getmtime, reverse=True)
+                for path in entries[self.max_reports:]:
+                    for appendix in self._appendices(path):
+                        os.remove(appendix)
+                    os.remove(path)
+        except Exception as e:
+            print(f"Report cache eviction failed: {str(e)}")
+
+        cutoff = time.time() - 24 * 3600
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+                del self._jobs[job_id]
@@ -0,0 +1,166 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from violation_store import month_based_weeks
+
+PERIODS = ('week', 'month', 'quarter')
+# Report series and where each lives in the report data
+SERIES = {
+    'mask': ('Worker Safety', 'mask'),
+    'gloves': ('Worker Safety', 'gloves'),
+    'fallen': ('Fallen Objects', None),
+    'empty': ('Empty Bottles', None)
+}
+MAX_SECTIONS = 1024
+
+
+def period_range(period, anchor):
+    """First and last day of the week, month or quarter containing ``anchor``
+
+    Weeks are the dashboard's month-based weeks (see month_based_weeks), cut
+    at month boundaries, so the weeks of a month or quarter partition it.
+    """
+    anchor = pd.Timestamp(anchor).normalize()
+    if period == 'week':
+        start, end = next(month_weeks(anchor.replace(day=1), anchor + pd.offsets.MonthEnd(0),
+                                      containing=anchor))
+        return start, end
+    if period == 'month':
+        return anchor.replace(day=1), anchor + pd.offsets.MonthEnd(0)
+    if period == 'quarter':
+        start = anchor.to_period('Q').start_time
+        return start, anchor.to_period('Q').end_time.normalize()
+    raise ValueError(f"Unknown report period: {period}")
+
+
+def month_weeks(start, end, containing=None):
+    """(first day, last day) of each month-based week between start and end, oldest first"""
+    day = timedelta(days=1)
+    current = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    while current <= end:
+        # Week 1 runs through the Friday after the month's first Saturday, then weeks start on Saturdays
+        month_start = current.replace(day=1)
+        next_week = month_start + timedelta(days=(5 - month_start.weekday()) % 7 + 7)
+        while next_week <= current:
+            next_week += timedelta(days=7)
+        next_month = current + pd.offsets.MonthBegin(1)
+        stop = min(next_week, next_month, end + day)
+        if containing is None or current <= containing < stop:
+            yield current, stop - day
+        current = stop
+
+
+def date_slice(df, start, end):
+    """Rows of a newest-first frame with start <= date <= end, found by binary search"""
+    dates = df['date'].to_numpy()[::-1]  # oldest first, as a view
+    lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start).normalize(), 'ns'), 'left')
+    hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end).normalize(), 'ns'), 'right')
+    return df.iloc[len(dates) - hi:len(dates) - lo]
+
+
+def map_report_data(data, func):
+    """Apply ``func`` to every frame of the report data, keeping its shape"""
+    return {
+        category: {subtype: func(df) for subtype, df in value.items()} if isinstance(value, dict) else func(value)
+        for category, value in data.items()
+    }
+
+
+def slice_report_data(data, start, end):
+    """Report data restricted to [start, end]; frames must be newest first, as DriveService returns them"""
+    return map_report_data(data, lambda df: date_slice(df, start, end))
+
+
+def series_frames(data):
+    for name, (category, subtype) in SERIES.items():
+        yield name, data[category][subtype] if subtype else data[category]
+
+
+class WeekSection:
+    """Totals and daily counts of every series over one month-based week"""
+    __slots__ = ('start', 'end', 'month', 'week', 'totals', 'daily')
+
+    def __init__(self, start, end, data):
+        self.start = start
+        self.end = end
+        month, week = month_based_weeks([start])
+        self.month = str(month[0])
+        self.week = str(week[0])
+        self.totals = {}
+        self.daily = {}
+        for name, df in series_frames(data):
+            # Oldest first, so sections concatenate into a chronological series
+            frame = df[['date', 'violations_count']].iloc[::-1].reset_index(drop=True)
+            self.daily[name] = frame
+            self.totals[name] = int(frame['violations_count'].sum())
+
+
+class ReportSections:
+    """Cache of WeekSection objects shared by every report
+
+    Sections are keyed by their days and a hash of their rows, so a month
+    or quarter report reuses the weeks an earlier report already built,
+    and a day that gains violations only rebuilds its own week.
+    """
+    def __init__(self, max_sections=MAX_SECTIONS):
+        self.max_sections = max_sections
+        self._sections = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def build(self, data, start, end):
+        """Sections covering [start, end] of already sliced report data, oldest first"""
+        sections = []
+        for week_start, week_end in month_weeks(start, end):
+            week_data = slice_report_data(data, week_start, week_end)
+            key = (week_start, week_end, self._fingerprint(week_data))
+            with self._lock:
+                section = self._sections.get(key)
+                if section is not None:
+                    self._sections.move_to_end(key)
+                    self.hits += 1
+            if section is None:
+                section = WeekSection(week_start, week_end, week_data)
+                with self._lock:
+                    self.misses += 1
+                    self._sections[key] = section
+                    while len(self._sections) > self.max_sections:
+                        self._sections.popitem(last=False)
+            sections.append(section)
+        return sections
+
+    @staticmethod
+    def _fingerprint(week_data):
+        return tuple(
+            (tuple(df['date'].to_numpy().view('int64')), tuple(df['violations_count'].to_numpy().tolist()))
+            for _, df in series_frames(week_data)
+        )
+
+
+def section_series(sections, name, freq):
+    """Chart frame ('date', 'violations_count') for one series, by day, week or month"""
+    if freq == 'D':
+        frames = [section.daily[name] for section in sections]
+        if not frames:
+            return pd.DataFrame({'date': pd.to_datetime([]), 'violations_count': []})
+        return pd.concat(frames, ignore_index=True)
+    if freq == 'W':
+        return pd.DataFrame({
+            'date': [section.start for section in sections],
+            'violations_count': [section.totals[name] for section in sections]
+        })
+    # Weeks partition months, so monthly totals are sums of weekly ones
+    months = {}
+    for section in sections:
+        first_day, total = months.get(section.month, (section.start, 0))
+        months[section.month] = (first_day, total + section.totals[name])
+    return pd.DataFrame({
+        'date': [first_day for first_day, _ in months.values()],
+        'violations_count': [total for _, total in months.values()]
+    })
@@ -0,0 +1,81 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Local Drive state directory; this cache is the only thing stored there
+SNAPSHOT_PATH = os.path.join(".drive_state", "snapshots.sqlite3")
+MAX_AGE = 7 * 24 * 3600  # seconds before a snapshot is too stale to show
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class SnapshotCache:
+    """SQLite store of DriveService snapshots, one row per root folder
+
+    A snapshot holds everything needed to draw the dashboard without
+    touching Drive: the root folder, enriched metadata, the date records
+    and the change-feed sync state. Payloads are zlib-compressed JSON so
+    years of history stay small and load in milliseconds.
+    """
+    def __init__(self, path=SNAPSHOT_PATH, max_age=MAX_AGE, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " root_folder_name TEXT PRIMARY KEY,"
+                " synced_at REAL NOT NULL,"
+                " payload BLOB NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def load(self, root_folder_name):
+        """Return the snapshot dict with its ``synced_at`` time, or None if missing or expired"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT synced_at, payload FROM snapshots WHERE root_folder_name = ?",
+                (root_folder_name,)
+            ).fetchone()
+        if row is None:
+            return None
+        synced_at, payload = row
+        if time.time() - synced_at > self.max_age:
+            return None
+        try:
+            snapshot = json.loads(zlib.decompress(payload).decode('utf-8'))
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot for {root_folder_name}: {str(e)}")
+            return None
+        snapshot['synced_at'] = synced_at
+        return snapshot
+
+    def save(self, root_folder_name, snapshot, synced_at=None):
+        """Store a snapshot, then apply the age and size eviction policy"""
+        payload = zlib.compress(json.dumps(snapshot, separators=(',', ':')).encode('utf-8'))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (root_folder_name, synced_at, payload) VALUES (?, ?, ?)",
+                (root_folder_name, synced_at or time.time(), sqlite3.Binary(payload))
+            )
+        self.evict()
+
+    def evict(self):
+        """Drop expired snapshots, then the oldest ones until under max_bytes"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM snapshots WHERE synced_at < ?", (time.time() - self.max_age,))
+            rows = conn.execute(
+                "SELECT root_folder_name, LENGTH(payload) FROM snapshots ORDER BY synced_at DESC"
+            ).fetchall()
+            total = 0
+            for root_folder_name, size in rows:
+                total += size
+                if total > self.max_bytes:
+                    conn.execute("DELETE FROM snapshots WHERE root_folder_name = ?", (root_folder_name,))
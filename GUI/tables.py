@@ -0,0 +1,147 @@
+import os
+
+TABLE_COLUMNS = [('Date', 60), ('Count', 40), ('Running Total', 40)]
+COMPACT_COLUMNS = [('Date', 24), ('Count', 14), ('Running Total', 22)]
+COMPACT_GROUPS = 3  # column groups side by side per page in the compact layout
+COMPACT_GAP = 5
+# Tables longer than this use the compact layout
+COMPACT_ROWS = 400
+# Tables longer than this keep only the newest rows in the PDF, the rest go to an appendix file
+APPENDIX_ROWS = 5000
+APPENDIX_PREVIEW_ROWS = 400
+APPENDIX_FORMAT = os.environ.get("REPORT_APPENDIX_FORMAT", "csv")
+CHUNK_ROWS = 1000
+
+
+def table_frame(df):
+    """Detailed records newest first, with the running total computed in one pass"""
+    frame = df[['date', 'violations_count']].sort_values('date', ascending=False, ignore_index=True)
+    frame['running_total'] = frame['violations_count'].cumsum()
+    return frame
+
+
+def format_rows(frame):
+    """(date, count, running total) strings for a slice of table_frame()"""
+    return list(zip(
+        frame['date'].dt.strftime('%Y-%m-%d'),
+        frame['violations_count'].astype(str),
+        frame['running_total'].astype(str)
+    ))
+
+
+def iter_row_chunks(frame, chunk_rows=CHUNK_ROWS):
+    """Formatted rows in chunks, so only one chunk of strings exists at a time"""
+    for start in range(0, len(frame), chunk_rows):
+        yield format_rows(frame.iloc[start:start + chunk_rows])
+
+
+def write_appendix(frame, path_prefix, fmt=APPENDIX_FORMAT):
+    """Write the full table next to the report; returns the file path"""
+    if fmt == 'parquet':
+        try:
+            path = f"{path_prefix}.parquet"
+            frame.to_parquet(path, index=False)
+            return path
+        except ImportError as e:
+            print(f"Parquet appendix unavailable, writing CSV instead: {str(e)}")
+    path = f"{path_prefix}.csv"
+    frame.to_csv(path, index=False, date_format='%Y-%m-%d', chunksize=CHUNK_ROWS * 10)
+    return path
+
+
+class TableWriter:
+    """Writes a table_frame() into an FPDF document
+
+    Rows are formatted a chunk at a time and the fill colour is set once,
+    with alternate rows toggling fill on and off. ``compact`` lays the rows
+    out in several narrower column groups per page.
+    """
+    def __init__(self, pdf, compact=False, chunk_rows=CHUNK_ROWS):
+        self.pdf = pdf
+        self.compact = compact
+        self.chunk_rows = chunk_rows
+
+    def write(self, frame):
+        if self.compact:
+            self._write_compact(frame)
+        else:
+            self._write_full(frame)
+
+    def _header(self, columns, height, x=None):
+        pdf = self.pdf
+        pdf.set_fill_color(200, 200, 200)
+        pdf.set_font('Arial', 'B', 10 if not self.compact else 7)
+        if x is not None:
+            pdf.set_x(x)
+        for i, (label, width) in enumerate(columns):
+            pdf.cell(width, height, label, border=1, fill=True, ln=1 if i == len(columns) - 1 else 0)
+        pdf.set_fill_color(240, 240, 240)
+
+    def _write_full(self, frame):
+        pdf = self.pdf
+        (_, date_w), (_, count_w), (_, total_w) = TABLE_COLUMNS
+        self._header(TABLE_COLUMNS, 10)
+        pdf.set_font('Arial', '', 9)
+        cell = pdf.cell
+        fill = False
+        for rows in iter_row_chunks(frame, self.chunk_rows):
+            for date, count, total in rows:
+                cell(date_w, 10, date, 1, 0, '', fill)
+                cell(count_w, 10, count, 1, 0, '', fill)
+                cell(total_w, 10, total, 1, 1, '', fill)
+                fill = not fill
+
+    def _write_compact(self, frame):
+        pdf = self.pdf
+        height = 5
+        (_, date_w), (_, count_w), (_, total_w) = COMPACT_COLUMNS
+        group_w = date_w + count_w + total_w
+        cell = pdf.cell
+
+        start = 0
+        while start < len(frame):
+            top = pdf.get_y()
+            rows_per_group = int((pdf.page_break_trigger - top) // height) - 1
+            if rows_per_group < 5:
+                pdf.add_page()
+                continue
+            remaining = len(frame) - start
+            if remaining <= rows_per_group * COMPACT_GROUPS:
+                # Last page: balance the groups so the table ends as high as possible
+                rows_per_group = -(-remaining // COMPACT_GROUPS)
+            page = frame.iloc[start:start + rows_per_group * COMPACT_GROUPS]
+            rows = format_rows(page)
+            for group in range(COMPACT_GROUPS):
+                group_rows = rows[group * rows_per_group:(group + 1) * rows_per_group]
+                if not group_rows:
+                    break
+                x = pdf.l_margin + group * (group_w + COMPACT_GAP)
+                pdf.set_xy(x, top)
+                self._header(COMPACT_COLUMNS, height, x)
+                pdf.set_font('Arial', '', 7)
+                fill = False
+                for date, count, total in group_rows:
+                    pdf.set_x(x)
+                    cell(date_w, height, date, 1, 0, '', fill)
+                    cell(count_w, height, count, 1, 0, '', fill)
+                    cell(total_w, height, total, 1, 1, '', fill)
+                    fill = not fill
+            start += len(page)
+            # Continue below the tallest group: the first one
+            pdf.set_xy(pdf.l_margin, top + height * (min(rows_per_group, len(rows)) + 1))
+            if start < len(frame):
+                pdf.add_page()
+
+
+def write_table(pdf, df, appendix_prefix=None):
+    """Detailed records table sized to its length; returns the appendix path if one was written"""
+    frame = table_frame(df)
+    if len(frame) > APPENDIX_ROWS and appendix_prefix:
+        path = write_appendix(frame, appendix_prefix)
+        TableWriter(pdf, compact=True).write(frame.iloc[:APPENDIX_PREVIEW_ROWS])
+        pdf.set_font('Arial', 'I', 9)
+        pdf.cell(0, 8, f"Latest {APPENDIX_PREVIEW_ROWS} of {len(frame)} records shown; "
+                       f"full table in {os.path.basename(path)}", 0, 1)
+        return path
+    TableWriter(pdf, compact=len(frame) > COMPACT_ROWS).write(frame)
+    return None
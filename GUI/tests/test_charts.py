@@ -0,0 +1,35 @@
+import os
+
+import pandas as pd
+
+from charts import ChartRenderer, single_chart
+
+
+def spec(title):
+    df = pd.DataFrame({'date': pd.date_range("2025-01-01", periods=3), 'violations_count': [1, 2, 3]})
+    return single_chart(df, title, '#1f77b4')
+
+
+def test_eviction_skips_charts_a_report_has_not_embedded(tmp_path):
+    renderer = ChartRenderer(cache_dir=str(tmp_path), workers=1, max_cached=1)
+    first = renderer.render({'a': spec("A")})
+    second = renderer.render({'b': spec("B")})  # over the limit, but 'a' is still pinned
+
+    assert os.path.exists(first['a']) and os.path.exists(second['b'])
+
+    renderer.release(first)
+    renderer.release(second)
+    renderer.render({'c': spec("C")})
+    renderer.evict()
+
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_cached_chart_is_pinned_too(tmp_path):
+    renderer = ChartRenderer(cache_dir=str(tmp_path), workers=1, max_cached=1)
+    renderer.release(renderer.render({'a': spec("A")}))
+    hit = renderer.render({'a': spec("A")})
+    renderer.release(renderer.render({'b': spec("B")}))
+
+    assert renderer.last_timings['b']['cached'] is False
+    assert os.path.exists(hit['a'])
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_cache
+from data_cache import ViolationDataCache
+
+
+class Service:
+    data_version = 1
+    synced_at = None
+
+    def get_available_dates(self):
+        return [{'violations_count': 3}, {'violations_count': 5}]
+
+
+def build(dates):
+    return pd.DataFrame(dates), pd.DataFrame(dates)
+
+
+@pytest.mark.parametrize("cow", [True, False])
+def test_callers_cannot_change_the_cached_frames(monkeypatch, cow):
+    monkeypatch.setattr(data_cache, 'copy_on_write', lambda: cow)
+    cache = ViolationDataCache()
+    first, _ = cache.get('worker', Service(), build)
+
+    first.loc[0, 'violations_count'] = 99
+    first['violations_count'] += 1
+    second, _ = cache.get('worker', Service(), build)
+
+    assert second['violations_count'].tolist() == [3, 5]
+    assert cache.hits == 1
+
+
+def test_copies_are_deep_without_copy_on_write(monkeypatch):
+    monkeypatch.setattr(data_cache, 'copy_on_write', lambda: False)
+    cache = ViolationDataCache()
+    first, _ = cache.get('worker', Service(), build)
+    second, _ = cache.get('worker', Service(), build)
+
+    assert not np.shares_memory(first['violations_count'].to_numpy(), second['violations_count'].to_numpy())
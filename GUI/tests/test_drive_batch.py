@@ -0,0 +1,54 @@
+from drive import DriveService
+from fake_drive import FakeBatch, FakeDrive, build_fake_system
+from snapshot_cache import SnapshotCache
+
+ROOT = 'Safety_Violation_System1'
+METADATA = 'violation_metadata.json'
+
+
+def drop_callbacks(monkeypatch, times):
+    """Make batches silently skip the first request's callback ``times`` times"""
+    remaining = {'drops': times}
+    execute = FakeBatch.execute
+
+    def lossy(self, http=None):
+        callback, first = self.callback, self.requests[0][0]
+
+        def report(request_id, response, exception):
+            if request_id == first and remaining['drops']:
+                remaining['drops'] -= 1
+                return
+            callback(request_id, response, exception)
+        self.callback = report
+        return execute(self, http)
+    monkeypatch.setattr(FakeBatch, 'execute', lossy)
+    return remaining
+
+
+def make_service(drive, tmp_path, **kwargs):
+    return DriveService(ROOT, METADATA, service=drive, sa_email=drive.service_account_email,
+                        snapshot_cache=SnapshotCache(str(tmp_path / "snapshots.sqlite3")),
+                        retry_backoff=0.001, **kwargs)
+
+
+def test_missing_batch_response_is_retried(monkeypatch, tmp_path):
+    drive = FakeDrive()
+    build_fake_system(drive, ROOT, METADATA, days=4)
+    remaining = drop_callbacks(monkeypatch, times=2)
+
+    service = make_service(drive, tmp_path)
+
+    assert remaining['drops'] == 0
+    assert all(folder['accessible'] for folder in service.metadata['date_folders'].values())
+    assert len(service.get_available_dates()) == 4
+
+
+def test_missing_batch_response_becomes_error(monkeypatch, tmp_path):
+    drive = FakeDrive()
+    build_fake_system(drive, ROOT, METADATA, days=4)
+    drop_callbacks(monkeypatch, times=1000)
+
+    service = make_service(drive, tmp_path, max_retries=1)
+
+    accessible = [folder['accessible'] for folder in service.metadata['date_folders'].values()]
+    assert accessible.count(False) == 1
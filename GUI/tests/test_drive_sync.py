@@ -0,0 +1,210 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from drive import DriveService
+from fake_drive import FakeDrive, build_fake_system
+from snapshot_cache import SnapshotCache
+
+ROOT = 'Safety_Violation_System1'
+METADATA = 'violation_metadata.json'
+
+
+@pytest.fixture
+def drive():
+    drive = FakeDrive()
+    build_fake_system(drive, ROOT, METADATA, days=3, files_per_day=2)
+    return drive
+
+
+@pytest.fixture
+def service(drive, tmp_path):
+    service = DriveService(ROOT, METADATA, service=drive, sa_email=drive.service_account_email,
+                           snapshot_cache=SnapshotCache(str(tmp_path / "snapshots.sqlite3")))
+    service.get_available_dates()
+    return service
+
+
+def folder_ids(drive):
+    return sorted(f['id'] for f in drive.files_by_id.values()
+                  if f['name'].startswith('violations_'))
+
+
+def record(service, folder_id):
+    return next(d for d in service.get_available_dates() if d['folder_id'] == folder_id)
+
+
+def full_load(drive, tmp_path):
+    fresh = DriveService(ROOT, METADATA, service=drive, sa_email=drive.service_account_email,
+                         snapshot_cache=SnapshotCache(str(tmp_path / "fresh.sqlite3")))
+    return fresh.get_available_dates(force_refresh=True)
+
+
+def test_added_file_is_counted(drive, service, tmp_path):
+    folder = folder_ids(drive)[0]
+    version = service.data_version
+    drive.add_file("violation_worker7_no-mask_frame9.jpg", 'image/jpeg', folder)
+
+    service.sync_changes()
+
+    assert record(service, folder)['mask_count'] == 2
+    assert record(service, folder)['images_uploaded'] == 3
+    assert service.data_version != version
+    assert service.get_available_dates() == full_load(drive, tmp_path)
+
+
+def test_trashed_file_is_uncounted(drive, service, tmp_path):
+    folder = folder_ids(drive)[0]
+    image = next(f['id'] for f in drive.files_by_id.values()
+                 if folder in f['parents'] and 'no-gloves' in f['name'])
+    drive.trash(image)
+
+    service.sync_changes()
+
+    assert record(service, folder)['gloves_count'] == 0
+    assert record(service, folder)['images_uploaded'] == 1
+    assert service.get_available_dates() == full_load(drive, tmp_path)
+
+
+def test_renamed_file_is_reclassified(drive, service, tmp_path):
+    folder = folder_ids(drive)[0]
+    image = next(f['id'] for f in drive.files_by_id.values()
+                 if folder in f['parents'] and 'no-mask' in f['name'])
+    drive.rename(image, "violation_worker0_no-gloves_frame0.jpg")
+
+    service.sync_changes()
+
+    assert record(service, folder)['mask_count'] == 0
+    assert record(service, folder)['gloves_count'] == 2
+    assert record(service, folder)['images_uploaded'] == 2
+    assert service.get_available_dates() == full_load(drive, tmp_path)
+
+
+def test_moved_file_changes_folder(drive, service, tmp_path):
+    source, target = folder_ids(drive)[:2]
+    image = next(f['id'] for f in drive.files_by_id.values() if source in f['parents'])
+    drive.move(image, target)
+
+    service.sync_changes()
+
+    assert record(service, source)['images_uploaded'] == 1
+    assert record(service, target)['images_uploaded'] == 3
+    assert service.get_available_dates() == full_load(drive, tmp_path)
+
+
+def test_unrelated_change_keeps_data_version(drive, service):
+    version = service.data_version
+    dates = service.get_available_dates()
+    elsewhere = drive.add_folder("Holiday photos")
+    drive.add_file("beach.jpg", 'image/jpeg', elsewhere)
+
+    service.sync_changes()
+
+    assert service.data_version == version
+    assert service.get_available_dates() is dates
+
+
+@pytest.fixture
+def today_drive():
+    drive = FakeDrive()
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=2)
+    build_fake_system(drive, ROOT, METADATA, days=3, files_per_day=2, start=start)
+    return drive
+
+
+def today_folder(drive):
+    name = f"violations_{datetime.now().strftime('%m_%d_%Y')}_"
+    return next(f['id'] for f in drive.files_by_id.values() if f['name'].startswith(name))
+
+
+def test_poll_today_refreshes_cached_dates(today_drive, tmp_path):
+    service = DriveService(ROOT, METADATA, service=today_drive, sa_email=today_drive.service_account_email,
+                           snapshot_cache=SnapshotCache(str(tmp_path / "snapshots.sqlite3")))
+    service.get_available_dates()
+    folder = today_folder(today_drive)
+    version = service.data_version
+    today_drive.add_file("violation_worker5_no-mask_frame5.jpg", 'image/jpeg', folder)
+
+    assert service.poll_today()['images_uploaded'] == 3
+    assert record(service, folder)['images_uploaded'] == 3
+    assert service.data_version != version
+
+    # Replaying the same addition from the changes feed must not count it twice
+    today_drive.trash(next(f['id'] for f in today_drive.files_by_id.values()
+                           if folder in f['parents'] and 'no-gloves' in f['name']))
+    service.sync_changes()
+    assert record(service, folder)['images_uploaded'] == 2
+    assert service.get_available_dates() == full_load(today_drive, tmp_path)
+
+    version = service.data_version
+    service.poll_today()
+    assert service.data_version == version
+
+
+class NoScanIndex(dict):
+    def items(self):
+        raise AssertionError("the whole file index was scanned")
+
+    keys = values = __iter__ = items
+
+
+def folder_index(service):
+    index = {}
+    for file_id, (folder_id, _) in service._sync_state['files'].items():
+        index.setdefault(folder_id, set()).add(file_id)
+    return index
+
+
+def test_poll_today_only_looks_at_todays_files(today_drive, tmp_path):
+    service = DriveService(ROOT, METADATA, service=today_drive, sa_email=today_drive.service_account_email,
+                           snapshot_cache=SnapshotCache(str(tmp_path / "snapshots.sqlite3")))
+    service.get_available_dates()
+    folder = today_folder(today_drive)
+    today_drive.trash(next(f['id'] for f in today_drive.files_by_id.values() if folder in f['parents']))
+    today_drive.add_file("violation_worker5_no-mask_frame5.jpg", 'image/jpeg', folder)
+    service._sync_state['files'] = NoScanIndex(service._sync_state['files'])
+
+    assert service.poll_today()['images_uploaded'] == 2
+    assert record(service, folder)['images_uploaded'] == 2
+
+    service._sync_state['files'] = dict(dict.items(service._sync_state['files']))
+    assert {k: v for k, v in service._folder_files.items() if v} == folder_index(service)
+
+
+def test_folder_index_follows_changes(drive, service):
+    source, target = folder_ids(drive)[:2]
+    moved, trashed = [f['id'] for f in drive.files_by_id.values() if source in f['parents']][:2]
+    drive.move(moved, target)
+    drive.trash(trashed)
+
+    service.sync_changes()
+
+    assert moved in service._folder_files[target] and moved not in service._folder_files[source]
+    assert trashed not in service._folder_files[source]
+    assert {k: v for k, v in service._folder_files.items() if v} == folder_index(service)
+
+
+def test_new_metadata_entry_only_looks_up_the_new_folder(drive, service, tmp_path):
+    root = service.root_folder['id']
+    metadata_id = service.metadata_file_id
+    metadata = json.loads(json.dumps(drive.contents[metadata_id]))
+    folder = drive.add_folder("violations_01_04_2025_00000003", root)
+    drive.files_by_id[folder]['permissions'].append({'emailAddress': drive.service_account_email})
+    drive.add_file("violation_worker1_no-gloves_frame1.jpg", 'image/jpeg', folder)
+    metadata['date_folders']['01_04_2025'] = {
+        'folder_id': folder,
+        'folder_name': "violations_01_04_2025_00000003",
+        'display_date': "01/04/2025",
+        'created_at': "2025-01-04T00:00:00"
+    }
+    drive.set_content(metadata_id, metadata)
+    looked_up = drive.batched_calls.get('files.get', 0)
+
+    service.sync_changes()
+
+    assert drive.batched_calls.get('files.get', 0) - looked_up == 1
+    assert record(service, folder)['gloves_count'] == 1
+    assert service.metadata['date_folders']['01_04_2025']['accessible']
+    assert all(entry['accessible'] for entry in service.metadata['date_folders'].values())
+    assert service.get_available_dates() == full_load(drive, tmp_path)
@@ -0,0 +1,99 @@
+import smtplib
+from email.message import EmailMessage
+
+import pytest
+
+from fake_smtp import FakeSMTPServer
+from mailer import Mailer
+
+SENDER = "sender@example.com"
+
+
+def message(i, to):
+    msg = EmailMessage()
+    msg['From'] = SENDER
+    msg['To'] = to
+    msg['Subject'] = f"OTP {i}"
+    msg.set_content(f"Your code is {i:06d}")
+    return msg
+
+
+@pytest.fixture
+def serve():
+    servers, mailers = [], []
+
+    def start(mailer_options=None, **server_options):
+        server = FakeSMTPServer(**server_options).start()
+        mailer = Mailer(server.host, server.port, use_ssl=False, threads=1, **(mailer_options or {}))
+        servers.append(server)
+        mailers.append(mailer)
+        return server, mailer
+
+    yield start
+    for mailer in mailers:
+        mailer.close()
+    for server in servers:
+        server.stop()
+
+
+def send_all(mailer, count):
+    handles = [mailer.send(message(i, f"user{i}@example.com"), SENDER, "secret") for i in range(count)]
+    return [handle.wait(10) for handle in handles], handles
+
+
+def test_delivers_recipients_and_bodies(serve):
+    server, mailer = serve()
+
+    results, _ = send_all(mailer, 3)
+
+    assert results == [True, True, True]
+    assert [(sender, recipients) for sender, recipients, _ in server.envelopes] == [
+        (SENDER, [f"user{i}@example.com"]) for i in range(3)
+    ]
+    for i, (_, _, body) in enumerate(server.envelopes):
+        assert f"Your code is {i:06d}".encode() in body
+        assert f"To: user{i}@example.com".encode() in body
+    assert server.connections == 1
+    assert server.logins == 1
+
+
+def test_reconnects_after_server_drops(serve):
+    server, mailer = serve(drop_after=2)
+
+    results, _ = send_all(mailer, 5)
+
+    assert results == [True] * 5
+    assert len(server.messages) == 5
+    assert mailer.stats()['reconnects'] == 2
+    assert server.connections == 3
+
+
+def test_drop_after_data_is_not_resent(serve):
+    server, mailer = serve(hang_up_before_reply={2})
+
+    results, handles = send_all(mailer, 3)
+
+    assert results == [True, False, True]
+    assert isinstance(handles[1].error, smtplib.SMTPServerDisconnected)
+    assert [recipients for _, recipients, _ in server.envelopes] == [
+        ["user0@example.com"], ["user1@example.com"], ["user2@example.com"]
+    ]
+
+
+def test_server_without_auth_is_refused(serve):
+    server, mailer = serve(auth=False)
+
+    results, handles = send_all(mailer, 1)
+
+    assert results == [False]
+    assert isinstance(handles[0].error, smtplib.SMTPNotSupportedError)
+    assert server.messages == []
+
+
+def test_auth_can_be_turned_off_for_debug_servers(serve):
+    server, mailer = serve({'require_auth': False}, auth=False)
+
+    results, _ = send_all(mailer, 1)
+
+    assert results == [True]
+    assert server.logins == 0
@@ -0,0 +1,82 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from otp import OTP_EXPIRED, OTP_INVALID, OTP_LOCKED, OTP_MISSING, OTP_OK, OTPManager
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    # Switch threads far more often than usual so races have a chance to show
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_hundreds_of_parallel_sessions(sessions=500, threads=32, wrong_guesses=2):
+    manager = OTPManager()
+    start = threading.Barrier(threads)
+
+    def session(i):
+        if i < threads:
+            start.wait()
+        session_id, email = f"session-{i}", f"user{i % 50}@example.com"  # emails shared between sessions
+        code = manager.issue(session_id, email)
+        wrong = f"{(int(code) + 1) % 1000000:06d}"
+        results = [manager.verify(session_id, email, wrong) for _ in range(wrong_guesses)]
+        results.append(manager.verify(f"other-{i}", email, code))  # another session never sees it
+        results.append(manager.verify(session_id, email, code))
+        results.append(manager.verify(session_id, email, code))  # single use
+        return results
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(session, range(sessions)))
+
+    expected = [OTP_INVALID] * wrong_guesses + [OTP_MISSING, OTP_OK, OTP_MISSING]
+    correct = sum(r == expected for r in results)
+    assert correct == sessions
+    assert len(manager) == 0
+    assert manager.issued == sessions
+
+
+def test_a_code_is_redeemed_once_under_contention(threads=32, rounds=20):
+    manager = OTPManager()
+    for _ in range(rounds):
+        code = manager.issue("session", "user@example.com")
+        start = threading.Barrier(threads)
+
+        def redeem(_):
+            start.wait()
+            return manager.verify("session", "user@example.com", code)
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(redeem, range(threads)))
+        assert results.count(OTP_OK) == 1
+        assert results.count(OTP_MISSING) == threads - 1
+
+
+@pytest.mark.parametrize("entered", ["１２３４５６", "é", "12345é", None, ""])
+def test_non_ascii_input_counts_as_a_failed_attempt(entered):
+    manager = OTPManager(max_attempts=2)
+    code = manager.issue("s", "a@example.com")
+
+    assert manager.verify("s", "a@example.com", entered) == OTP_INVALID
+    assert manager.attempts_left("s", "a@example.com") == 1
+    assert manager.verify("s", "a@example.com", f" {code} ") == OTP_OK
+
+
+def test_attempt_limit_and_expiry():
+    now = [0.0]
+    manager = OTPManager(ttl=300, max_attempts=3, clock=lambda: now[0])
+    manager.issue("s", "a@example.com")
+    statuses = [manager.verify("s", "a@example.com", "x") for _ in range(3)]
+    manager.issue("s", "b@example.com")
+    now[0] = 301
+
+    statuses.append(manager.verify("s", "b@example.com", "000000"))
+
+    assert statuses == [OTP_INVALID, OTP_INVALID, OTP_LOCKED, OTP_EXPIRED]
+    assert len(manager) == 0
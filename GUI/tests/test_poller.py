@@ -0,0 +1,104 @@
+import threading
+import time
+
+from poller import ViolationPoller
+
+
+class CountingService:
+    def __init__(self, images):
+        self.images = images
+        self.polls = 0
+
+    def poll_today(self):
+        self.polls += 1
+        return {'images_uploaded': self.images}
+
+    def sync_changes(self):
+        pass
+
+
+def test_sessions_read_the_services_the_poller_syncs():
+    built = []
+
+    def factory():
+        built.append({'worker': CountingService(len(built) + 1)})
+        return built[-1]
+
+    poller = ViolationPoller(factory, services_refresh=0)
+    session_view = poller.services()
+    poller.poll_once()
+
+    assert poller.services() is session_view
+    assert session_view['worker'].polls == 1
+    assert len(built) == 1
+
+
+def test_refreshed_services_replace_the_old_ones_everywhere(monkeypatch):
+    clock = {'now': 0.0}
+    monkeypatch.setattr('poller.time.monotonic', lambda: clock['now'])
+    built = []
+
+    def factory():
+        built.append({'worker': CountingService(len(built) + 1)})
+        return built[-1]
+
+    poller = ViolationPoller(factory, services_refresh=60)
+    first = poller.services()
+    clock['now'] = 61.0
+    poller.poll_once()
+
+    assert len(built) == 2
+    assert poller.services() is built[1]
+    assert built[1]['worker'].polls == 1
+    assert first['worker'].polls == 0
+    assert poller.counts == {'worker': 2}
+
+
+def test_sessions_keep_old_services_while_new_ones_build(monkeypatch):
+    clock = {'now': 0.0}
+    monkeypatch.setattr('poller.time.monotonic', lambda: clock['now'])
+    building, release = threading.Event(), threading.Event()
+    built = []
+
+    def factory():
+        if built:
+            building.set()
+            release.wait(5)
+        built.append({'worker': CountingService(len(built) + 1)})
+        return built[-1]
+
+    poller = ViolationPoller(factory, services_refresh=60)
+    first = poller.services()
+    clock['now'] = 61.0
+    poll = threading.Thread(target=poller.poll_once)
+    poll.start()
+    assert building.wait(5)
+
+    start = time.perf_counter()
+    assert poller.services() is first
+    assert time.perf_counter() - start < 0.5
+
+    release.set()
+    poll.join(5)
+    assert poller.services() is built[1]
+    assert built[1]['worker'].polls == 1
+
+
+def test_failed_rebuild_keeps_the_current_services(monkeypatch):
+    clock = {'now': 0.0}
+    monkeypatch.setattr('poller.time.monotonic', lambda: clock['now'])
+    built = []
+
+    def factory():
+        if built:
+            raise ConnectionError("Drive unreachable")
+        built.append({'worker': CountingService(1)})
+        return built[-1]
+
+    poller = ViolationPoller(factory, services_refresh=60)
+    first = poller.services()
+    clock['now'] = 61.0
+    poller.poll_once()
+
+    assert poller.services() is first
+    assert first['worker'].polls == 1
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from report import build_report_charts, report_bounds
+from report_periods import ReportSections, month_weeks, slice_report_data
+
+
+def report_data(days=75):
+    # Newest first, as DriveService returns the frames
+    dates = pd.date_range("2025-01-01", periods=days, freq="D")[::-1]
+    frame = lambda scale: pd.DataFrame({'date': dates, 'violations_count': [scale * (i % 5) for i in range(days)]})
+    return {'Worker Safety': {'mask': frame(1), 'gloves': frame(2)},
+            'Fallen Objects': frame(3), 'Empty Bottles': frame(4)}
+
+
+def bars(spec):
+    return [(bar['dates'].tolist(), bar['counts'].tolist()) for bar in spec['bars']]
+
+
+def test_all_time_charts_use_month_based_weeks():
+    data = report_data()
+    specs = build_report_charts(data)
+
+    week_starts = [pd.Timestamp(start).value for start, _ in month_weeks(*report_bounds(data))]
+    (mask_dates, mask_counts), (gloves_dates, _) = bars(specs["worker_weekly"])
+    assert mask_dates == gloves_dates == week_starts
+    assert sum(mask_counts) == data['Worker Safety']['mask']['violations_count'].sum()
+    assert bars(specs["fallen_m"])[0][0] == [pd.Timestamp(m).value for m in ("2025-01-01", "2025-02-01", "2025-03-01")]
+
+
+def test_all_time_and_ranged_charts_agree():
+    data = report_data()
+    start, end = report_bounds(data)
+    ranged = build_report_charts(slice_report_data(data, start, end),
+                                 ReportSections().build(data, start, end))
+    all_time = build_report_charts(data)
+
+    assert ranged.keys() == all_time.keys()
+    assert all(bars(ranged[name]) == bars(all_time[name]) for name in ranged)
@@ -0,0 +1,66 @@
+import threading
+
+from user_store import JsonUserStore, SqliteUserStore
+
+
+def sqlite_stores(tmp_path, count):
+    """Separate connections to one database, as separate Streamlit processes would have"""
+    path = str(tmp_path / "users.sqlite3")
+    return [SqliteUserStore(path, import_from=None) for _ in range(count)]
+
+
+def test_update_sees_writes_from_other_connections(tmp_path):
+    first, second = sqlite_stores(tmp_path, 2)
+    first.put("a@example.com", {'password': 'a'})
+    assert len(second) == 1  # second now holds a cached index
+
+    first.put("b@example.com", {'password': 'b'})
+    second.update(lambda users: users["a@example.com"].update(password='a2'))
+
+    assert first.all() == {"a@example.com": {'password': 'a2'}, "b@example.com": {'password': 'b'}}
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    stores = sqlite_stores(tmp_path, 4)
+    stores[0].put("counter@example.com", {'logins': 0})
+
+    def bump(users):
+        users["counter@example.com"]['logins'] += 1
+
+    def worker(store):
+        for _ in range(25):
+            store.update(bump)
+
+    threads = [threading.Thread(target=worker, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stores[0].get("counter@example.com") == {'logins': 100}
+
+
+def test_failed_change_rolls_back(tmp_path):
+    store, = sqlite_stores(tmp_path, 1)
+    store.put("a@example.com", {'password': 'a'})
+
+    def broken(users):
+        users.clear()
+        raise ValueError("boom")
+
+    try:
+        store.update(broken)
+    except ValueError:
+        pass
+    assert store.all() == {"a@example.com": {'password': 'a'}}
+    store.put("b@example.com", {'password': 'b'})  # the connection is usable again
+    assert len(store) == 2
+
+
+def test_get_returns_a_copy(tmp_path):
+    for store in (SqliteUserStore(str(tmp_path / "users.sqlite3"), import_from=None),
+                  JsonUserStore(str(tmp_path / "users.json"))):
+        store.put("a@example.com", {'password': 'a'})
+        store.get("a@example.com")['password'] = 'changed'
+        store.all()["a@example.com"]['password'] = 'changed'
+        assert store.get("a@example.com") == {'password': 'a'}
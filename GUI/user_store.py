@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+USERS_FILE = "users.json"
+USER_STORE_BACKEND = os.environ.get("USER_STORE_BACKEND", "json")
+USER_STORE_PATH = os.environ.get("USER_STORE_PATH")
+
+
+def normalize_users(users):
+    """Convert the old {email: password_hash} format to {email: {'password': ...}}"""
+    if users and isinstance(next(iter(users.values())), str):
+        return {email: {'password': pwd} for email, pwd in users.items()}
+    return users
+
+
+class FileLock:
+    """Exclusive lock on ``path`` shared with other processes (fcntl, or msvcrt on Windows)"""
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class JsonUserStore:
+    """users.json behind an in-memory index
+
+    Reads only stat() the file and re-parse it when its mtime or size
+    changed, so reruns of the auth pages do no parsing. Writes take a file
+    lock, re-read the latest version, and replace the file atomically.
+    """
+    def __init__(self, path=USERS_FILE):
+        self.path = path
+        self._users = {}
+        self._stamp = None
+        self._lock = threading.RLock()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self, force=False):
+        stamp = self._file_stamp()
+        if stamp == self._stamp and not force:
+            return
+        with self._lock:
+            users = {}
+            if stamp is not None:
+                try:
+                    with open(self.path, "r") as f:
+                        data = f.read()
+                    if data.strip():  # Handle empty file
+                        users = normalize_users(json.loads(data))
+                except json.JSONDecodeError:
+                    users = {}
+            self._users = users
+            self._stamp = stamp
+
+    def all(self):
+        """Copy of every user record, keyed by email"""
+        self._refresh()
+        return {email: dict(record) for email, record in self._users.items()}
+
+    def get(self, email):
+        """Copy of one user record, or None"""
+        self._refresh()
+        record = self._users.get(email)
+        return dict(record) if record is not None else None
+
+    def __contains__(self, email):
+        return self.get(email) is not None
+
+    def __len__(self):
+        self._refresh()
+        return len(self._users)
+
+    def put(self, email, record):
+        self.update(lambda users: users.__setitem__(email, record))
+
+    def replace_all(self, users):
+        self.update(lambda current: (current.clear(), current.update(users)))
+
+    def update(self, change):
+        """Apply ``change(users)`` to the latest users under the file lock and persist it"""
+        with self._lock, FileLock(f"{self.path}.lock"):
+            self._refresh(force=True)
+            users = dict(self._users)
+            change(users)
+            self._write(users)
+            self._users = users
+            self._stamp = self._file_stamp()
+
+    def _write(self, users):
+        # Write a sibling temp file, then rename over the original so readers never see a partial file
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".users-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(users, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class SqliteUserStore:
+    """SQLite user table with the same interface as JsonUserStore, for larger user sets
+
+    The in-memory index is reloaded only when ``PRAGMA data_version`` shows
+    another connection committed. Writes run in one ``BEGIN IMMEDIATE``
+    transaction that re-reads the table, so updates from other processes
+    are never overwritten. An existing users.json is imported into an
+    empty database.
+    """
+    def __init__(self, path="users.sqlite3", import_from=USERS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, record TEXT NOT NULL)")
+        self._conn.commit()
+        self._users = {}
+        self._data_version = None
+        if import_from and os.path.exists(import_from) and not len(self):
+            users = JsonUserStore(import_from).all()
+            if users:
+                self.replace_all(users)
+
+    def _refresh(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return
+            rows = self._conn.execute("SELECT email, record FROM users").fetchall()
+            self._users = {email: json.loads(record) for email, record in rows}
+            self._data_version = version
+
+    def all(self):
+        """Copy of every user record, keyed by email"""
+        self._refresh()
+        return {email: dict(record) for email, record in self._users.items()}
+
+    def get(self, email):
+        """Copy of one user record, or None"""
+        self._refresh()
+        record = self._users.get(email)
+        return dict(record) if record is not None else None
+
+    def __contains__(self, email):
+        return self.get(email) is not None
+
+    def __len__(self):
+        self._refresh()
+        return len(self._users)
+
+    def put(self, email, record):
+        # A single statement is atomic on its own; no read-modify-write needed
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO users (email, record) VALUES (?, ?)",
+                               (email, json.dumps(record)))
+        self._users[email] = dict(record)
+
+    def replace_all(self, users):
+        self.update(lambda current: (current.clear(), current.update(users)))
+
+    def update(self, change):
+        """Apply ``change(users)`` to the latest users and persist it, all in one write transaction"""
+        with self._lock:
+            # Takes the write lock up front: no other connection can commit between our read and write
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                stored = dict(self._conn.execute("SELECT email, record FROM users").fetchall())
+                users = {email: json.loads(record) for email, record in stored.items()}
+                change(users)
+
+                removed = [(email,) for email in stored if email not in users]
+                written = [(email, record) for email, record in
+                           ((email, json.dumps(record)) for email, record in users.items())
+                           if stored.get(email) != record]
+                self._conn.executemany("DELETE FROM users WHERE email = ?", removed)
+                self._conn.executemany("INSERT OR REPLACE INTO users (email, record) VALUES (?, ?)", written)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            # Our own commit leaves data_version unchanged, so the index stays current
+            self._users = users
+            self._data_version = version
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_user_store():
+    """Process-wide user store; USER_STORE_BACKEND=sqlite selects the SQLite backend"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if USER_STORE_BACKEND == "sqlite":
+                _store = SqliteUserStore(USER_STORE_PATH or "users.sqlite3")
+            else:
+                _store = JsonUserStore(USER_STORE_PATH or USERS_FILE)
+        return _store
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+COUNT_COLUMNS = ['mask_count', 'gloves_count', 'images_uploaded', 'videos_count']
+
+
+def month_based_weeks(dates):
+    """Vectorised get_month_based_week: month and Saturday-anchored week labels
+
+    Week 1 runs from the 1st up to the day before the month's first
+    Saturday, then each week starts on a Saturday. Returns two
+    categoricals whose categories sort chronologically.
+    """
+    dates = pd.DatetimeIndex(dates)
+    day = dates.day.to_numpy()
+    month_start_weekday = (dates.weekday.to_numpy() - (day - 1)) % 7
+    first_saturday = 1 + (5 - month_start_weekday) % 7
+    week_num = np.where(day < first_saturday, 1, (day - first_saturday) // 7 + 1)
+
+    # Format each distinct month/week once instead of once per row
+    year_month = dates.year.to_numpy() * 100 + dates.month.to_numpy()
+    month_codes, month_keys = pd.factorize(year_month, sort=True)
+    month_labels = [f"{k // 100}-{k % 100:02d}" for k in month_keys]
+    week_codes, week_keys = pd.factorize(year_month * 10 + week_num, sort=True)
+    week_labels = [f"{k // 1000}-{k // 10 % 100:02d}-W{k % 10:02d}" for k in week_keys]
+
+    month = pd.Categorical.from_codes(month_codes, categories=month_labels, ordered=True)
+    week = pd.Categorical.from_codes(week_codes, categories=week_labels, ordered=True)
+    return month, week
+
+
+def build_violation_frame(dates):
+    """One typed frame of per-day counts from DriveService date records"""
+    records = pd.DataFrame.from_records(
+        dates, columns=['display_date', 'folder_id'] + COUNT_COLUMNS
+    )
+    parsed = pd.to_datetime(records['display_date'], format="%m/%d/%Y")
+    month, week = month_based_weeks(parsed)
+    frame = pd.DataFrame({
+        'display_date': records['display_date'],
+        'date': parsed,
+        'folder_id': records['folder_id'],
+        'month': month,
+        'week': week
+    })
+    for column in COUNT_COLUMNS:
+        frame[column] = records[column].fillna(0).astype('int32')
+    return frame
+
+
+class ViolationStore:
+    """Columnar store of a system's daily counts with a view per violation type
+
+    Dates are parsed once and month/week columns computed with array
+    arithmetic; the views share those columns instead of rebuilding rows.
+    """
+    def __init__(self, dates):
+        self.frame = build_violation_frame(dates)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def view(self, count_column):
+        """Frame in the shape the dashboard expects, counting ``count_column``"""
+        frame = self.frame
+        return pd.DataFrame({
+            'display_date': frame['display_date'],
+            'date': frame['date'],
+            'violations_count': frame[count_column],
+            'month': frame['month'],
+            'week': frame['week'],
+            'folder_id': frame['folder_id']
+        })
+
+    def mask(self):
+        return self.view('mask_count')
+
+    def gloves(self):
+        return self.view('gloves_count')
+
+    def incidents(self):
+        """Fallen/empty bottle view: images are the violations"""
+        view = self.view('images_uploaded')
+        view['images_count'] = self.frame['images_uploaded']
+        view['videos_count'] = self.frame['videos_count']
+        return view
@@ -0,0 +1,257 @@
+"""Benchmarks for the PPE detection pipeline, run with stub models so no weights are needed
+
+    python benchmarks.py inference pipeline gating nms
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+import numpy as np
+
+import detections as dets
+from inference import InferenceEngine, StubModel, prepare
+from ppe_service import (CallbackSink, Config, DetectionService, StubDetector, SyntheticSource,
+                         VideoWriterSink, demo_script, open_source, split_detections)
+
+# Relative cost of the three notebook models: custom (person/mask/gloves), hardhat, logo
+MODEL_COSTS = {'custom': 40.0, 'cap': 25.0, 'logo': 15.0}
+
+
+def _frames(count, width=1280, height=720):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def _stub_models(scale):
+    box = (100.0, 100.0, 300.0, 500.0, 0.9, "person")
+    return {name: StubModel(cost * scale, [box]) for name, cost in MODEL_COSTS.items()}
+
+
+def _best_fps(run, frames, rounds=3):
+    # Best of a few rounds, to keep scheduler noise out of the comparison
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for frame in frames:
+            run(frame)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(frames) / best
+
+
+def bench_inference(scales=(0.25, 1.0), frames=20):
+    """Per-call preprocessing with models in series versus one shared input and concurrent models"""
+    print(f"{os.cpu_count()} CPUs, 1280x720 frames, stub model costs {MODEL_COSTS} ms x scale")
+    batch = _frames(frames)
+    for scale in scales:
+        models = _stub_models(scale)
+
+        # What process_frame does today: every model call letterboxes the frame itself
+        def per_call(frame):
+            for model in models.values():
+                model.predict(prepare(frame))
+
+        serial = _best_fps(per_call, batch)
+        results = {}
+        for concurrent in (False, True):
+            engine = InferenceEngine(models, concurrent=concurrent)
+            results[concurrent] = (_best_fps(engine.infer, batch), engine.latency())
+            engine.close()
+
+        fps, latency = results[True]
+        print(f"scale {scale}: per-call preprocessing {serial:.1f} fps, shared input {results[False][0]:.1f} fps, "
+              f"shared + concurrent {fps:.1f} fps ({fps / serial:.2f}x)")
+        print("  " + ", ".join(f"{name} {stats['mean_ms']:.1f} ms" for name, stats in latency.items()))
+
+
+def _write_video(path, frames, width=1280, height=720, fps=25):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for _, frame in SyntheticSource(frames, width, height, fps):
+        out.write(frame)
+    out.release()
+
+
+def bench_pipeline(frames=150, batch_sizes=(1, 4, 8), queue_depth=8, scale=0.25):
+    """Serial read/detect/write loop versus the threaded pipeline at several batch sizes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, "input.mp4")
+        _write_video(video, frames)
+        # A fixed per-call cost that batching amortizes, like a real model's
+        box = (380.0, 70.0, 770.0, 680.0, 0.9, "person")
+        models = {name: StubModel(cost * scale, [box], call_overhead_ms=cost * scale)
+                  for name, cost in MODEL_COSTS.items()}
+
+        runs = [("serial", dict(pipelined=False))]
+        runs += [(f"pipeline batch {size}", dict(batch_size=size, queue_depth=queue_depth)) for size in batch_sizes]
+        for label, options in runs:
+            engine = InferenceEngine(models)
+            config = Config(violation_dir=None, motion_gate=False, **options)
+            source = open_source(video, config)
+            sinks = [VideoWriterSink(os.path.join(tmp, "output.mp4"), source.fps, source.size)]
+            stats = DetectionService(engine, config, sinks).run(source)
+            engine.close()
+            line = f"{label}: {stats['fps']:.1f} fps"
+            if 'stages' in stats:
+                line += " (" + ", ".join(f"{name} {stage['utilization']:.0%}" for name, stage in stats['stages'].items()) + " busy)"
+            print(line)
+
+
+class _MostlyStaticScene:
+    """A still scene with a block that moves only during ``moving`` frame ranges"""
+    def __init__(self, frames, moving, width=1280, height=720, fps=25):
+        self.frames = frames
+        self.moving = moving
+        self.fps = fps
+        self.size = (width, height)
+
+    def __iter__(self):
+        width, height = self.size
+        rng = np.random.default_rng(0)
+        background = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+        x = 0
+        for frame_count in range(self.frames):
+            if any(start <= frame_count < end for start, end in self.moving):
+                x = (x + 12) % (width - 120)
+            frame = background.copy()
+            frame[300:420, x:x + 120] = (40, 160, 220)
+            yield frame_count, frame
+
+
+def bench_gating(frames=250, moving=((60, 90), (180, 200)), latency=0.03, strides=(5, 15)):
+    """Share of frames skipped by the motion gate, the throughput gained, and unchanged violation timing"""
+    moving_frames = sum(end - start for start, end in moving)
+    print(f"{frames} frames, {moving_frames} with motion, {latency * 1000:.0f} ms per inference")
+    runs = [("every frame", dict(motion_gate=False))]
+    runs += [(f"gate stride {stride}", dict(gate_stride=stride)) for stride in strides]
+    for label, options in runs:
+        events = []
+        config = Config(violation_dir=None, pipelined=False, **options)
+        service = DetectionService(StubDetector(demo_script, latency), config,
+                                   [CallbackSink(lambda event: events.append(event.frame))])
+        stats = service.run(_MostlyStaticScene(frames, moving))
+        skipped = stats['gate']['skip_fraction'] if 'gate' in stats else 0.0
+        gate_ms = f", gate check {stats['gate']['gate_ms']:.2f} ms" if 'gate' in stats else ""
+        print(f"{label}: {skipped:.0%} skipped, {stats['fps']:.1f} fps{gate_ms}, violations at frames {events}")
+
+
+# The notebook's per-box NMS and list-of-tuples grouping, kept here as the baseline
+def _notebook_compute_iou(box1, boxes):
+    box1 = np.array(box1)
+    boxes = np.array(boxes)
+    x1 = np.maximum(box1[0], boxes[:, 0])
+    y1 = np.maximum(box1[1], boxes[:, 1])
+    x2 = np.minimum(box1[2], boxes[:, 2])
+    y2 = np.minimum(box1[3], boxes[:, 3])
+    inter_area = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
+    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
+    area2 = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter_area / (area1 + area2 - inter_area + 1e-6)
+
+
+def _notebook_nms(boxes, scores, iou_threshold=0.5):
+    if not boxes:
+        return []
+    boxes_array = np.array(boxes)
+    indices = np.argsort(np.array(scores))[::-1]
+    keep = []
+    while indices.size > 0:
+        current = indices[0]
+        keep.append(current)
+        if indices.size == 1:
+            break
+        ious = _notebook_compute_iou(boxes_array[current], boxes_array[indices[1:]])
+        indices = indices[1:][ious <= iou_threshold]
+    return keep
+
+
+def _notebook_split(raw, config):
+    groups = {'persons': [], 'others': [], 'logos': [], 'caps': []}
+    for x1, y1, x2, y2, conf, label in raw.get('custom', []):
+        if conf >= config.person_conf:
+            if label == "person":
+                groups['persons'].append((x1, y1, x2, y2, conf))
+            else:
+                groups['others'].append((x1, y1, x2, y2, label, conf))
+    for x1, y1, x2, y2, conf, _ in raw.get('logo', []):
+        if conf >= config.logo_conf:
+            groups['logos'].append((x1, y1, x2, y2, conf))
+    for x1, y1, x2, y2, conf, label in raw.get('cap', []):
+        if conf >= config.cap_conf and label in ["Hardhat", "NO-Hardhat"]:
+            groups['caps'].append((x1, y1, x2, y2, label, conf))
+    for name, detections in groups.items():
+        keep = _notebook_nms([d[:4] for d in detections], [d[-1] for d in detections], config.iou_threshold)
+        groups[name] = [detections[i] for i in keep]
+    return groups
+
+
+def _random_raw(boxes, rng, width=1280, height=720):
+    """Raw detections for one crowded frame, split across the three models like real output"""
+    labels = {'custom': ["person", "mask", "no-mask", "gloves", "no-gloves"],
+              'cap': ["Hardhat", "NO-Hardhat"], 'logo': ["logo"]}
+    raw = {}
+    for name, count in zip(labels, (boxes // 2, boxes // 4, boxes - boxes // 2 - boxes // 4)):
+        x1 = rng.uniform(0, width - 150, count)
+        y1 = rng.uniform(0, height - 150, count)
+        w, h = rng.uniform(20, 150, count), rng.uniform(20, 150, count)
+        scores = rng.uniform(0.3, 1.0, count)
+        names = rng.choice(labels[name], count)
+        # float32 coordinates and scores, as the models produce them
+        boxes_xyxy = np.stack([x1, y1, x1 + w, y1 + h], axis=1).astype(np.float32).tolist()
+        raw[name] = [(*box, score, str(label)) for box, score, label
+                     in zip(boxes_xyxy, scores.astype(np.float32).tolist(), names)]
+    return raw
+
+
+def _best_seconds(run, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_nms(box_counts=(10, 100, 1000), frames=20, rounds=3):
+    """Notebook per-box NMS over lists of tuples versus the structured-array IoU matrix and batched NMS"""
+    config = Config()
+    rng = np.random.default_rng(0)
+    for boxes in box_counts:
+        raws = [_random_raw(boxes, rng) for _ in range(frames)]
+        for raw in raws:  # same boxes kept, in the same order
+            legacy, current = _notebook_split(raw, config), split_detections(raw, config)
+            for name, kept in legacy.items():
+                boxes_kept = getattr(current, name)['box']
+                assert len(kept) == len(boxes_kept) and np.allclose([d[:4] for d in kept] or np.empty((0, 4)),
+                                                                    boxes_kept, atol=1e-3), name
+        # Model output as the YOLO wrapper now hands it over: one structured array per model
+        arrays = [{name: dets.from_rows(rows) for name, rows in raw.items()} for raw in raws]
+
+        notebook = _best_seconds(lambda: [_notebook_split(raw, config) for raw in raws], rounds) / frames
+        tuples = _best_seconds(lambda: [split_detections(raw, config) for raw in raws], rounds) / frames
+        structured = _best_seconds(lambda: [split_detections(raw, config) for raw in arrays], rounds) / frames
+        print(f"{boxes} boxes/frame: notebook {notebook * 1000:.2f} ms, batched NMS from tuples {tuples * 1000:.2f} ms, "
+              f"from arrays {structured * 1000:.2f} ms ({notebook / structured:.1f}x)")
+
+
+BENCHMARKS = {
+    'inference': bench_inference,
+    'pipeline': bench_pipeline,
+    'gating': bench_gating,
+    'nms': bench_nms,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+        print()
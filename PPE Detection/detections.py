@@ -0,0 +1,189 @@
+"""Detections as NumPy structured arrays, with vectorized IoU and batched NMS
+
+One frame's detections live in a single array of DETECTION_DTYPE records
+instead of lists of tuples. Labels are stored as small integer ids (see
+label_id / label_name) and ``group`` says which list a detection belongs
+to, so all groups of a frame go through one class-aware NMS call.
+"""
+# ===== IMPORTS =====
+import threading
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ('box', np.float32, (4,)),  # x1, y1, x2, y2
+    ('score', np.float32),
+    ('label', np.int16),        # id from label_id()
+    ('group', np.int8)          # NMS only compares detections within a group
+])
+
+# Up to this many boxes, one masked IoU matrix beats a matrix per class
+SINGLE_MATRIX_MAX = 256
+# Up to this many boxes, plain Python beats the fixed cost of the NumPy calls
+SMALL_NMS_MAX = 16
+
+_labels = []
+_label_ids = {}
+_labels_lock = threading.Lock()
+
+
+def label_id(label: str) -> int:
+    """Small integer id for a label string, assigned on first use"""
+    found = _label_ids.get(label)
+    if found is not None:
+        return found
+    with _labels_lock:
+        if label not in _label_ids:
+            _label_ids[label] = len(_labels)
+            _labels.append(label)
+        return _label_ids[label]
+
+
+def label_name(label: int) -> str:
+    return _labels[label]
+
+
+def empty() -> np.ndarray:
+    return np.empty(0, dtype=DETECTION_DTYPE)
+
+
+def from_rows(rows: Iterable[tuple], group: int = 0) -> np.ndarray:
+    """Structured array from (x1, y1, x2, y2, conf, label) tuples"""
+    rows = list(rows)
+    detections = np.empty(len(rows), dtype=DETECTION_DTYPE)
+    if rows:
+        detections['box'] = [row[:4] for row in rows]
+        detections['score'] = [row[4] for row in rows]
+        detections['label'] = [label_id(row[5]) for row in rows]
+    detections['group'] = group
+    return detections
+
+
+def from_arrays(boxes: np.ndarray, scores: np.ndarray, labels: np.ndarray, group: int = 0) -> np.ndarray:
+    """Structured array from an Nx4 box array, N scores and N label ids"""
+    detections = np.empty(len(scores), dtype=DETECTION_DTYPE)
+    detections['box'] = boxes
+    detections['score'] = scores
+    detections['label'] = labels
+    detections['group'] = group
+    return detections
+
+
+def as_detections(raw, group: int = 0) -> np.ndarray:
+    """New structured array from a structured array or (x1, y1, x2, y2, conf, label) rows
+
+    Always a copy: detectors (and GatedDetector, across skipped frames) keep
+    handing out the same arrays, so callers may set fields on the result.
+    """
+    if raw is None:
+        return empty()
+    if isinstance(raw, np.ndarray) and raw.dtype == DETECTION_DTYPE:
+        return raw.copy()
+    return from_rows(raw, group)  # lists and plain arrays of rows, empty ones included
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between Nx4 and Mx4 boxes, as an NxM array
+
+    Computed in float64 so results near the NMS threshold match the
+    notebook's per-box version.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    inter = np.minimum(a[:, None, 2], b[None, :, 2])
+    inter -= np.maximum(a[:, None, 0], b[None, :, 0])
+    np.maximum(inter, 0, out=inter)
+    height = np.minimum(a[:, None, 3], b[None, :, 3])
+    height -= np.maximum(a[:, None, 1], b[None, :, 1])
+    np.maximum(height, 0, out=height)
+    inter *= height
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = np.add.outer(area_a, area_b)
+    union -= inter
+    union += 1e-6
+    inter /= union
+    return inter
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.5,
+        classes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Greedy NMS with the IoU matrix computed once; indices kept, highest score first
+
+    Gives the same result as the notebooks' non_max_suppression: a box is
+    dropped when its IoU with a higher-scoring kept box is above the
+    threshold. With ``classes``, boxes only suppress boxes of their own
+    class. Up to SMALL_NMS_MAX boxes the same arithmetic runs as a plain
+    Python loop.
+    """
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    if len(scores) <= SMALL_NMS_MAX:
+        return _small_nms(boxes, scores, iou_threshold, classes)
+    order = np.argsort(scores)[::-1]
+    overlaps = iou_matrix(boxes[order], boxes[order]) > iou_threshold
+    if classes is not None:
+        ordered = classes[order]
+        overlaps &= ordered[:, None] == ordered[None, :]
+    suppressed = np.zeros(len(order), dtype=bool)
+    for i in range(len(order)):
+        if not suppressed[i]:
+            suppressed[i + 1:] |= overlaps[i, i + 1:]
+    return order[~suppressed]
+
+
+def _small_nms(boxes, scores, iou_threshold, classes):
+    # Same arithmetic as iou_matrix, in float64 Python scalars, one pair at a time
+    boxes = np.asarray(boxes, dtype=np.float64).tolist()
+    scores = np.asarray(scores).tolist()
+    classes = [0] * len(scores) if classes is None else np.asarray(classes).tolist()
+    kept = []
+    for i in sorted(range(len(scores)), key=scores.__getitem__)[::-1]:  # ties as argsort()[::-1]
+        x1, y1, x2, y2 = boxes[i]
+        area = (x2 - x1) * (y2 - y1)
+        for j in kept:
+            if classes[j] != classes[i]:
+                continue
+            kx1, ky1, kx2, ky2 = boxes[j]
+            inter = max(min(x2, kx2) - max(x1, kx1), 0.0) * max(min(y2, ky2) - max(y1, ky1), 0.0)
+            if inter / ((kx2 - kx1) * (ky2 - ky1) + area - inter + 1e-6) > iou_threshold:
+                break
+        else:
+            kept.append(i)
+    return np.array(kept, dtype=np.intp)
+
+
+def batched_nms(detections: np.ndarray, iou_threshold: float = 0.5,
+                classes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Class-aware NMS over a structured array
+
+    Boxes only suppress boxes of the same class (``classes``, by default
+    the ``group`` field). Small frames use one IoU matrix with cross-class
+    pairs masked out; larger ones a matrix per class, which skips the
+    masked work. Kept indices come back grouped by class, highest score
+    first within each.
+    """
+    if len(detections) == 0:
+        return np.empty(0, dtype=np.intp)
+    classes = detections['group'] if classes is None else classes
+    boxes, scores = detections['box'], detections['score']
+    if len(detections) <= SINGLE_MATRIX_MAX:
+        kept = nms(boxes, scores, iou_threshold, classes)
+        return kept[np.argsort(classes[kept], kind='stable')]
+    kept = []
+    for cls in np.unique(classes):
+        members = np.flatnonzero(classes == cls)
+        kept.append(members[nms(boxes[members], scores[members], iou_threshold)])
+    return np.concatenate(kept)
+
+
+def contains(inner: np.ndarray, outer) -> np.ndarray:
+    """Which of the Nx4 ``inner`` boxes lie entirely inside the ``outer`` box"""
+    x1, y1, x2, y2 = outer
+    return (inner[:, 0] >= x1) & (inner[:, 1] >= y1) & (inner[:, 2] <= x2) & (inner[:, 3] <= y2)
+
+
+def label_ids(labels: List[str]) -> np.ndarray:
+    return np.array([label_id(label) for label in labels], dtype=np.int16)
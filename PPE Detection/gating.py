@@ -0,0 +1,110 @@
+"""Motion-gated inference: skip the models on frames where nothing changed
+
+A cheap check on a small greyscale copy of each frame decides whether the
+full models need to run. Skipped frames reuse the last detections, so the
+worker tracker still sees every frame number and violation timing (frames
+elapsed / fps) is unchanged.
+"""
+# ===== IMPORTS =====
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decides per frame whether to run full inference
+
+    A frame is inferred when the share of pixels that differ by more than
+    ``pixel_delta`` from the last inferred frame is above ``threshold``, or
+    when ``stride`` frames have passed since the last inference. With
+    ``motion=False`` only the stride is used (every stride-th frame).
+    """
+    def __init__(self, stride: int = 5, threshold: float = 0.002, pixel_delta: int = 20,
+                 width: int = 160, motion: bool = True):
+        self.stride = max(1, stride)
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.motion = motion
+        self.frames = 0
+        self.inferred = 0
+        self.check_seconds = 0.0
+        self._reference = None
+        self._since_inference = 0
+
+    def _small(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, round(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (3, 3), 0)
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        start = time.perf_counter()
+        self.frames += 1
+        self._since_inference += 1
+        run = self._reference is None or self._since_inference >= self.stride
+        small = None
+        if self.motion and not run:
+            small = self._small(frame)
+            changed = np.count_nonzero(cv2.absdiff(small, self._reference) > self.pixel_delta)
+            run = changed / small.size > self.threshold
+        if run:
+            self.inferred += 1
+            self._since_inference = 0
+            if self.motion:
+                self._reference = small if small is not None else self._small(frame)
+            else:
+                self._reference = True
+        self.check_seconds += time.perf_counter() - start
+        return run
+
+    def stats(self) -> dict:
+        skipped = self.frames - self.inferred
+        return {
+            'frames': self.frames,
+            'inferred': self.inferred,
+            'skipped': skipped,
+            'skip_fraction': skipped / self.frames if self.frames else 0.0,
+            'gate_ms': self.check_seconds / self.frames * 1000 if self.frames else None
+        }
+
+
+class GatedDetector:
+    """Wraps a detector so it only runs on frames the gate lets through
+
+    Skipped frames get the most recent detections carried forward. Works
+    with the pipeline's detect_batch: only the gated frames of a batch are
+    sent to the wrapped detector.
+    """
+    def __init__(self, detector, gate: Optional[MotionGate] = None):
+        self.detector = detector
+        self.gate = gate or MotionGate()
+        self._last = {}
+
+    def detect(self, frame: np.ndarray):
+        if self.gate.should_infer(frame):
+            self._last = self.detector.detect(frame)
+        return self._last
+
+    def detect_batch(self, frames: List[np.ndarray]) -> list:
+        run = [self.gate.should_infer(frame) for frame in frames]
+        selected = [frame for frame, infer in zip(frames, run) if infer]
+        if not selected:
+            fresh = []
+        elif len(selected) > 1 and hasattr(self.detector, 'detect_batch'):
+            fresh = list(self.detector.detect_batch(selected))
+        else:
+            fresh = [self.detector.detect(frame) for frame in selected]
+
+        results = []
+        fresh = iter(fresh)
+        for infer in run:
+            if infer:
+                self._last = next(fresh)
+            results.append(self._last)
+        return results
+
+    def stats(self) -> dict:
+        return self.gate.stats()
@@ -0,0 +1,226 @@
+"""Single-pass inference over several detection models
+
+Each frame is letterboxed and converted to a tensor once; the custom,
+hardhat and logo models all read that same input and run side by side on
+a thread pool (PyTorch and NumPy release the GIL while they compute).
+Boxes are mapped back to frame coordinates before they are returned.
+"""
+# ===== IMPORTS =====
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import detections as dets
+
+try:
+    import torch
+except ImportError:  # stub models work on NumPy input
+    torch = None
+
+IMG_SIZE = 640
+PAD_VALUE = 114  # same grey as Ultralytics' LetterBox
+LATENCY_WINDOW = 200  # recent calls kept per model
+
+
+# ===== PREPROCESSING =====
+class PreparedFrame:
+    """One letterboxed frame shared by every model, plus what is needed to undo the letterbox"""
+    __slots__ = ('input', 'ratio', 'pad', 'shape')
+
+    def __init__(self, input, ratio: float, pad: Tuple[float, float], shape: Tuple[int, int]):
+        self.input = input  # 1x3xSxS float32 in [0, 1], RGB; a torch tensor when torch is installed
+        self.ratio = ratio
+        self.pad = pad
+        self.shape = shape  # original (height, width)
+
+    def to_frame(self, boxes: np.ndarray) -> np.ndarray:
+        """Map Nx4 input-space boxes back to the original frame"""
+        boxes = boxes.copy()
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - self.pad[0]) / self.ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - self.pad[1]) / self.ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, self.shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, self.shape[0])
+        return boxes
+
+
+def prepare(frame: np.ndarray, size: int = IMG_SIZE) -> PreparedFrame:
+    """Letterbox a BGR frame to size x size and convert it to a normalised BCHW tensor"""
+    h, w = frame.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if (new_w, new_h) != (w, h) else frame
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    boxed = cv2.copyMakeBorder(resized, top, size - new_h - top, left, size - new_w - left,
+                               cv2.BORDER_CONSTANT, value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+    array = np.ascontiguousarray(boxed[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32)
+    array /= 255.0
+    return PreparedFrame(torch.from_numpy(array) if torch is not None else array,
+                         ratio, (left, top), (h, w))
+
+
+def stack_inputs(prepared: List[PreparedFrame]):
+    """Concatenate prepared frames into one Bx3xSxS input"""
+    inputs = [p.input for p in prepared]
+    if len(inputs) == 1:
+        return inputs[0]
+    return torch.cat(inputs) if torch is not None else np.concatenate(inputs)
+
+
+# ===== MODELS =====
+class YOLOModel:
+    """Ultralytics YOLO fed an already prepared tensor, so it skips its own letterboxing"""
+    def __init__(self, model, device: str = "cpu"):
+        self.model = model
+        self.device = device
+        self._label_ids = None  # model class index -> detections.label_id
+
+    def _labels(self, names: Dict[int, str]) -> np.ndarray:
+        if self._label_ids is None:
+            self._label_ids = dets.label_ids([names[i] for i in range(len(names))])
+        return self._label_ids
+
+    def predict(self, prepared: PreparedFrame) -> np.ndarray:
+        return self.predict_batch(prepared.input, [prepared])[0]
+
+    def predict_batch(self, batch_input, prepared: List[PreparedFrame]) -> List[np.ndarray]:
+        """One forward pass over a stacked batch; a DETECTION_DTYPE array per frame"""
+        detections = []
+        for results, frame in zip(self.model(batch_input, verbose=False, device=self.device), prepared):
+            data = results.boxes.data.cpu().numpy()
+            if not len(data):
+                detections.append(dets.empty())
+                continue
+            labels = self._labels(results.names)[data[:, 5].astype(np.intp)]
+            detections.append(dets.from_arrays(frame.to_frame(data[:, :4]), data[:, 4], labels))
+        return detections
+
+
+class StubModel:
+    """CPU-bound stand-in for a YOLO model
+
+    Spends about ``cost_ms`` milliseconds per frame in NumPy matrix
+    products (which release the GIL like PyTorch does) and returns
+    ``detections``, given in frame coordinates. ``call_overhead_ms`` is
+    paid once per call, however many frames are in it, like the fixed
+    per-call work of a real model.
+    """
+    def __init__(self, cost_ms: float = 20.0, detections: Optional[List[tuple]] = None, size: int = 192,
+                 call_overhead_ms: float = 0.0):
+        self.detections = list(detections or [])
+        self._a = np.random.default_rng(0).random((size, size), dtype=np.float32)
+        self._a @ self._a  # warm up before timing
+        start = time.perf_counter()
+        for _ in range(20):
+            self._a @ self._a
+        per_product = (time.perf_counter() - start) / 20
+        self.repeats = max(1, round(cost_ms / 1000 / per_product))
+        self.overhead_repeats = round(call_overhead_ms / 1000 / per_product)
+
+    def predict(self, prepared: PreparedFrame) -> List[tuple]:
+        return self.predict_batch(prepared.input, [prepared])[0]
+
+    def predict_batch(self, batch_input, prepared: List[PreparedFrame]) -> List[List[tuple]]:
+        for _ in range(self.overhead_repeats + self.repeats * len(prepared)):
+            self._a @ self._a
+        return [list(self.detections) for _ in prepared]
+
+
+# ===== ENGINE =====
+class InferenceEngine:
+    """Runs several models on one prepared frame
+
+    ``models`` maps a name ('custom', 'cap', 'logo') to an object with
+    ``predict(PreparedFrame)``. With ``concurrent=False`` the models run
+    one after another on the caller's thread, still sharing the input.
+    infer() returns {name: detections} (DETECTION_DTYPE arrays for YOLO
+    models, lists of (x1, y1, x2, y2, conf, label) tuples also work),
+    the layout the detection service expects, so the engine can be used as
+    a detector directly.
+    """
+    def __init__(self, models: Dict[str, object], img_size: int = IMG_SIZE, concurrent: bool = True,
+                 workers: Optional[int] = None):
+        self.models = dict(models)
+        self.img_size = img_size
+        self.concurrent = concurrent and len(self.models) > 1
+        self._pool = ThreadPoolExecutor(max_workers=workers or len(self.models),
+                                        thread_name_prefix="inference") if self.concurrent else None
+        self._lock = threading.Lock()
+        self._latencies = {name: deque(maxlen=LATENCY_WINDOW) for name in [*self.models, 'preprocess', 'frame']}
+
+    def _run(self, name: str, prepared: PreparedFrame) -> List[tuple]:
+        start = time.perf_counter()
+        detections = self.models[name].predict(prepared)
+        self._record(name, time.perf_counter() - start)
+        return detections
+
+    def _run_batch(self, name: str, batch_input, prepared: List[PreparedFrame]) -> List[List[tuple]]:
+        start = time.perf_counter()
+        detections = self.models[name].predict_batch(batch_input, prepared)
+        # Recorded per frame so single and batched calls stay comparable
+        self._record(name, (time.perf_counter() - start) / len(prepared))
+        return detections
+
+    def infer(self, frame: np.ndarray) -> Dict[str, List[tuple]]:
+        start = time.perf_counter()
+        prepared = prepare(frame, self.img_size)
+        self._record('preprocess', time.perf_counter() - start)
+        if self.concurrent:
+            futures = {name: self._pool.submit(self._run, name, prepared) for name in self.models}
+            raw = {name: future.result() for name, future in futures.items()}
+        else:
+            raw = {name: self._run(name, prepared) for name in self.models}
+        self._record('frame', time.perf_counter() - start)
+        return raw
+
+    detect = infer
+
+    def infer_batch(self, frames: List[np.ndarray]) -> List[Dict[str, List[tuple]]]:
+        """infer() for several frames with one forward pass per model"""
+        start = time.perf_counter()
+        prepared = [prepare(frame, self.img_size) for frame in frames]
+        batch_input = stack_inputs(prepared)
+        self._record('preprocess', (time.perf_counter() - start) / len(frames))
+        if self.concurrent:
+            futures = {name: self._pool.submit(self._run_batch, name, batch_input, prepared) for name in self.models}
+            per_model = {name: future.result() for name, future in futures.items()}
+        else:
+            per_model = {name: self._run_batch(name, batch_input, prepared) for name in self.models}
+        self._record('frame', (time.perf_counter() - start) / len(frames))
+        return [{name: detections[i] for name, detections in per_model.items()} for i in range(len(frames))]
+
+    detect_batch = infer_batch
+
+    def _record(self, name: str, seconds: float):
+        with self._lock:
+            self._latencies[name].append(seconds)
+
+    def latency(self) -> Dict[str, dict]:
+        """Mean and p95 milliseconds over recent calls for each model, preprocessing and whole frames"""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._latencies.items()}
+        report = {}
+        for name, values in samples.items():
+            if values:
+                report[name] = {
+                    'calls': len(values),
+                    'mean_ms': sum(values) / len(values) * 1000,
+                    'p95_ms': values[min(len(values) - 1, int(0.95 * len(values)))] * 1000
+                }
+        return report
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+def limit_torch_threads(models: int):
+    """Split the cores between models that run at the same time instead of oversubscribing them"""
+    if torch is not None:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // models))
@@ -0,0 +1,202 @@
+"""Three-stage frame pipeline: decode -> batched inference -> annotate/write
+
+The decoder and the inference stage each run on their own thread and hand
+work over bounded queues, so a slow stage makes the one before it wait
+instead of frames piling up in memory. The last stage is whoever iterates
+the pipeline (DetectionService annotates frames and feeds the sinks
+there); it receives frames in their original order.
+"""
+# ===== IMPORTS =====
+import queue
+import threading
+import time
+from typing import Iterator, Optional
+
+_DONE = object()
+POLL_INTERVAL = 0.1  # seconds between stop checks while blocked on a queue
+
+
+class StageStats:
+    """Time a stage spent working, waiting for input (starved) and waiting for room downstream (blocked)"""
+    __slots__ = ('name', 'items', 'busy', 'starved', 'blocked')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def to_dict(self, elapsed: float) -> dict:
+        return {
+            'items': self.items,
+            'busy_s': round(self.busy, 3),
+            'starved_s': round(self.starved, 3),
+            'blocked_s': round(self.blocked, 3),
+            'utilization': round(self.busy / elapsed, 3) if elapsed else None
+        }
+
+
+class FramePipeline:
+    """Iterate to get (frame_number, frame, raw_detections, detect_seconds) in frame order
+
+    ``detector`` needs ``detect(frame)``; if it also has
+    ``detect_batch(frames)``, up to ``batch_size`` queued frames go through
+    one call. The inference stage waits at most ``batch_timeout`` seconds
+    for a batch to fill, so live streams are not held back. Each queue holds
+    at most ``queue_depth`` items.
+    """
+    def __init__(self, source, detector, batch_size: int = 4, queue_depth: int = 8,
+                 batch_timeout: float = 0.05, max_frames: Optional[int] = None):
+        self.source = source
+        self.detector = detector
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout
+        self.max_frames = max_frames
+        self.batches = 0
+        self.elapsed = 0.0
+        self.stages = {name: StageStats(name) for name in ('decode', 'infer', 'write')}
+        self._frames = queue.Queue(maxsize=queue_depth)
+        self._results = queue.Queue(maxsize=queue_depth)
+        self._stop = threading.Event()
+        self._error = None
+
+    def stop(self):
+        """Stop decoding; frames already queued are dropped"""
+        self._stop.set()
+
+    # ---- queue helpers that keep checking for stop ----
+
+    def _put(self, q: queue.Queue, item, stats: StageStats, force: bool = False):
+        start = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                if self._stop.is_set() and not force:
+                    break
+                if self._stop.is_set():
+                    # Make room so the end marker always gets through
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+        stats.blocked += time.perf_counter() - start
+
+    def _get(self, q: queue.Queue, stats: StageStats, timeout: Optional[float] = None):
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        try:
+            while True:
+                wait = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, deadline - time.perf_counter())
+                if wait <= 0:
+                    raise queue.Empty
+                try:
+                    return q.get(timeout=wait)
+                except queue.Empty:
+                    if self._stop.is_set() and q.empty():
+                        return _DONE
+        finally:
+            stats.starved += time.perf_counter() - start
+
+    # ---- stages ----
+
+    def _decode(self):
+        stats = self.stages['decode']
+        frames = iter(self.source)
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    frame_count, frame = next(frames)
+                except StopIteration:
+                    break
+                stats.busy += time.perf_counter() - start
+                if self.max_frames is not None and frame_count >= self.max_frames:
+                    break
+                self._put(self._frames, (frame_count, frame), stats)
+                stats.items += 1
+        except Exception as e:
+            print(f"Error decoding frames: {str(e)}")
+            self._error = e
+        finally:
+            if hasattr(frames, 'close'):
+                frames.close()  # releases the capture
+            self._put(self._frames, _DONE, stats, force=True)
+
+    def _infer(self):
+        stats = self.stages['infer']
+        detect_batch = getattr(self.detector, 'detect_batch', None)
+        done = False
+        try:
+            while not done and not self._stop.is_set():
+                item = self._get(self._frames, stats)
+                if item is _DONE:
+                    break
+                batch = [item]
+                deadline = time.perf_counter() + self.batch_timeout
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._get(self._frames, stats, max(0.0, deadline - time.perf_counter()) or 1e-6)
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        done = True
+                        break
+                    batch.append(item)
+
+                start = time.perf_counter()
+                frames = [frame for _, frame in batch]
+                if detect_batch is not None and len(frames) > 1:
+                    raws = detect_batch(frames)
+                else:
+                    raws = [self.detector.detect(frame) for frame in frames]
+                elapsed = time.perf_counter() - start
+                stats.busy += elapsed
+                stats.items += len(batch)
+                self.batches += 1
+                for (frame_count, frame), raw in zip(batch, raws):
+                    self._put(self._results, (frame_count, frame, raw, elapsed / len(batch)), stats)
+        except Exception as e:
+            print(f"Error running inference: {str(e)}")
+            self._error = e
+        finally:
+            self._put(self._results, _DONE, stats, force=True)
+
+    def __iter__(self) -> Iterator[tuple]:
+        stats = self.stages['write']
+        threads = [
+            threading.Thread(target=self._decode, name="pipeline-decode", daemon=True),
+            threading.Thread(target=self._infer, name="pipeline-infer", daemon=True)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._get(self._results, stats)
+                if item is _DONE:
+                    break
+                resumed = time.perf_counter()
+                yield item
+                stats.busy += time.perf_counter() - resumed
+                stats.items += 1
+            if self._error is not None:
+                raise self._error
+        finally:
+            # Also reached when the consumer stops early; unblock and wind down both threads
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - start
+
+    def stats(self) -> dict:
+        """Frames per second, average batch size and per-stage utilization"""
+        frames = self.stages['write'].items
+        return {
+            'frames': frames,
+            'fps': frames / self.elapsed if self.elapsed else None,
+            'avg_batch': self.stages['infer'].items / self.batches if self.batches else None,
+            'stages': {name: stage.to_dict(self.elapsed) for name, stage in self.stages.items()}
+        }
@@ -0,0 +1,750 @@
+"""Headless PPE violation detection service
+
+Reads frames from a video file, camera index or RTSP/HTTP stream, runs the
+person/mask/gloves, hardhat and logo models on every frame and pushes each
+violation to the configured sinks as soon as it is found, instead of after
+the whole video like the notebook.
+
+    python ppe_service.py rtsp://camera.local/stream --events events.jsonl --drive
+    python ppe_service.py videolong.mp4 --output annotated.mp4
+    python ppe_service.py synthetic:300 --stub
+"""
+# ===== IMPORTS =====
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import detections as dets
+from gating import GatedDetector, MotionGate
+from inference import InferenceEngine, YOLOModel, limit_torch_threads
+from pipeline import FramePipeline
+
+
+# ===== CONFIGURATION =====
+@dataclass
+class Config:
+    """The notebook's Config as per-service settings"""
+    # Model paths
+    custom_weights: str = "custom-weights.pt"
+    cap_weights: str = "my_weights.pt"
+    logo_weights: str = "logo.pt"
+    device: str = "cpu"
+    concurrent_models: bool = True  # run the three models side by side on one shared input
+
+    # Detection thresholds
+    person_conf: float = 0.4
+    logo_conf: float = 0.5
+    cap_conf: float = 0.4
+    iou_threshold: float = 0.5
+
+    # Violation settings
+    violation_dir: str = "violations"
+    violation_duration: float = 2  # seconds
+
+    # Pipeline: decode, inference and annotate/write overlap on separate threads
+    pipelined: bool = True
+    batch_size: int = 4  # frames per inference call
+    queue_depth: int = 8  # frames buffered between stages
+    batch_timeout: float = 0.05  # seconds to wait for a batch to fill
+
+    # Motion gate: run the models only on changed frames, and at least every gate_stride frames
+    motion_gate: bool = True
+    gate_stride: int = 5
+    gate_threshold: float = 0.002  # share of pixels that must change
+
+    # Sources
+    default_fps: int = 25  # for streams that do not report a frame rate
+    reconnect_attempts: int = 5
+    reconnect_delay: float = 2.0  # seconds
+
+    # Google Drive
+    service_account_file: str = "wide-planet-449115-b2-c6af973cadb6.json"
+    drive_scopes: List[str] = field(default_factory=lambda: ['https://www.googleapis.com/auth/drive'])
+    drive_root_folder: str = "Safety_Violation_System1"
+    drive_metadata_file: str = "violation_metadata.json"
+
+
+# Raw model output: model name -> DETECTION_DTYPE array, or [(x1, y1, x2, y2, conf, label), ...]
+RawDetections = Dict[str, object]
+
+# Detection groups; NMS only suppresses boxes within the same group
+PERSONS, OTHERS, LOGOS, CAPS = range(4)
+CAP_LABELS = ("Hardhat", "NO-Hardhat")
+
+
+@dataclass
+class FrameDetections:
+    """Detections for one frame after thresholds and NMS, grouped like process_frame's lists
+
+    Each group is a DETECTION_DTYPE structured array (see detections.py),
+    highest score first.
+    """
+    persons: np.ndarray = field(default_factory=dets.empty)
+    others: np.ndarray = field(default_factory=dets.empty)  # mask, no-mask, gloves, no-gloves
+    logos: np.ndarray = field(default_factory=dets.empty)
+    caps: np.ndarray = field(default_factory=dets.empty)    # Hardhat, NO-Hardhat
+
+
+@dataclass
+class ViolationEvent:
+    """A worker who stayed in violation for Config.violation_duration seconds"""
+    worker_id: int
+    violations: Tuple[str, ...]
+    frame: int
+    stream_seconds: float
+    image_path: Optional[str]
+    detected_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def to_dict(self) -> dict:
+        return {
+            'worker_id': self.worker_id,
+            'violations': list(self.violations),
+            'frame': self.frame,
+            'stream_seconds': round(self.stream_seconds, 3),
+            'image_path': self.image_path,
+            'detected_at': self.detected_at
+        }
+
+
+@dataclass
+class FrameResult:
+    """Everything produced for one frame; ``frame`` carries the annotations"""
+    index: int
+    frame: np.ndarray
+    detections: FrameDetections
+    events: List[ViolationEvent]
+    detect_seconds: float
+
+
+# ===== UTILITY FUNCTIONS =====
+def split_detections(raw: RawDetections, config: Config) -> FrameDetections:
+    """Apply the notebook's per-model thresholds and label rules, then one class-aware NMS over all groups"""
+    custom = dets.as_detections(raw.get('custom', []))
+    custom = custom[custom['score'] >= config.person_conf]
+    custom['group'] = np.where(custom['label'] == dets.label_id("person"), PERSONS, OTHERS)
+
+    logos = dets.as_detections(raw.get('logo', []))
+    logos = logos[logos['score'] >= config.logo_conf]
+    logos['group'] = LOGOS
+
+    caps = dets.as_detections(raw.get('cap', []))
+    hardhat, no_hardhat = dets.label_ids(CAP_LABELS)
+    caps = caps[(caps['score'] >= config.cap_conf) & ((caps['label'] == hardhat) | (caps['label'] == no_hardhat))]
+    caps['group'] = CAPS
+
+    if len(custom) + len(logos) + len(caps) <= dets.SMALL_NMS_MAX:
+        # Few boxes: NMS each group on its own instead of combining and regrouping them
+        persons = custom['group'] == PERSONS
+        return FrameDetections(*(group[dets.nms(group['box'], group['score'], config.iou_threshold)]
+                                 for group in (custom[persons], custom[~persons], logos, caps)))
+    combined = np.concatenate([custom, logos, caps])
+    kept = combined[dets.batched_nms(combined, config.iou_threshold)]
+    return FrameDetections(*(kept[kept['group'] == group] for group in (PERSONS, OTHERS, LOGOS, CAPS)))
+
+
+# ===== DETECTORS =====
+class YOLODetector:
+    """The three YOLO models from the notebook, run on CPU unless Config.device says otherwise
+
+    Frames go through an InferenceEngine: preprocessed once and shared by
+    all three models, which run concurrently when Config.concurrent_models
+    is set.
+    """
+    def __init__(self, config: Config):
+        from ultralytics import YOLO  # only needed when real weights are used
+
+        print("Loading models...")
+        try:
+            models = {
+                'custom': YOLOModel(YOLO(config.custom_weights), config.device),  # person, mask, gloves
+                'cap': YOLOModel(YOLO(config.cap_weights), config.device),        # hardhat detection
+                'logo': YOLOModel(YOLO(config.logo_weights), config.device)       # logo detection
+            }
+            print("Models loaded successfully")
+        except Exception as e:
+            print(f"Error loading models: {str(e)}")
+            raise
+        if config.concurrent_models and config.device == "cpu":
+            limit_torch_threads(len(models))
+        self.engine = InferenceEngine(models, concurrent=config.concurrent_models)
+
+    def detect(self, frame: np.ndarray) -> RawDetections:
+        return self.engine.infer(frame)
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[RawDetections]:
+        return self.engine.infer_batch(frames)
+
+    def latency(self) -> dict:
+        """Per-model latency from the engine"""
+        return self.engine.latency()
+
+
+class StubDetector:
+    """Stand-in for YOLODetector that needs no weights
+
+    ``script(frame_number, frame)`` returns the raw detections for each
+    frame (nothing by default); ``latency`` adds a fixed inference cost.
+    """
+    def __init__(self, script: Optional[Callable[[int, np.ndarray], RawDetections]] = None,
+                 latency: float = 0.0):
+        self.script = script
+        self.latency = latency
+        self.calls = 0
+
+    def detect(self, frame: np.ndarray) -> RawDetections:
+        frame_number = self.calls
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.script(frame_number, frame) if self.script else {}
+
+
+def demo_script(frame_number: int, frame: np.ndarray) -> RawDetections:
+    """A logo-wearing worker without a mask in the middle of the frame"""
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = w * 0.3, h * 0.1, w * 0.6, h * 0.95
+    return {
+        'custom': [(x1, y1, x2, y2, 0.9, "person"),
+                   (x1 + 20, y1 + 10, x1 + 60, y1 + 40, 0.8, "no-mask")],
+        'logo': [(x1 + 30, y1 + 80, x1 + 70, y1 + 110, 0.7, "logo")],
+        'cap': [(x1 + 10, y1, x1 + 70, y1 + 15, 0.6, "Hardhat")]
+    }
+
+
+# ===== FRAME SOURCES =====
+def is_stream(source: str) -> bool:
+    return source.split("://", 1)[0].lower() in ("rtsp", "rtsps", "rtmp", "http", "https", "udp", "tcp")
+
+
+class VideoSource:
+    """Frames from a file, camera index or network stream
+
+    Iterating yields (frame_number, frame). Files stop at the end; live
+    streams and cameras are retried up to Config.reconnect_attempts times
+    when opening or reading fails.
+    """
+    def __init__(self, source: str, config: Config):
+        self.source = source
+        self.config = config
+        self.live = is_stream(source) or source.isdigit()
+        self.cap = self._open()
+        attempts = 0
+        while not self.cap.isOpened() and self.live and attempts < config.reconnect_attempts:
+            attempts += 1
+            print(f"Could not open {source}, retrying ({attempts}/{config.reconnect_attempts})")
+            time.sleep(config.reconnect_delay)
+            self.cap = self._open()
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video source: {source}")
+        self.fps = int(self.cap.get(cv2.CAP_PROP_FPS)) or config.default_fps
+        self.size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def _open(self) -> cv2.VideoCapture:
+        return cv2.VideoCapture(int(self.source) if self.source.isdigit() else self.source)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        frame_count = 0
+        failures = 0
+        try:
+            while True:
+                ret, frame = self.cap.read()
+                if ret:
+                    failures = 0
+                    yield frame_count, frame
+                    frame_count += 1
+                    continue
+                if not self.live or failures >= self.config.reconnect_attempts:
+                    break
+                failures += 1
+                print(f"Lost {self.source}, reconnecting ({failures}/{self.config.reconnect_attempts})")
+                self.cap.release()
+                time.sleep(self.config.reconnect_delay)
+                self.cap = self._open()
+        finally:
+            self.cap.release()
+
+
+class SyntheticSource:
+    """Generated frames with a moving block, for stub runs and benchmarks"""
+    def __init__(self, frames: int = 300, width: int = 640, height: int = 480, fps: int = 25):
+        self.frames = frames
+        self.fps = fps
+        self.size = (width, height)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        width, height = self.size
+        background = np.full((height, width, 3), 90, dtype=np.uint8)
+        for frame_count in range(self.frames):
+            frame = background.copy()
+            x = (frame_count * 4) % max(1, width - 80)
+            frame[height // 3:height // 3 + 80, x:x + 80] = (40, 160, 220)
+            yield frame_count, frame
+
+
+def open_source(source: str, config: Config):
+    """VideoSource for paths, camera indexes and URLs; "synthetic[:frames]" for generated frames"""
+    if source.startswith("synthetic"):
+        frames = int(source.split(":", 1)[1]) if ":" in source else 300
+        return SyntheticSource(frames, fps=config.default_fps)
+    return VideoSource(source, config)
+
+
+# ===== WORKER TRACKING =====
+class WorkerTracker:
+    """Track workers across frames and manage violations"""
+    def __init__(self, fps: int, violation_duration: float):
+        self.fps = fps
+        self.violation_duration = violation_duration
+        self.worker_id_counter = 0
+        self.worker_history = {}  # worker_id: last_box
+        self.violation_state = {}  # worker_id: violation_data
+
+    def assign_id(self, new_box) -> int:
+        """Assign new or existing worker ID based on box position"""
+        new_cx = (new_box[0] + new_box[2]) / 2
+        new_cy = (new_box[1] + new_box[3]) / 2
+
+        for wid, last_box in self.worker_history.items():
+            last_cx = (last_box[0] + last_box[2]) / 2
+            last_cy = (last_box[1] + last_box[3]) / 2
+            if np.sqrt((new_cx - last_cx)**2 + (new_cy - last_cy)**2) < 50:
+                return wid
+
+        self.worker_id_counter += 1
+        return self.worker_id_counter
+
+    def update_violation(self, worker_id: int, frame_count: int, violations: set) -> bool:
+        """Update and check if violation duration exceeds threshold"""
+        if not violations:
+            if worker_id in self.violation_state:
+                del self.violation_state[worker_id]
+            return False
+
+        violation_key = tuple(sorted(violations))
+
+        if worker_id not in self.violation_state:
+            self.violation_state[worker_id] = {
+                "start_frame": frame_count,
+                "types": violation_key,
+                "saved": False
+            }
+            return False
+
+        duration = (frame_count - self.violation_state[worker_id]["start_frame"]) / self.fps
+        return duration >= self.violation_duration and not self.violation_state[worker_id]["saved"]
+
+
+# ===== FRAME PROCESSING =====
+class FrameProcessor:
+    """VideoProcessor's per-frame logic without the capture loop"""
+    def __init__(self, config: Config, fps: int):
+        self.config = config
+        self.fps = fps
+        self.tracker = WorkerTracker(fps, config.violation_duration)
+        if config.violation_dir:
+            os.makedirs(config.violation_dir, exist_ok=True)
+
+    def process_frame(self, frame: np.ndarray, frame_count: int,
+                      detections: FrameDetections) -> List[ViolationEvent]:
+        """Track each worker, draw annotations on ``frame`` and return new violations"""
+        events = []
+        for x1, y1, x2, y2 in detections.persons['box'].tolist():
+            event = self._process_worker(frame, x1, y1, x2, y2, detections, frame_count)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _process_worker(self, frame, x1, y1, x2, y2, detections, frame_count):
+        """Process an individual worker's violations"""
+        # Check if person has logo (is a worker)
+        is_worker = dets.contains(detections.logos['box'], (x1, y1, x2, y2)).any()
+        if not is_worker:
+            return None
+
+        worker_id = self.tracker.assign_id((x1, y1, x2, y2))
+        self.tracker.worker_history[worker_id] = (x1, y1, x2, y2)
+
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        cv2.putText(frame, f"Worker {worker_id}", (int(x1), int(y1)-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+        violations = self._check_violations(x1, y1, x2, y2, detections, frame)
+        if self.tracker.update_violation(worker_id, frame_count, violations):
+            return self._save_violation(frame, worker_id, violations, frame_count)
+        return None
+
+    def _check_violations(self, x1, y1, x2, y2, detections, frame):
+        """Check for safety violations within worker's bounding box"""
+        violations = set()
+
+        box = (x1, y1, x2, y2)
+
+        others = detections.others[dets.contains(detections.others['box'], box)]
+        for (vx1, vy1, vx2, vy2), label in zip(others['box'].tolist(), others['label'].tolist()):
+            vlabel = dets.label_name(label)
+            if vlabel in ["no-mask", "no-gloves"]:
+                violations.add(vlabel)
+                color = (0, 0, 255)  # Red for violations
+            else:
+                color = (0, 255, 255)  # Yellow for proper equipment
+            cv2.rectangle(frame, (int(vx1), int(vy1)), (int(vx2), int(vy2)), color, 2)
+            cv2.putText(frame, vlabel, (int(vx1), int(vy1)-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        caps = detections.caps[dets.contains(detections.caps['box'], box)]
+        for (cx1, cy1, cx2, cy2), label in zip(caps['box'].tolist(), caps['label'].tolist()):
+            clabel = dets.label_name(label)
+            if clabel == "NO-Hardhat":
+                violations.add(clabel)
+                color = (0, 0, 255)
+            else:
+                color = (0, 255, 255)
+            cv2.rectangle(frame, (int(cx1), int(cy1)), (int(cx2), int(cy2)), color, 2)
+            cv2.putText(frame, clabel, (int(cx1), int(cy1)-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        return violations
+
+    def _save_violation(self, frame, worker_id, violations, frame_count) -> ViolationEvent:
+        """Save violation frame to disk"""
+        violation_str = "_".join(sorted(violations))
+        filepath = None
+        if self.config.violation_dir:
+            filename = f"violation_worker{worker_id}_{violation_str}_frame{frame_count}.jpg"
+            filepath = os.path.join(self.config.violation_dir, filename)
+            cv2.imwrite(filepath, frame)
+        self.tracker.violation_state[worker_id]["saved"] = True
+        return ViolationEvent(worker_id, tuple(sorted(violations)), frame_count,
+                              frame_count / self.fps, filepath)
+
+
+# ===== SINKS =====
+class Sink:
+    """Receives results while the service runs; override what you need"""
+    def on_frame(self, result: FrameResult):
+        pass
+
+    def on_violation(self, event: ViolationEvent):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlSink(Sink):
+    """Appends one JSON line per violation, flushed immediately so tailing readers see it"""
+    def __init__(self, path: str):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def on_violation(self, event: ViolationEvent):
+        self.file.write(json.dumps(event.to_dict()) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class VideoWriterSink(Sink):
+    """Writes annotated frames to a video file"""
+    def __init__(self, path: str, fps: int, size: Tuple[int, int]):
+        self.out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+
+    def on_frame(self, result: FrameResult):
+        self.out.write(result.frame)
+
+    def close(self):
+        self.out.release()
+
+
+class CallbackSink(Sink):
+    """Calls ``callback(event)`` for every violation"""
+    def __init__(self, callback: Callable[[ViolationEvent], None]):
+        self.callback = callback
+
+    def on_violation(self, event: ViolationEvent):
+        self.callback(event)
+
+
+class DriveSink(Sink):
+    """Uploads each violation image to today's Drive date folder as it is saved
+
+    Uploads run on a background thread, so detection never waits on the
+    network. The date folder and metadata file follow the layout the
+    dashboard's DriveService reads, so new violations show up there while
+    the stream is still running.
+    """
+    def __init__(self, config: Config, share_with: Optional[str] = None):
+        self.config = config
+        self.share_with = share_with
+        self.service = self._authenticate()
+        self.root_folder = self._get_or_create_root_folder()
+        self.metadata_file_id, self.metadata = self._load_metadata()
+        self.uploaded = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="drive-sink", daemon=True)
+        self._thread.start()
+
+    def _authenticate(self):
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        creds = service_account.Credentials.from_service_account_file(
+            self.config.service_account_file,
+            scopes=self.config.drive_scopes
+        )
+        return build('drive', 'v3', credentials=creds)
+
+    def _get_or_create_root_folder(self):
+        name = self.config.drive_root_folder
+        query = f"name='{name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        results = self.service.files().list(q=query, fields="files(id,name)").execute()
+        if results.get('files'):
+            return results['files'][0]
+        folder_metadata = {'name': name, 'mimeType': 'application/vnd.google-apps.folder'}
+        folder = self.service.files().create(body=folder_metadata, fields='id,name').execute()
+        print(f"Created new folder: {folder['name']} ({folder['id']})")
+        return folder
+
+    def _load_metadata(self):
+        query = f"name='{self.config.drive_metadata_file}' and '{self.root_folder['id']}' in parents"
+        results = self.service.files().list(q=query, fields="files(id)").execute()
+        if results.get('files'):
+            file_id = results['files'][0]['id']
+            content = self.service.files().get_media(fileId=file_id).execute()
+            return file_id, json.loads(content.decode('utf-8'))
+        return None, {
+            'root_folder_id': self.root_folder['id'],
+            'date_folders': {},
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    def _date_folder(self, now: datetime):
+        date_str = now.strftime("%m_%d_%Y")
+        if date_str in self.metadata['date_folders']:
+            return self.metadata['date_folders'][date_str]['folder_id']
+
+        folder_metadata = {
+            'name': f"violations_{date_str}_{uuid.uuid4().hex[:8]}",
+            'mimeType': 'application/vnd.google-apps.folder',
+            'parents': [self.root_folder['id']]
+        }
+        folder = self.service.files().create(body=folder_metadata, fields='id,name').execute()
+        if self.share_with:
+            self.service.permissions().create(
+                fileId=folder['id'],
+                body={'type': 'user', 'role': 'writer', 'emailAddress': self.share_with},
+                fields='id'
+            ).execute()
+        self.metadata['date_folders'][date_str] = {
+            'folder_id': folder['id'],
+            'folder_name': folder['name'],
+            'display_date': now.strftime("%m/%d/%Y"),
+            'created_at': now.isoformat()
+        }
+        # Publish the new folder right away so the dashboard starts listing it
+        self._save_metadata()
+        return folder['id']
+
+    def _save_metadata(self):
+        from googleapiclient.http import MediaInMemoryUpload
+
+        media = MediaInMemoryUpload(json.dumps(self.metadata).encode('utf-8'), mimetype='application/json')
+        if self.metadata_file_id:
+            self.service.files().update(fileId=self.metadata_file_id, media_body=media).execute()
+        else:
+            body = {'name': self.config.drive_metadata_file, 'parents': [self.root_folder['id']]}
+            self.metadata_file_id = self.service.files().create(
+                body=body, media_body=media, fields='id').execute()['id']
+
+    def _upload_file(self, filepath, folder_id, mime_type):
+        """Upload a single file with retry logic"""
+        from googleapiclient.http import MediaFileUpload
+
+        file_metadata = {'name': os.path.basename(filepath), 'parents': [folder_id]}
+        for attempt in range(3):
+            try:
+                media = MediaFileUpload(filepath, mimetype=mime_type)
+                self.service.files().create(body=file_metadata, media_body=media, fields='id').execute()
+                return
+            except Exception:
+                if attempt == 2:
+                    raise
+                time.sleep(5)
+
+    def on_violation(self, event: ViolationEvent):
+        if event.image_path:
+            self._queue.put(event)
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            try:
+                folder_id = self._date_folder(datetime.now())
+                self._upload_file(event.image_path, folder_id, 'image/jpeg')
+                self.uploaded += 1
+            except Exception as e:
+                print(f"Upload failed for {event.image_path}: {str(e)}")
+
+    def close(self):
+        """Finish queued uploads"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+# ===== SERVICE =====
+class DetectionService:
+    """Runs a detector over a frame source and feeds every result to the sinks as it is produced"""
+    def __init__(self, detector, config: Optional[Config] = None, sinks: Optional[List[Sink]] = None):
+        self.config = config or Config()
+        if self.config.motion_gate:
+            detector = GatedDetector(detector, MotionGate(self.config.gate_stride, self.config.gate_threshold))
+        self.detector = detector
+        self.sinks = list(sinks or [])
+        self.frames = 0
+        self.violations = 0
+        self.detect_seconds = 0.0
+        self.pipeline = None
+        self._stop = threading.Event()
+
+    def _serial(self, source, max_frames: Optional[int]) -> Iterator[tuple]:
+        # The notebook's loop: read, detect and write one frame at a time
+        for frame_count, frame in source:
+            if self._stop.is_set() or (max_frames is not None and frame_count >= max_frames):
+                break
+            start = time.perf_counter()
+            raw = self.detector.detect(frame)
+            yield frame_count, frame, raw, time.perf_counter() - start
+
+    def stream(self, source, max_frames: Optional[int] = None) -> Iterator[FrameResult]:
+        """Generator of FrameResults; sinks have already seen each result when it is yielded
+
+        With Config.pipelined, decoding and inference run ahead on their own
+        threads (see FramePipeline) and this generator is the annotate/write
+        stage.
+        """
+        processor = FrameProcessor(self.config, source.fps)
+        if self.config.pipelined:
+            self.pipeline = FramePipeline(source, self.detector, self.config.batch_size, self.config.queue_depth,
+                                          self.config.batch_timeout, max_frames)
+            if self._stop.is_set():
+                self.pipeline.stop()
+            frames = iter(self.pipeline)
+        else:
+            frames = self._serial(source, max_frames)
+        for frame_count, frame, raw, detect_seconds in frames:
+            detections = split_detections(raw, self.config)
+            events = processor.process_frame(frame, frame_count, detections)
+
+            result = FrameResult(frame_count, frame, detections, events, detect_seconds)
+            self.frames += 1
+            self.violations += len(events)
+            self.detect_seconds += detect_seconds
+            for sink in self.sinks:
+                sink.on_frame(result)
+                for event in events:
+                    sink.on_violation(event)
+            yield result
+
+    def run(self, source, max_frames: Optional[int] = None) -> dict:
+        """Process the whole source (or until stop()), close the sinks and return stats"""
+        start = time.perf_counter()
+        try:
+            for _ in self.stream(source, max_frames):
+                pass
+        finally:
+            for sink in self.sinks:
+                try:
+                    sink.close()
+                except Exception as e:
+                    print(f"Error closing {type(sink).__name__}: {str(e)}")
+        return self.stats(time.perf_counter() - start)
+
+    def stop(self):
+        """Ask a running stream to finish after the current frame"""
+        self._stop.set()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def stats(self, elapsed: Optional[float] = None) -> dict:
+        stats = {
+            'frames': self.frames,
+            'violations': self.violations,
+            'detect_ms': self.detect_seconds / self.frames * 1000 if self.frames else None
+        }
+        if elapsed:
+            stats['fps'] = self.frames / elapsed
+        if isinstance(self.detector, GatedDetector):
+            stats['gate'] = self.detector.stats()
+        if self.pipeline is not None:
+            pipeline = self.pipeline.stats()
+            stats['avg_batch'] = pipeline['avg_batch']
+            stats['stages'] = pipeline['stages']
+        return stats
+
+
+# ===== MAIN EXECUTION =====
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help="video file, camera index, rtsp:// or http:// URL, or synthetic[:frames]")
+    parser.add_argument('--output', help="write the annotated video here")
+    parser.add_argument('--events', help="append violations to this JSON Lines file")
+    parser.add_argument('--violations-dir', default=Config.violation_dir)
+    parser.add_argument('--drive', action='store_true', help="upload violation images to Google Drive as they happen")
+    parser.add_argument('--share-with', help="email to share new Drive date folders with")
+    parser.add_argument('--custom-weights', default=Config.custom_weights)
+    parser.add_argument('--cap-weights', default=Config.cap_weights)
+    parser.add_argument('--logo-weights', default=Config.logo_weights)
+    parser.add_argument('--device', default=Config.device)
+    parser.add_argument('--max-frames', type=int)
+    parser.add_argument('--batch-size', type=int, default=Config.batch_size)
+    parser.add_argument('--queue-depth', type=int, default=Config.queue_depth)
+    parser.add_argument('--serial', action='store_true', help="read, detect and write one frame at a time")
+    parser.add_argument('--no-gate', action='store_true', help="run the models on every frame")
+    parser.add_argument('--gate-stride', type=int, default=Config.gate_stride)
+    parser.add_argument('--stub', action='store_true', help="use a scripted detector instead of the YOLO weights")
+    args = parser.parse_args(argv)
+
+    config = Config(custom_weights=args.custom_weights, cap_weights=args.cap_weights,
+                    logo_weights=args.logo_weights, device=args.device,
+                    violation_dir=args.violations_dir, pipelined=not args.serial,
+                    batch_size=args.batch_size, queue_depth=args.queue_depth,
+                    motion_gate=not args.no_gate, gate_stride=args.gate_stride)
+    source = open_source(args.source, config)
+    detector = StubDetector(demo_script) if args.stub else YOLODetector(config)
+
+    sinks = [CallbackSink(lambda event: print(
+        f"Violation: worker {event.worker_id} {', '.join(event.violations)} at frame {event.frame}"))]
+    if args.events:
+        sinks.append(JsonlSink(args.events))
+    if args.output:
+        sinks.append(VideoWriterSink(args.output, source.fps, source.size))
+    if args.drive:
+        sinks.append(DriveSink(config, args.share_with))
+
+    service = DetectionService(detector, config, sinks)
+    print(f"Starting safety violation detection on {args.source}...")
+    try:
+        stats = service.run(source, args.max_frames)
+    except KeyboardInterrupt:
+        stats = service.stats()
+    print(f"Processed {stats['frames']} frames, {stats['violations']} violations")
+    if 'gate' in stats:
+        print(f"  motion gate skipped {stats['gate']['skip_fraction']:.0%} of frames")
+    for name, stage in stats.get('stages', {}).items():
+        print(f"  {name}: {stage['utilization']:.0%} busy, {stage['starved_s']}s starved, {stage['blocked_s']}s blocked")
+
+
+if __name__ == "__main__":
+    main()
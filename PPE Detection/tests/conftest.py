@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The service modules import each other by name, as they do when run from "PPE Detection/"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
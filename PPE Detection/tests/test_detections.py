@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import detections as dets
+from gating import GatedDetector, MotionGate
+from ppe_service import LOGOS, Config, StubDetector, demo_script, split_detections
+
+
+def same(a, b):
+    return all(np.array_equal(a[name], b[name]) for name in dets.DETECTION_DTYPE.names)
+
+
+@pytest.mark.parametrize("raw", [None, [], (), np.empty((0, 6)), dets.empty()])
+def test_as_detections_of_nothing(raw):
+    detections = dets.as_detections(raw)
+    assert detections.dtype == dets.DETECTION_DTYPE
+    assert len(detections) == 0
+
+
+@pytest.mark.parametrize("count", [1, 2])
+def test_as_detections_of_a_plain_array(count):
+    rows = [(1, 2, 3, 4, 0.9, "person"), (5, 6, 7, 8, 0.8, "mask")][:count]
+    detections = dets.as_detections(np.array(rows, dtype=object), group=LOGOS)
+
+    assert same(detections, dets.from_rows(rows, group=LOGOS))
+
+
+def test_as_detections_copies_structured_arrays():
+    raw = dets.from_rows([(1, 2, 3, 4, 0.9, "person")])
+    detections = dets.as_detections(raw)
+    detections['group'] = LOGOS
+    assert raw['group'].tolist() == [0]
+
+
+def test_split_detections_leaves_carried_detections_alone():
+    # The gate only lets the first frame through, so every frame gets the same arrays back
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    script = lambda n, f: {name: dets.from_rows(rows) for name, rows in demo_script(n, f).items()}
+    detector = GatedDetector(StubDetector(script), MotionGate(stride=1000))
+    raw = detector.detect(frame)
+    before = {name: array.copy() for name, array in raw.items()}
+
+    first = split_detections(detector.detect(frame), Config())
+    second = split_detections(detector.detect(frame), Config())
+
+    assert detector.detect(frame) is raw
+    assert all(same(raw[name], before[name]) for name in raw)
+    assert same(first.logos, second.logos)
+    assert first.logos['group'].tolist() == [LOGOS]
+
+
+@pytest.mark.parametrize("boxes", [3, 10, 16, 40])
+def test_small_frames_match_the_batched_path(monkeypatch, boxes):
+    rng = np.random.default_rng(boxes)
+    labels = {'custom': ["person", "mask", "no-mask"], 'logo': ["logo"], 'cap': ["Hardhat", "NO-Hardhat"]}
+    frames = []
+    for _ in range(50):
+        raw = {}
+        for name, choices in labels.items():
+            xy = rng.uniform(0, 300, (boxes, 2))
+            wh = rng.uniform(10, 120, (boxes, 2))
+            raw[name] = [(*box, score, str(label)) for box, score, label in
+                         zip(np.hstack([xy, xy + wh]).tolist(), rng.uniform(0.3, 1, boxes).tolist(),
+                             rng.choice(choices, boxes))]
+        frames.append(raw)
+
+    fast = [split_detections(raw, Config()) for raw in frames]
+    monkeypatch.setattr(dets, 'SMALL_NMS_MAX', 0)
+    batched = [split_detections(raw, Config()) for raw in frames]
+
+    for a, b in zip(fast, batched):
+        assert all(same(getattr(a, group), getattr(b, group)) for group in ('persons', 'others', 'logos', 'caps'))
@@ -0,0 +1,100 @@
+import pytest
+
+import detections as dets
+from ppe_service import (CallbackSink, Config, DetectionService, StubDetector, SyntheticSource,
+                         WorkerTracker, demo_script, split_detections)
+
+
+def labels(group):
+    return [dets.label_name(label) for label in group['label'].tolist()]
+
+
+def test_split_detections_applies_thresholds_and_groups():
+    raw = {
+        'custom': [(10, 10, 200, 400, 0.9, "person"),
+                   (30, 20, 60, 50, 0.8, "no-mask"),
+                   (300, 10, 400, 400, 0.3, "person")],  # below person_conf
+        'logo': [(40, 80, 80, 110, 0.7, "logo"),
+                 (200, 80, 240, 110, 0.4, "logo")],      # below logo_conf
+        'cap': [(20, 10, 80, 25, 0.6, "Hardhat"),
+                (100, 10, 160, 25, 0.9, "person")]       # not a hardhat label
+    }
+
+    detections = split_detections(raw, Config())
+
+    assert labels(detections.persons) == ["person"]
+    assert labels(detections.others) == ["no-mask"]
+    assert labels(detections.logos) == ["logo"]
+    assert labels(detections.caps) == ["Hardhat"]
+    assert detections.caps['box'].tolist() == [[20, 10, 80, 25]]
+
+
+def test_split_detections_only_suppresses_within_a_group():
+    box = (10, 10, 100, 100)
+    raw = {
+        'custom': [(*box, 0.6, "person"), (12, 12, 100, 100, 0.9, "person"), (*box, 0.8, "mask")],
+        'logo': [(*box, 0.7, "logo")],
+        'cap': [(*box, 0.5, "Hardhat"), (*box, 0.45, "NO-Hardhat")]
+    }
+
+    detections = split_detections(raw, Config())
+
+    assert detections.persons['score'].tolist() == pytest.approx([0.9])
+    assert labels(detections.others) == ["mask"]
+    assert labels(detections.logos) == ["logo"]
+    assert labels(detections.caps) == ["Hardhat"]
+
+
+def test_split_detections_of_nothing():
+    detections = split_detections({}, Config())
+    assert all(len(group) == 0 for group in
+               (detections.persons, detections.others, detections.logos, detections.caps))
+
+
+def test_violation_fires_after_violation_duration():
+    tracker = WorkerTracker(fps=25, violation_duration=2)
+
+    assert not tracker.update_violation(1, 10, {"no-mask"})
+    assert not tracker.update_violation(1, 59, {"no-mask"})
+    assert tracker.update_violation(1, 60, {"no-mask"})
+
+    # A clean frame resets the clock
+    assert not tracker.update_violation(1, 61, set())
+    assert not tracker.update_violation(1, 62, {"no-mask"})
+    assert not tracker.update_violation(1, 111, {"no-mask"})
+    assert tracker.update_violation(1, 112, {"no-mask"})
+
+
+def test_violation_fires_once_per_worker():
+    tracker = WorkerTracker(fps=25, violation_duration=2)
+    tracker.update_violation(1, 0, {"no-mask"})
+    assert tracker.update_violation(1, 50, {"no-mask"})
+    tracker.violation_state[1]["saved"] = True  # what FrameProcessor does after saving the frame
+    assert not tracker.update_violation(1, 51, {"no-mask"})
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+@pytest.mark.parametrize("motion_gate", [False, True])
+def test_service_reports_demo_violation(tmp_path, pipelined, motion_gate):
+    config = Config(violation_dir=str(tmp_path), pipelined=pipelined, motion_gate=motion_gate)
+    events = []
+    service = DetectionService(StubDetector(demo_script), config, [CallbackSink(events.append)])
+
+    stats = service.run(SyntheticSource(frames=80, fps=25))
+
+    assert stats['frames'] == 80
+    assert stats['violations'] == 1
+    assert [(e.worker_id, e.violations, e.frame) for e in events] == [(1, ("no-mask",), 50)]
+    assert events[0].stream_seconds == pytest.approx(2.0)
+    assert (tmp_path / "violation_worker1_no-mask_frame50.jpg").exists()
+
+
+def test_service_stream_stops_at_max_frames(tmp_path):
+    config = Config(violation_dir=str(tmp_path), motion_gate=False)
+    detector = StubDetector(demo_script)
+    results = list(DetectionService(detector, config).stream(SyntheticSource(frames=80), max_frames=30))
+
+    assert [r.index for r in results] == list(range(30))
+    assert all(r.events == [] for r in results)
+    assert all(len(r.detections.persons) == 1 for r in results)
+    assert detector.calls >= 30